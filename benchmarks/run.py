@@ -0,0 +1,259 @@
+"""
+Benchmarks of the engine, pathfinder and optimizer hot paths.
+
+Suites:
+    combine       Engine.combine throughput, raw and through the solver's transition cache
+    find_path     Solver.path for targets of 1 to 5 effects, for each search strategy
+    find_best_path  find_best_path at depths 3-7 for every drug type
+    batch         Optimizer batch throughput for several --jobs values
+
+Every case is timed in a fresh solver, so memoized transitions and results
+never carry over between runs; result caches are disabled. Results can be
+written to JSON and compared against an earlier run: cases whose fastest run
+grew by more than --threshold are reported as regressions and make the
+runner exit with status 1.
+
+Usage:
+    python benchmarks/run.py
+    python benchmarks/run.py --quick --json baseline.json
+    python benchmarks/run.py --quick --baseline baseline.json
+    python benchmarks/run.py --suites find_best_path --depths 6 7 --drugs meth
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.data.loader import load_all_data  # noqa: E402
+from src.engine.optimizer import find_best_path  # noqa: E402
+from src.engine.solver import Solver  # noqa: E402
+
+DRUGS = ('marijuana', 'meth', 'cocaine')
+
+# Target sets of growing size; each needs a longer recipe than the one before
+PATH_TARGETS = [
+    ['Calming'],
+    ['Calming', 'Energizing'],
+    ['Calming', 'Energizing', 'Toxic'],
+    ['Bright-Eyed', 'Munchies', 'Refreshing', 'Spicy'],
+    ['Bright-Eyed', 'Munchies', 'Refreshing', 'Sedating', 'Spicy'],
+]
+
+
+def measure(func, runs, max_seconds):
+    """Call func up to runs times, stopping early once max_seconds have been spent.
+
+    Returns:
+        List of wall times in seconds, at least one
+    """
+    times = []
+    while len(times) < runs and (not times or sum(times) < max_seconds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def make_result(suite, name, params, times, work=None, unit=None):
+    """Summarize the timings of one case; work is the number of units done per run."""
+    result = {'suite': suite, 'name': name, 'params': params, 'runs': len(times),
+              'median_s': round(statistics.median(times), 6), 'min_s': round(min(times), 6)}
+    if work:
+        result['throughput'] = round(work / statistics.median(times), 1)
+        result['unit'] = unit
+    return result
+
+
+def bench_combine(data, args):
+    """Time Engine.combine over every state reachable within three ingredients."""
+    solver = Solver(data)
+    engine = solver.engine
+    ingredients = list(engine.base_effects)
+    states, frontier = {()}, {()}
+    for _ in range(3):
+        frontier = {tuple(engine.combine(list(state), ing)) for state in frontier for ing in ingredients}
+        frontier -= states
+        states |= frontier
+    calls = [(list(state), ing) for state in sorted(states) for ing in ingredients]
+
+    def run_engine():
+        for effects, ingredient in calls:
+            engine.combine(effects, ingredient)
+
+    def run_cached():
+        for effects, ingredient in calls:
+            solver.transitions.combine(effects, ingredient)
+
+    run_cached()  # Fill the transition cache; only lookups are timed
+    results = []
+    for name, run in (('engine', run_engine), ('transition_cache', run_cached)):
+        results.append(make_result('combine', name, {'calls': len(calls)},
+                                   measure(run, args.runs, args.max_time), len(calls), 'calls/s'))
+        report(results[-1])
+    return results
+
+
+def bench_find_path(data, args):
+    """Time Solver.path for each strategy and target set up to --max-targets effects.
+
+    The search runs through the solver, as in the CLIs, so it gets the
+    ingredient prices too.
+    """
+    results = []
+    for strategy in args.strategies:
+        # Breadth-first cases keep their original names, so older baselines still compare
+        prefix = '' if strategy == 'bfs' else f"{strategy}/"
+        for targets in PATH_TARGETS[:args.max_targets]:
+            times = measure(lambda: Solver(data).path(targets, strategy=strategy),
+                            args.runs, args.max_time)
+            results.append(make_result('find_path', f"{prefix}targets={len(targets)}",
+                                       {'targets': targets, 'strategy': strategy}, times))
+            report(results[-1])
+    return results
+
+
+def bench_find_best_path(data, args):
+    """Time find_best_path at each depth for each drug, without production options."""
+    results = []
+    for drug in args.drugs:
+        for depth in args.depths:
+            def run():
+                solver = Solver(data)
+                find_best_path(solver.transitions, solver.base_prices[drug], solver.production_cost(drug, {}),
+                               depth, solver.effect_multipliers, solver.ingredient_prices,
+                               solver.effect_priorities)
+            times = measure(run, args.runs, args.max_time)
+            results.append(make_result('find_best_path', f"{drug}/depth={depth}",
+                                       {'drug_type': drug, 'depth': depth}, times))
+            report(results[-1])
+    return results
+
+
+def bench_batch(data, args):
+    """Time the parallel optimizer CLI on a generated batch for each --jobs value."""
+    batch = [{'drug_type': drug, 'depth': args.batch_depth}
+             for _ in range(args.batch_size // len(DRUGS)) for drug in DRUGS]
+    env = {key: value for key, value in os.environ.items() if key != 'PATHFINDER_CACHE'}
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        batch_path = os.path.join(tmp, 'batch.jsonl')
+        with open(batch_path, 'w') as f:
+            f.writelines(json.dumps(job) + '\n' for job in batch)
+
+        for jobs in args.jobs:
+            command = [sys.executable, '-m', 'src.cli.parallel_optimizer', '--jobs', str(jobs),
+                       '--batch', batch_path, '--results', os.path.join(tmp, 'results.jsonl')]
+            run = lambda: subprocess.run(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+            results.append(make_result('batch', f"jobs={jobs}",
+                                       {'jobs': jobs, 'batch_size': len(batch), 'depth': args.batch_depth},
+                                       measure(run, args.runs, args.max_time), len(batch), 'jobs/s'))
+            report(results[-1])
+    return results
+
+
+BENCHMARKS = {
+    'combine': bench_combine,
+    'find_path': bench_find_path,
+    'find_best_path': bench_find_best_path,
+    'batch': bench_batch,
+}
+
+
+def report(result):
+    """Print one result line."""
+    line = f"{result['suite']:<15} {result['name']:<24} {result['runs']:>4} {result['median_s'] * 1000:>12.2f}"
+    if 'throughput' in result:
+        throughput = result['throughput']
+        line += f"  {throughput:,.0f} {result['unit']}" if throughput >= 100 else f"  {throughput:.1f} {result['unit']}"
+    print(line, flush=True)
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every case against a baseline run.
+
+    Cases are compared on their fastest run, which is less affected by other
+    load on the machine than the median.
+
+    Returns:
+        List of the names of the cases that regressed
+    """
+    previous = {(r['suite'], r['name']): r for r in baseline['results']}
+    regressions = []
+    print(f"\n{'Case':<40} {'Baseline ms':>12} {'Current ms':>12} {'Change':>8}")
+    for result in results:
+        key = (result['suite'], result['name'])
+        if key not in previous:
+            continue
+        before, after = previous[key]['min_s'], result['min_s']
+        change = after / before - 1 if before else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append('/'.join(key))
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{'/'.join(key):<40} {before * 1000:>12.2f} {after * 1000:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the engine, pathfinder and optimizer')
+    parser.add_argument('--suites', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help='Suites to run (default: all)')
+    parser.add_argument('--quick', action='store_true',
+                        help='Smaller cases: depths 3-5, up to 3 targets and a shallower batch')
+    parser.add_argument('--runs', type=int, default=5, help='Maximum runs per case (default: 5)')
+    parser.add_argument('--max-time', type=float, default=10.0,
+                        help='Stop repeating a case after this many seconds (default: 10)')
+    parser.add_argument('--depths', type=int, nargs='+', help='find_best_path depths (default: 3-7)')
+    parser.add_argument('--drugs', nargs='+', choices=DRUGS, default=list(DRUGS),
+                        help='find_best_path drug types (default: all)')
+    parser.add_argument('--max-targets', type=int, help='Largest find_path target set (default: 5)')
+    parser.add_argument('--strategies', nargs='+', choices=('bfs', 'iddfs'), default=['bfs', 'iddfs'],
+                        help='find_path search strategies (default: both)')
+    parser.add_argument('--jobs', type=int, nargs='+', help='Batch worker counts (default: 1 2 4 and the CPU count)')
+    parser.add_argument('--batch-size', type=int, default=12, help='Jobs in the generated batch (default: 12)')
+    parser.add_argument('--batch-depth', type=int, help='Depth of the batch jobs (default: 5)')
+    parser.add_argument('--json', metavar='PATH', help='Write the results to a JSON file')
+    parser.add_argument('--baseline', metavar='PATH', help='Compare against results written with --json')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Relative slowdown reported as a regression (default: 0.15)')
+    args = parser.parse_args()
+
+    args.depths = args.depths or ([3, 4, 5] if args.quick else [3, 4, 5, 6, 7])
+    args.max_targets = args.max_targets or (3 if args.quick else len(PATH_TARGETS))
+    args.batch_depth = args.batch_depth or (4 if args.quick else 5)
+    args.jobs = args.jobs or sorted({1, 2, 4, os.cpu_count() or 1})
+
+    data = load_all_data()
+    print(f"{'Suite':<15} {'Case':<24} {'Runs':>4} {'Median ms':>12}")
+    results = []
+    for suite in args.suites:
+        results.extend(BENCHMARKS[suite](data, args))
+
+    if args.json:
+        meta = {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(), 'platform': platform.platform(),
+                'cpu_count': os.cpu_count(), 'argv': sys.argv[1:]}
+        with open(args.json, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
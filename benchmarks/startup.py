@@ -0,0 +1,74 @@
+"""
+Startup-time benchmark for the main.py entry point.
+
+Runs each mode as a fresh interpreter several times and reports the wall
+time, with the data cache warm and (with --cold) with it disabled.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --cold --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mode name -> arguments passed to main.py
+MODES = {
+    'help': ['--help'],
+    'list': ['1', '-l'],
+    'path': ['1', '-d', 'Calming', 'Energizing', 'Toxic'],
+    'optimize': ['2', '-t', '2', '-d', '1'],
+}
+
+
+def time_command(args, runs, env):
+    """Run main.py with the given arguments and return the wall times in ms."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, 'main.py', *args], cwd=ROOT, env=env,
+                       stdout=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure main.py startup time per mode')
+    parser.add_argument('--runs', type=int, default=10, help='Runs per mode (default: 10)')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES),
+                        help='Modes to measure (default: all)')
+    parser.add_argument('--cold', action='store_true',
+                        help='Also measure with the data cache disabled')
+    parser.add_argument('--json', metavar='PATH', help='Write the results to a JSON file')
+    args = parser.parse_args()
+
+    variants = [('warm', {})]
+    if args.cold:
+        variants.append(('cold', {'PATHFINDER_DATA_CACHE': '0'}))
+
+    results = []
+    print(f"{'Mode':<10} {'Cache':<6} {'Median ms':>10} {'Min ms':>8}")
+    for mode in args.modes:
+        for variant, extra_env in variants:
+            env = {**os.environ, **extra_env}
+            time_command(MODES[mode], 1, env)  # Warm up the OS cache and the data snapshot
+            times = time_command(MODES[mode], args.runs, env)
+            result = {'mode': mode, 'cache': variant, 'runs': args.runs,
+                      'median_ms': round(statistics.median(times), 2),
+                      'min_ms': round(min(times), 2)}
+            results.append(result)
+            print(f"{mode:<10} {variant:<6} {result['median_ms']:>10.1f} {result['min_ms']:>8.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,45 +5,19 @@ Pathfinder - Find optimal ingredient combinations to achieve desired effects.
 This script provides a command-line interface for finding the shortest sequence
 of ingredients that will result in having all desired effects active simultaneously,
 as well as optimizing drug recipes for maximum profit.
+
+If a query daemon is running (python -m src.server.daemon), queries are forwarded
+to it instead of being computed in this process.
 """
 
-import argparse
-from src.data.loader import load_all_data
-from src.cli.pathfinder_cli import run_pathfinder
-from src.cli.optimizer_cli import setup_optimizer_parser, run_optimizer, CapitalizationHelpFormatter
+import sys
+from src.cli.arguments import build_main_parser
 
 def main():
     """Main entry point for the pathfinder tool."""
-    # Load all required data
-    data = load_all_data()
-    
-    # Setup main command-line argument parser
-    parser = argparse.ArgumentParser(
-        formatter_class=CapitalizationHelpFormatter,
-        description='Pathfinder - Find optimal ingredient combinations and drug recipes',
-    )
-    
-    # Create subparsers for different modes
-    subparsers = parser.add_subparsers(dest='mode', help='Operation mode')
-    
-    # Pathfinder mode (Mode 1)
-    path_parser = subparsers.add_parser(
-        '1', 
-        help='Find a path to desired effects',
-        description='Find a sequence of ingredients to achieve desired effects',
-        formatter_class=CapitalizationHelpFormatter
-    )
-    path_parser.add_argument('-d', '--desired', metavar='EFFECTS', nargs='+',
-                       help='Specify effects to achieve (names or numbers, comma-separated or space-separated)')
-    path_parser.add_argument('-s', '--starting', metavar='EFFECTS', nargs='*', default=[],
-                       help='Start with these effects (optional, comma-separated or space-separated)')
-    path_parser.add_argument('-l', '--list', action='store_true',
-                       help='List all available effects with their numbers')
+    parser = build_main_parser()
     
-    # Optimizer mode (Mode 2)
-    optimize_parser = setup_optimizer_parser(subparsers)
-    
-    # Parse arguments
+    # Parse arguments before loading anything, so --help stays instant
     args = parser.parse_args()
     
     # Handle different modes
@@ -51,14 +25,31 @@ def main():
         # Show help when no mode is specified
         parser.print_help()
         return
-        
+    
+    # Forward the query to a running daemon, which has data and results warm
+    if not args.no_daemon:
+        from src.server.client import forward_cli
+        response = forward_cli(sys.argv[1:])
+        if response is not None:
+            sys.stdout.write(response.get('stdout', ''))
+            if response['status'] != 'ok':
+                print(f"Error: {response['reason']}", file=sys.stderr)
+                sys.exit(1)
+            return
+    
+    # Data sections and subsystems are loaded on first use by each mode
+    from src.data.loader import load_all_data
+    data = load_all_data()
+    
     if args.mode == '1':
         # Pathfinder mode
+        from src.cli.pathfinder_cli import run_pathfinder
         run_pathfinder(args, data)
     
     elif args.mode == '2':
         # Optimizer mode
+        from src.cli.optimizer_cli import run_optimizer
         run_optimizer(args, data)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
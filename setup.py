@@ -23,6 +23,10 @@ setup(
         "pyyaml>=6.0",
         "click>=8.0.0",
     ],
+    extras_require={
+        # Vectorized scoring of state batches (src.engine.scoring)
+        "fast": ["numpy"],
+    },
     entry_points={
         "console_scripts": [
             "pathfinder=src.cli.cli:cli",
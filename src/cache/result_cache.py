@@ -0,0 +1,357 @@
+"""
+Persistent, content-addressed cache for optimizer and pathfinder results.
+
+Results are stored in a local SQLite file keyed by a hash of the normalized job
+parameters and a fingerprint of the ``data/*.yaml`` files, so editing any data
+file invalidates every cached result automatically. The cache is safe to share
+between the worker processes of a batch run.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from src.data.loader import data_fingerprint
+from src.engine.constraints import SearchConstraints
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Environment variable naming a cache file to use when no --cache option is given
+CACHE_ENV_VAR = 'PATHFINDER_CACHE'
+
+# Stores between re-reading the total size from the database, which picks up
+# what other processes sharing the cache have stored meanwhile
+SIZE_CHECK_INTERVAL = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats (name, value) VALUES ('hits', 0), ('misses', 0), ('evictions', 0);
+"""
+
+
+def normalize_job(kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce job parameters to the fields that determine the result.
+
+    Effect lists are sorted and production options are filled in with the
+    defaults used by the optimizer, so equivalent jobs share a cache entry.
+    Constraints (see ``SearchConstraints``) are included when any are set,
+    and a path search strategy other than 'auto' (strategies may pick
+    different paths of the same length).
+
+    Args:
+        kind: Job kind, either 'optimize' or 'path'
+        params: Job parameters as found in a batch file
+
+    Returns:
+        Normalized parameter dictionary
+
+    Raises:
+        ValueError: If the job kind is unknown
+    """
+    # Jobs without constraints keep the keys they had before constraints existed
+    constraints = SearchConstraints.from_dict(params.get('constraints')).to_dict()
+    if kind == 'path':
+        normalized = {
+            'desired_effects': sorted(set(params['desired_effects'])),
+            'initial_effects': sorted(set(params.get('initial_effects', []))),
+        }
+        if constraints:
+            normalized['constraints'] = constraints
+        if params.get('strategy', 'auto') != 'auto':
+            normalized['strategy'] = params['strategy']
+        return normalized
+    if kind == 'optimize':
+        drug_type = params['drug_type']
+        prod_options = params.get('prod_options', {})
+        options = {
+            'grow_tent': bool(prod_options.get('grow_tent', False)),
+            'pgr': bool(prod_options.get('pgr', False)),
+        }
+        if drug_type == 'marijuana':
+            options['strain'] = prod_options.get('strain', 'og_kush')
+        elif drug_type == 'meth':
+            options['quality'] = prod_options.get('quality', 3)
+        normalized = {
+            'drug_type': drug_type,
+            'depth': params.get('depth', 3),
+            'initial_effects': sorted(set(params.get('initial_effects', []))),
+            'prod_options': options,
+        }
+        if constraints:
+            normalized['constraints'] = constraints
+        return normalized
+    raise ValueError(f"Unknown job kind: {kind}")
+
+
+class ResultCache:
+    """SQLite-backed result cache with size-based LRU eviction.
+
+    Attributes:
+        path: Path of the SQLite database file
+        max_bytes: Maximum total size of stored results before eviction
+        data_dir: Directory of the YAML data files
+        fingerprint: Fingerprint of the data files the cached results depend on
+        hits: Number of cache hits in this process
+        misses: Number of cache misses in this process
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 data_dir: str = 'data'):
+        """Open (and create if needed) a result cache.
+
+        Args:
+            path: Path of the SQLite database file
+            max_bytes: Maximum total size of stored results before eviction
+            data_dir: Directory of the YAML data files to fingerprint
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.data_dir = data_dir
+        self.fingerprint = data_fingerprint(data_dir)
+        self.hits = 0
+        self.misses = 0
+        # Running total of stored bytes (None until first needed) and the
+        # stores since it was last read from the database
+        self._size: Optional[int] = None
+        self._puts = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Long-running callers may open the cache on one thread and use it from
+        # another; they must not use it from two threads at once
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def bind(self, fingerprint: str) -> 'BoundCache':
+        """Return a view of the cache bound to the fingerprint of some data.
+
+        Long-running processes that reload the data files hand each solver a
+        view bound to the data it was built from, so queries still running on
+        the old data neither read nor store results under the new fingerprint.
+
+        Args:
+            fingerprint: Fingerprint of the data the view's results depend on
+
+        Returns:
+            View sharing this cache's database and statistics
+        """
+        return BoundCache(self, fingerprint)
+
+    def key(self, kind: str, params: Dict[str, Any], fingerprint: Optional[str] = None) -> str:
+        """Compute the cache key for a job.
+
+        Args:
+            kind: Job kind, either 'optimize' or 'path'
+            params: Job parameters
+            fingerprint: Data fingerprint (default: the cache's fingerprint)
+
+        Returns:
+            Hex digest identifying the job and the data it runs against
+        """
+        payload = json.dumps(
+            {'kind': kind, 'params': normalize_job(kind, params), 'data': fingerprint or self.fingerprint},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, kind: str, params: Dict[str, Any],
+            fingerprint: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Look up the cached result for a job.
+
+        The returned record has its ``params`` replaced by the given parameters.
+
+        Args:
+            kind: Job kind, either 'optimize' or 'path'
+            params: Job parameters
+            fingerprint: Data fingerprint (default: the cache's fingerprint)
+
+        Returns:
+            The cached result record, or None on a miss
+        """
+        key = self.key(kind, params, fingerprint)
+        row = self._conn.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            self._bump('misses')
+            return None
+
+        self.hits += 1
+        with self._transaction():
+            self._bump('hits')
+            self._conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (time.time(), key))
+        result = json.loads(row[0])
+        if 'params' in result:
+            result['params'] = params
+        return result
+
+    def put(self, kind: str, params: Dict[str, Any], result: Dict[str, Any],
+            fingerprint: Optional[str] = None) -> None:
+        """Store the result of a job and evict old entries if over the size limit.
+
+        The size of the stored results is tracked as a running total, which is
+        re-read from the database every ``SIZE_CHECK_INTERVAL`` stores and
+        before evicting. Processes sharing the cache may therefore overshoot
+        the limit by what they store between checks.
+
+        Args:
+            kind: Job kind, either 'optimize' or 'path'
+            params: Job parameters
+            result: Result record to store (must be JSON serializable)
+            fingerprint: Data fingerprint (default: the cache's fingerprint)
+        """
+        value = json.dumps(result)
+        self._conn.execute(
+            'INSERT OR REPLACE INTO results (key, kind, value, size, accessed) VALUES (?, ?, ?, ?, ?)',
+            (self.key(kind, params, fingerprint), kind, value, len(value), time.time())
+        )
+        self._puts += 1
+        if self._size is None or self._puts >= SIZE_CHECK_INTERVAL:
+            self._size = self._stored_size()
+            self._puts = 0
+        else:
+            # Counts replaced entries twice, which only makes the next check come sooner
+            self._size += len(value)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache statistics.
+
+        Returns:
+            Dictionary with the number of entries, their total size in bytes,
+            lifetime hits/misses/evictions and the hits/misses of this process
+        """
+        entries, size = self._conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results'
+        ).fetchone()
+        totals = dict(self._conn.execute('SELECT name, value FROM stats').fetchall())
+        return {
+            'entries': entries,
+            'bytes': size,
+            'hits': totals.get('hits', 0),
+            'misses': totals.get('misses', 0),
+            'evictions': totals.get('evictions', 0),
+            'session_hits': self.hits,
+            'session_misses': self.misses,
+        }
+
+    def summary(self) -> str:
+        """Format the lifetime cache statistics as a single line."""
+        stats = self.stats()
+        return (f"{stats['entries']} entries ({stats['bytes'] / 1024:.1f} KiB), "
+                f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+
+    def clear(self) -> None:
+        """Remove all cached results and reset the statistics."""
+        self._conn.execute('DELETE FROM results')
+        self._conn.execute('UPDATE stats SET value = 0')
+        self._size = 0
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Run the enclosed statements as a single write transaction."""
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+    def _bump(self, name: str, amount: int = 1) -> None:
+        self._conn.execute('UPDATE stats SET value = value + ? WHERE name = ?', (amount, name))
+
+    def _stored_size(self) -> int:
+        return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        total = self._stored_size()
+        self._size = total
+        self._puts = 0
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        rows = self._conn.execute('SELECT key, size FROM results ORDER BY accessed').fetchall()
+        with self._transaction():
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                total -= size
+                evicted += 1
+            self._bump('evictions', evicted)
+        self._size = total
+
+
+class BoundCache:
+    """View of a ResultCache whose results depend on a fixed data fingerprint.
+
+    Lookups and stores use the view's fingerprint; everything else (statistics,
+    clearing, closing) goes to the underlying cache.
+
+    Attributes:
+        cache: The underlying ResultCache
+        fingerprint: Fingerprint of the data the view's results depend on
+    """
+
+    def __init__(self, cache: ResultCache, fingerprint: str):
+        self.cache = cache
+        self.fingerprint = fingerprint
+
+    def key(self, kind: str, params: Dict[str, Any]) -> str:
+        return self.cache.key(kind, params, self.fingerprint)
+
+    def get(self, kind: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self.cache.get(kind, params, self.fingerprint)
+
+    def put(self, kind: str, params: Dict[str, Any], result: Dict[str, Any]) -> None:
+        self.cache.put(kind, params, result, self.fingerprint)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.cache, name)
+
+
+_open_caches: Dict[Tuple[str, str, int], ResultCache] = {}
+
+
+def get_cache(path: Optional[str], max_bytes: int = DEFAULT_MAX_BYTES,
+              data_dir: str = 'data') -> Optional[ResultCache]:
+    """Return a per-process shared cache for the given path.
+
+    Args:
+        path: Path of the SQLite database file; None falls back to the
+              PATHFINDER_CACHE environment variable
+        max_bytes: Maximum total size of stored results before eviction
+        data_dir: Directory of the YAML data files to fingerprint
+
+    Returns:
+        The opened cache, or None if no cache path is configured
+    """
+    path = path or os.environ.get(CACHE_ENV_VAR)
+    if not path:
+        return None
+
+    key = (os.path.abspath(path), os.path.abspath(data_dir), os.getpid())
+    if key not in _open_caches:
+        _open_caches[key] = ResultCache(path, max_bytes, data_dir)
+    return _open_caches[key]
@@ -0,0 +1,168 @@
+"""
+Command-line parser setup shared by the entry points.
+
+This module only depends on argparse, so building the parser (and answering
+``--help``) does not import the engine, the result cache or the data files.
+"""
+import argparse
+
+
+def fmt_choices(items):
+    """Format a list of items as choices for command-line help."""
+    return " | ".join(f"{i+1}={item}" for i, item in enumerate(items))
+
+
+class CapitalizationHelpFormatter(argparse.HelpFormatter):
+    """Custom help formatter that capitalizes help text and improves formatting."""
+    
+    def __init__(self, prog):
+        super().__init__(prog, max_help_position=40, width=80)
+        
+    def _format_action(self, action):
+        if action.help and not action.help[0].isupper():
+            action.help = action.help[0].upper() + action.help[1:]
+        return super()._format_action(action)
+        
+    def _join_parts(self, part_strings):
+        for i, part in enumerate(part_strings):
+            if part.startswith('usage:'):
+                part_strings[i] = 'Usage:' + part[6:]
+            elif part.startswith('positional arguments'):
+                part_strings[i] = 'Positional Arguments:\n' + part.split('\n', 1)[1]
+            elif part.startswith('options'):
+                part_strings[i] = 'Options:\n' + part.split('\n', 1)[1]
+        return super()._join_parts(part_strings)
+
+
+def add_constraint_arguments(parser) -> None:
+    """Add the recipe constraint options shared by both modes."""
+    group = parser.add_argument_group('Constraints')
+    group.add_argument('--require', metavar='EFFECTS', nargs='+',
+                       help='Effects the result must have')
+    group.add_argument('--forbid', metavar='EFFECTS', nargs='+',
+                       help='Effects the result must not have')
+    group.add_argument('--only', metavar='INGREDIENTS', nargs='+',
+                       help='Use only these ingredients (comma-separated or quoted names)')
+    group.add_argument('--ban', metavar='INGREDIENTS', nargs='+',
+                       help='Never use these ingredients (comma-separated or quoted names)')
+    group.add_argument('--max-cost', type=float, metavar='N',
+                       help='Maximum total ingredient cost')
+    group.add_argument('--max-ingredients', type=int, metavar='N',
+                       help='Maximum number of ingredients')
+
+
+def setup_optimizer_parser(subparsers):
+    """Set up the command-line parser for the optimizer mode.
+    
+    Args:
+        subparsers: Subparsers object from the main parser
+        
+    Returns:
+        The created subparser for the optimizer mode
+    """
+    # Create the optimizer subparser
+    parser = subparsers.add_parser(
+        '2', 
+        help='Find the most profitable drug recipe',
+        description='Drug Optimizer - Find the most profitable combination of ingredients',
+        formatter_class=CapitalizationHelpFormatter
+    )
+    
+    # Add drug type as a flag
+    parser.add_argument('-t', '--type', type=int, required=True, metavar='N',
+                        help='Drug type (1=marijuana, 2=meth, 3=cocaine)')
+    
+    # Production options
+    prod = parser.add_argument_group('Production')
+    prod.add_argument('-d', '--depth', type=int, default=3, metavar='N',
+                      help='Search depth (default: 3)')
+    prod.add_argument('-g', '--grow-tent', action='store_true', 
+                      help='Use grow tent')
+    prod.add_argument('-p', '--pgr', action='store_true', 
+                      help='Use plant growth regulators')
+    
+    # Marijuana options
+    m_opts = parser.add_argument_group('Marijuana')
+    m_opts.add_argument('-s', '--strain', type=int, default=1, metavar='N',
+                        help='Strain (1=og_kush, 2=sour_diesel, etc.)')
+    
+    # Meth options
+    me_opts = parser.add_argument_group('Meth')
+    me_opts.add_argument('-q', '--quality', type=int, choices=range(1, 4),
+                         default=3, help='Quality: 1=low | 2=medium | 3=high (default: 3)')
+    
+    parser.add_argument('--cache', metavar='PATH',
+                        help='Persistent result cache file (default: $PATHFINDER_CACHE)')
+    parser.add_argument('--sensitivity', action='store_true',
+                        help='Show how far each price can move before the best recipe changes')
+    parser.add_argument('--pareto', action='store_true',
+                        help='List the recipes trading off profit, length and ingredient cost')
+    parser.add_argument('--stats', action='store_true',
+                        help='Show how much work the search did')
+    parser.add_argument('--memory-limit', type=float, metavar='MB',
+                        help='Search in bounded memory (depth-first) once the search would use more '
+                             'than this (default: $PATHFINDER_MEMORY_LIMIT, unlimited)')
+    parser.add_argument('--external-dir', nargs='?', const='', metavar='DIR',
+                        help='Keep the search on disk in DIR (default: the system temporary directory), '
+                             'for depths whose search does not fit in memory')
+    add_constraint_arguments(parser)
+    
+    return parser
+
+
+def setup_pathfinder_mode_parser(subparsers):
+    """Set up the command-line parser for the pathfinder mode.
+    
+    Args:
+        subparsers: Subparsers object from the main parser
+        
+    Returns:
+        The created subparser for the pathfinder mode
+    """
+    parser = subparsers.add_parser(
+        '1', 
+        help='Find a path to desired effects',
+        description='Find a sequence of ingredients to achieve desired effects',
+        formatter_class=CapitalizationHelpFormatter
+    )
+    parser.add_argument('-d', '--desired', metavar='EFFECTS', nargs='+',
+                        help='Specify effects to achieve (names or numbers, comma-separated or space-separated)')
+    parser.add_argument('-s', '--starting', metavar='EFFECTS', nargs='*', default=[],
+                        help='Start with these effects (optional, comma-separated or space-separated)')
+    parser.add_argument('-l', '--list', action='store_true',
+                        help='List all available effects with their numbers')
+    parser.add_argument('--cache', metavar='PATH',
+                        help='Persistent result cache file (default: $PATHFINDER_CACHE)')
+    parser.add_argument('--stats', action='store_true',
+                        help='Show how much work the search did')
+    parser.add_argument('--strategy', choices=('bfs', 'iddfs', 'auto'), default='auto',
+                        help='Breadth-first search, iterative deepening in bounded memory, or pick by '
+                             'the number of missing effects (default: auto)')
+    add_constraint_arguments(parser)
+    
+    return parser
+
+
+def build_main_parser():
+    """Build the command-line parser of main.py.
+    
+    Returns:
+        Parser with the pathfinder (1) and optimizer (2) modes
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=CapitalizationHelpFormatter,
+        description='Pathfinder - Find optimal ingredient combinations and drug recipes',
+    )
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Run locally even if a query daemon is running')
+    
+    # Create subparsers for different modes
+    subparsers = parser.add_subparsers(dest='mode', help='Operation mode')
+    
+    # Pathfinder mode (Mode 1)
+    setup_pathfinder_mode_parser(subparsers)
+    
+    # Optimizer mode (Mode 2)
+    setup_optimizer_parser(subparsers)
+    
+    return parser
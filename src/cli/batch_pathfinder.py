@@ -1,60 +1,129 @@
 """
 Batch runner for pathfinder jobs.
 Reads a JSON file containing a list of pathfinder jobs (desired_effects, initial_effects),
-runs each job, and saves the results to a JSON file.
+or a JSONL file with one job per line, runs each job, and saves the results to a JSON
+(or JSONL) file. JSONL batches are streamed with a bounded number of in-flight jobs.
+Large batches can be split across hosts with --shard i/n or a shared --work-dir
+(see src/parallel/work_queue.py); combine the outputs with src.cli.merge_results.
+With --trace DIR (and --profile) the run is traced, see src/utils/tracing.py.
 """
-import json
-import os
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
+from src.cache.result_cache import DEFAULT_MAX_BYTES, get_cache
 from src.data.loader import load_all_data
-from src.engine.core import Engine
-from src.engine.pathfinder import find_path
-from src.utils.parser import parse_effects
-
-def process_pathfinder_job(job, data):
-    desired_effects = set(job['desired_effects'])
-    initial_effects = set(job.get('initial_effects', []))
-    engine = Engine(data['combinations'], data['max_effects'], data['effect_priorities'])
-    path = find_path(engine, desired_effects, initial_effects)
-    if path:
-        current_effects = list(initial_effects)
-        for ingredient in path:
-            current_effects = engine.combine(current_effects, ingredient)
-        final_effects = set(current_effects)
-        return {
-            'status': 'ok',
-            'params': job,
-            'effects': sorted(list(final_effects)),
-            'path': path
-        }
-    else:
-        return {
-            'status': 'fail',
-            'params': job,
-            'reason': 'No solution found.'
-        }
-
-def run_batch_pathfinder(batch_path: str, results_path: str = None, jobs: int = 4):
-    with open(batch_path, 'r') as f:
-        batch_jobs = json.load(f)
-    data = load_all_data()
-    results = []
-    with ProcessPoolExecutor(max_workers=jobs) as executor:
-        futures = [executor.submit(process_pathfinder_job, job, data) for job in batch_jobs]
-        for future in as_completed(futures):
-            result = future.result()
-            results.append(result)
+from src.engine.solver import get_solver
+from src.parallel.batch_io import (BatchProgress, count_batch_jobs, default_results_path, failure_record,
+                                   iter_batch_jobs, open_results, submit_bounded)
+from src.parallel.supervisor import SupervisedPool, WorkerLimits, add_limit_arguments, limits_from_args
+from src.parallel.work_queue import WorkQueue, add_distribution_arguments, default_worker_id, shard_jobs, shard_name
+from src.utils.tracing import add_trace_arguments, job_span, span, trace_from_args, write_trace
+
+def process_pathfinder_job(job, data, cache_path=None, cache_size=DEFAULT_MAX_BYTES, solver=None, stats=False):
+    solver = solver or get_solver(data, cache_path, cache_size)
+    result = solver.path(job['desired_effects'], job.get('initial_effects', []), job.get('constraints'), stats,
+                         strategy=job.get('strategy', 'auto'))
+    return dict(result, params=job)
+
+def process_batch_job(job, data, cache_path=None, cache_size=DEFAULT_MAX_BYTES):
+    """Run one batch job; batch records always carry the search counters."""
+    with job_span('path', job) as trace:
+        result = process_pathfinder_job(job, data, cache_path, cache_size, stats=True)
+        trace['status'] = result['status']
+    return result
+
+def iter_job_results(batch_jobs, data, jobs, window, cache_path, cache_size, limits=None):
+    if limits is None or not limits.active:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for future in submit_bounded(executor, process_batch_job, batch_jobs, window,
+                                         data, cache_path, cache_size):
+                yield future.result()
+        return
+
+    with SupervisedPool(jobs, limits) as pool:
+        for outcome in pool.imap_unordered(process_batch_job, batch_jobs, data, cache_path, cache_size):
+            if outcome.status == 'ok':
+                yield outcome.value
+            else:
+                yield failure_record(outcome.item, outcome.status, outcome.value)
+
+def run_pathfinder_jobs(batch_jobs, writer, data, jobs=4, window=None, cache_path=None,
+                        cache_size=DEFAULT_MAX_BYTES, limits=None, progress=None):
+    window = window or jobs * 4
+    for result in iter_job_results(batch_jobs, data, jobs, window, cache_path, cache_size, limits):
+        if result['status'] in ('timeout', 'oom', 'error'):
+            print(f"[{result['status'].upper()}] {result['params']} -> {result['reason']}")
+        with span('write result', 'io'):
+            writer.write(result)
+        if progress:
+            progress.update()
+
+def run_batch_pathfinder(batch_path: str, results_path: str = None, jobs: int = 4,
+                         window: int = None, cache_path: str = None,
+                         cache_size: int = DEFAULT_MAX_BYTES, limits: WorkerLimits = None,
+                         shard=None):
     if results_path is None:
-        results_path = os.path.join(os.path.dirname(batch_path), 'parallel_pathfinder_results.json')
-    with open(results_path, 'w') as f:
-        json.dump(results, f, indent=2)
-    print(f"All pathfinder results saved to {results_path}")
+        results_path = default_results_path(batch_path, shard_name('parallel_pathfinder_results', shard))
+    batch_jobs = iter_batch_jobs(batch_path)
+    if shard:
+        batch_jobs = shard_jobs(batch_jobs, *shard)
+    data = load_all_data()
+    progress = BatchProgress(count_batch_jobs(batch_path, shard))
+    with span('run_batch_pathfinder', 'batch', batch=batch_path, jobs=jobs):
+        with open_results(results_path) as writer:
+            run_pathfinder_jobs(batch_jobs, writer, data, jobs, window, cache_path, cache_size, limits, progress)
+    print(f"All pathfinder results saved to {results_path} ({progress.rate():.2f} jobs/s)")
+    cache = get_cache(cache_path, cache_size)
+    if cache:
+        print(f"Cache: {cache.summary()}")
+    trace_path = write_trace()
+    if trace_path:
+        print(f"Trace: {trace_path}")
+
+def run_pathfinder_queue_worker(work_dir: str, jobs: int = 4, window: int = None,
+                                cache_path: str = None, cache_size: int = DEFAULT_MAX_BYTES,
+                                limits: WorkerLimits = None, worker_id: str = None,
+                                requeue_after: float = None):
+    queue = WorkQueue(work_dir)
+    worker_id = worker_id or default_worker_id()
+    data = load_all_data()
+    progress = BatchProgress()
+    tasks = queue.drain(
+        worker_id,
+        lambda batch_jobs, writer: run_pathfinder_jobs(batch_jobs, writer, data, jobs, window,
+                                                       cache_path, cache_size, limits, progress),
+        requeue_after
+    )
+    print(f"Processed {tasks} tasks, results appended to {queue.results_path(worker_id)}")
+    trace_path = write_trace()
+    if trace_path:
+        print(f"Trace: {trace_path}")
 
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser(description='Batch Pathfinder Runner')
-    parser.add_argument('--batch', type=str, required=True, help='Path to batch parameter JSON file')
-    parser.add_argument('--results', type=str, default=None, help='Path to save results JSON file (default: in same dir as batch)')
+    parser.add_argument('--batch', type=str, default=None, help='Path to batch parameter JSON or JSONL file (required unless running from --work-dir)')
+    parser.add_argument('--results', type=str, default=None, help='Path to save results JSON/JSONL/.npz file (default: in same dir as batch)')
     parser.add_argument('--jobs', type=int, default=4, help='Number of parallel worker processes (default: 4)')
+    parser.add_argument('--window', type=int, default=None, help='Maximum number of in-flight jobs (default: 4 per worker)')
+    parser.add_argument('--cache', type=str, default=None, help='Path to a persistent result cache (default: $PATHFINDER_CACHE)')
+    parser.add_argument('--cache-size', type=int, default=256, help='Maximum result cache size in MB (default: 256)')
+    add_limit_arguments(parser)
+    add_distribution_arguments(parser)
+    add_trace_arguments(parser)
     args = parser.parse_args()
-    run_batch_pathfinder(args.batch, args.results, jobs=args.jobs)
+    trace_from_args(parser, args)
+    options = dict(jobs=args.jobs, window=args.window, cache_path=args.cache,
+                   cache_size=args.cache_size * 1024 * 1024, limits=limits_from_args(args))
+    if args.enqueue:
+        if not (args.batch and args.work_dir):
+            parser.error('--enqueue requires --batch and --work-dir')
+        count = WorkQueue(args.work_dir).enqueue(iter_batch_jobs(args.batch), args.queue_chunk)
+        print(f"Enqueued {count} pathfinder jobs in {args.work_dir}")
+    elif args.work_dir:
+        if args.batch:
+            parser.error('use --enqueue to add --batch to --work-dir, then run workers without --batch')
+        run_pathfinder_queue_worker(args.work_dir, worker_id=args.worker_id,
+                                    requeue_after=args.requeue_after, **options)
+    elif args.batch:
+        run_batch_pathfinder(args.batch, args.results, shard=args.shard, **options)
+    else:
+        parser.error('--batch is required unless running from --work-dir')
@@ -0,0 +1,30 @@
+"""
+CLI entry point for merging sharded batch results.
+
+Usage:
+    python -m src.cli.merge_results batch_jobs/*.shard-*-of-4.jsonl --output batch_jobs/results.json
+    python -m src.cli.merge_results /shared/run1/results --output batch_jobs/results.jsonl
+    python -m src.cli.merge_results /shared/run1/results --output batch_jobs/results.npz
+
+Inputs may be result files (JSON, JSONL or columnar .npz) or directories containing them, such as the
+results directory of a shared work directory. The core logic is in src.parallel.work_queue.
+"""
+import argparse
+from src.parallel.work_queue import merge_results
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge sharded batch results')
+    parser.add_argument('inputs', nargs='+', help='Result files or directories of result files')
+    parser.add_argument('--output', type=str, required=True, help='Path of the merged results JSON/JSONL/.npz file')
+    parser.add_argument('--keep-duplicates', action='store_true',
+                        help='Keep the repeated results of requeued work-directory tasks')
+    parser.add_argument('--dedupe-params', action='store_true',
+                        help='Keep only the first result for identical job parameters, even of different jobs')
+    args = parser.parse_args()
+
+    count = merge_results(args.inputs, args.output, dedupe=not args.keep_duplicates,
+                          dedupe_params=args.dedupe_params)
+    print(f"Merged {count} results into {args.output}")
+
+if __name__ == '__main__':
+    main()
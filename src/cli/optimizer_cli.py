@@ -1,79 +1,9 @@
-import argparse
-from typing import Dict, List, Tuple, Any
-from src.engine.core import Engine
-from src.engine.optimizer import (
-    calculate_units, calculate_cost, find_best_path, get_effects_value
-)
-
-
-def fmt_choices(items):
-    """Format a list of items as choices for command-line help."""
-    return " | ".join(f"{i+1}={item}" for i, item in enumerate(items))
-
-
-class CapitalizationHelpFormatter(argparse.HelpFormatter):
-    """Custom help formatter that capitalizes help text and improves formatting."""
-    
-    def __init__(self, prog):
-        super().__init__(prog, max_help_position=40, width=80)
-        
-    def _format_action(self, action):
-        if action.help and not action.help[0].isupper():
-            action.help = action.help[0].upper() + action.help[1:]
-        return super()._format_action(action)
-        
-    def _join_parts(self, part_strings):
-        for i, part in enumerate(part_strings):
-            if part.startswith('usage:'):
-                part_strings[i] = 'Usage:' + part[6:]
-            elif part.startswith('positional arguments'):
-                part_strings[i] = 'Positional Arguments:\n' + part.split('\n', 1)[1]
-            elif part.startswith('options'):
-                part_strings[i] = 'Options:\n' + part.split('\n', 1)[1]
-        return super()._join_parts(part_strings)
-
-
-def setup_optimizer_parser(subparsers):
-    """Set up the command-line parser for the optimizer mode.
-    
-    Args:
-        subparsers: Subparsers object from the main parser
-        
-    Returns:
-        The created subparser for the optimizer mode
-    """
-    # Create the optimizer subparser
-    parser = subparsers.add_parser(
-        '2', 
-        help='Find the most profitable drug recipe',
-        description='Drug Optimizer - Find the most profitable combination of ingredients',
-        formatter_class=CapitalizationHelpFormatter
-    )
-    
-    # Add drug type as a flag
-    parser.add_argument('-t', '--type', type=int, required=True, metavar='N',
-                        help='Drug type (1=marijuana, 2=meth, 3=cocaine)')
-    
-    # Production options
-    prod = parser.add_argument_group('Production')
-    prod.add_argument('-d', '--depth', type=int, default=3, metavar='N',
-                      help='Search depth (default: 3)')
-    prod.add_argument('-g', '--grow-tent', action='store_true', 
-                      help='Use grow tent')
-    prod.add_argument('-p', '--pgr', action='store_true', 
-                      help='Use plant growth regulators')
-    
-    # Marijuana options
-    m_opts = parser.add_argument_group('Marijuana')
-    m_opts.add_argument('-s', '--strain', type=int, default=1, metavar='N',
-                        help='Strain (1=og_kush, 2=sour_diesel, etc.)')
-    
-    # Meth options
-    me_opts = parser.add_argument_group('Meth')
-    me_opts.add_argument('-q', '--quality', type=int, choices=range(1, 4),
-                         default=3, help='Quality: 1=low | 2=medium | 3=high (default: 3)')
-    
-    return parser
+from typing import Dict, List, Tuple, Any, Optional
+from src.cache.result_cache import get_cache
+from src.cli.arguments import CapitalizationHelpFormatter, fmt_choices, setup_optimizer_parser
+from src.engine.solver import Solver, memory_limit_bytes
+from src.utils.cli_helpers import execute_with_progress, print_search_stats
+from src.utils.parser import parse_constraints
 
 
 def setup_marijuana_options(args, data: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
@@ -155,51 +85,6 @@ def setup_cocaine_options(args, data: Dict[str, Any]) -> Tuple[List[str], Dict[s
     return initial_effects, options
 
 
-def calculate_drug_cost(drug_type: str, options: Dict[str, Any], data: Dict[str, Any]) -> float:
-    """Calculate the production cost for a drug.
-    
-    Args:
-        drug_type: Type of drug being produced
-        options: Dictionary of options for cost calculation
-        data: Dictionary containing all loaded data
-        
-    Returns:
-        Production cost per unit
-    """
-    # Get common parameters
-    constants = data['drug_pricing']['constants']
-    cost_formula = data['drug_pricing']['cost_calculations'][drug_type]['formula']
-    
-    # Calculate units based on grow tent and pgr options
-    units = calculate_units(
-        drug_type, 
-        options.get('grow_tent', False), 
-        options.get('pgr', False), 
-        data['drug_pricing']['production_units']
-    )
-    
-    # Set up keyword arguments based on drug type
-    kwargs = {'units': units}
-    
-    if drug_type == 'marijuana':
-        kwargs.update({
-            'strain': options.get('strain', 'og_kush'),
-            'strain_data': data['strain_data']
-        })
-    elif drug_type == 'meth':
-        kwargs.update({
-            'quality': options.get('quality', 3),
-            'quality_costs': data['quality_costs']
-        })
-    elif drug_type == 'cocaine':
-        kwargs.update({
-            'ingredient_prices': data['ingredient_prices']
-        })
-    
-    # Calculate the production cost
-    return calculate_cost(drug_type, constants, cost_formula, **kwargs)
-
-
 def print_optimization_results(drug_type: str, effects: List[str], path: List[str], 
                               ingredient_cost: float, prod_cost: float, base_price: float,
                               effect_multipliers: Dict[str, float]) -> None:
@@ -232,12 +117,51 @@ def print_optimization_results(drug_type: str, effects: List[str], path: List[st
     print(f"Recipe: {' → '.join(path)}")
 
 
-def run_optimizer(args, data: Dict[str, Any]) -> None:
+def print_sensitivity(intervals: List[Dict[str, Any]]) -> None:
+    """Print the price intervals over which the best recipe stays optimal.
+    
+    Args:
+        intervals: Sensitivity entries of an optimizer result record
+    """
+    from src.utils.cli_helpers import format_path, print_table
+    
+    rows = []
+    for interval in intervals:
+        upper = f"${interval['upper']:.2f}" if interval['upper'] is not None else 'unbounded'
+        rows.append([
+            interval['parameter'],
+            f"${interval['value']:.2f}",
+            f"${interval['lower']:.2f} - {upper}",
+            format_path(interval['below']) if interval['below'] else '-',
+            format_path(interval['above']) if interval['above'] else '-',
+        ])
+    print("\nPrice Sensitivity (range over which the recipe stays optimal):")
+    print_table(['Price', 'Current', 'Range', 'Best Below Range', 'Best Above Range'], rows)
+
+
+def print_pareto_frontier(frontier: List[Dict[str, Any]]) -> None:
+    """Print the recipes on the profit/length/ingredient cost frontier.
+    
+    Args:
+        frontier: Frontier entries of an optimizer result record
+    """
+    from src.utils.cli_helpers import format_path, print_table
+    
+    print("\nPareto Frontier (no other recipe is more profitable, shorter and cheaper):")
+    print_table(['Profit', 'Ingredients', 'Ingredient Cost', 'Recipe'], [
+        [f"${entry['profit']:.2f}", len(entry['path']), f"${entry['ingredient_cost']:.2f}",
+         format_path(entry['path']) or '(none)']
+        for entry in frontier
+    ])
+
+
+def run_optimizer(args, data: Dict[str, Any], solver: Optional[Solver] = None) -> None:
     """Run the optimizer with the given arguments.
     
     Args:
         args: Command-line arguments
         data: Dictionary containing all loaded data
+        solver: Optional long-lived solver to reuse (default: built from data)
     """
     # Map numeric drug type to string
     drug_types = data['drug_types']
@@ -251,27 +175,55 @@ def run_optimizer(args, data: Dict[str, Any]) -> None:
     else:  # cocaine
         initial_effects, options = setup_cocaine_options(args, data)
     
-    # Calculate production cost
-    prod_cost = calculate_drug_cost(drug_type, options, data)
-    
-    # Get base price for the drug
-    base_price = data['drug_pricing']['base_prices'][drug_type]
-    
-    # Create engine
-    engine = Engine(data['combinations'], data['max_effects'], data['effect_priorities'])
-    
-    # Find the best path
-    result = find_best_path(
-        engine, base_price, prod_cost, args.depth,
-        data['effect_multipliers'], data['ingredient_prices'], data['effect_priorities'],
-        initial_effects
-    )
+    # The solver owns the engine, production costs and result cache
+    solver = solver or Solver(data, get_cache(getattr(args, 'cache', None)),
+                              memory_limit=memory_limit_bytes(getattr(args, 'memory_limit', None)),
+                              external_dir=getattr(args, 'external_dir', None))
+    prod_cost = solver.production_cost(drug_type, options)
+    base_price = solver.base_prices[drug_type]
+    
+    job = {
+        'drug_type': drug_type,
+        'depth': args.depth,
+        'initial_effects': initial_effects,
+        'prod_options': options
+    }
+    sensitivity = getattr(args, 'sensitivity', False)
+    pareto = getattr(args, 'pareto', False)
+    try:
+        constraints = parse_constraints(args, data) if hasattr(args, 'require') else {}
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    if constraints:
+        if sensitivity or pareto:
+            print("Error: --sensitivity and --pareto cannot be combined with constraints.")
+            return
+        job['constraints'] = constraints
+    if sensitivity:
+        result = solver.sensitivity(job)
+    elif pareto:
+        result = solver.pareto(job)
+    else:
+        result = execute_with_progress(solver.optimize, job, stats=getattr(args, 'stats', False))
     
-    if result:
-        effects, path, ingredient_cost = result
+    if result['status'] == 'ok':
         print_optimization_results(
-            drug_type, effects, path, ingredient_cost, 
+            drug_type, result['effects'], result['path'], result['ingredient_cost'],
             prod_cost, base_price, data['effect_multipliers']
         )
+        if sensitivity:
+            print_sensitivity(result['sensitivity'])
+        if pareto:
+            print_pareto_frontier(result.get('frontier') or solver.pareto(job)['frontier'])
+        if result.get('search_mode') == 'dfs':
+            print("Search exceeded the memory limit and finished depth-first in bounded memory.")
+        if 'stats' in result:
+            print_search_stats(result['stats'])
     else:
-        print(f"No profitable combination found for {drug_type} with depth {args.depth}")
+        if constraints:
+            print(f"No combination meeting the constraints found for {drug_type} with depth {args.depth}")
+        else:
+            print(f"No profitable combination found for {drug_type} with depth {args.depth}")
+        if 'stats' in result:
+            print_search_stats(result['stats'])
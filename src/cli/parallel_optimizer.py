@@ -3,25 +3,92 @@ CLI entry point for running batch optimizer jobs in parallel.
 
 Usage:
     python -m src.cli.parallel_optimizer --jobs 4 --batch batch_jobs/batch_params.json
+    python -m src.cli.parallel_optimizer --jobs 8 --window 64 --batch batch_jobs/huge_batch.jsonl
+    python -m src.cli.parallel_optimizer --jobs 8 --batch batch_jobs/huge_batch.jsonl --shard 2/4
+    python -m src.cli.parallel_optimizer --batch batch_jobs/huge_batch.jsonl --work-dir /shared/run1 --enqueue
+    python -m src.cli.parallel_optimizer --jobs 8 --work-dir /shared/run1
+    python -m src.cli.parallel_optimizer --batch batch_jobs/batch_params.json --reprice
 
 This script delegates the core logic to src.parallel.batch_optimizer for maintainability.
-Results will be saved to batch_jobs/parallel_optimizer_results.json by default.
+Results will be saved to batch_jobs/parallel_optimizer_results.json by default
+(parallel_optimizer_results.jsonl for JSONL batches); a --results path ending in .npz
+gets a columnar file that src.cli.query_results can filter and rank. With --trace DIR
+(and --profile) the run is traced, see src/utils/tracing.py.
 """
 import argparse
 import os
-from src.parallel.batch_optimizer import run_parallel_batch
+from src.engine.solver import EXTERNAL_DIR_ENV_VAR, MEMORY_LIMIT_ENV_VAR
+from src.parallel.batch_io import default_results_path, iter_batch_jobs
+from src.parallel.batch_optimizer import run_parallel_batch, run_queue_worker, run_reprice_batch
+from src.parallel.supervisor import add_limit_arguments, limits_from_args
+from src.parallel.work_queue import WorkQueue, add_distribution_arguments, shard_name
+from src.utils.tracing import add_trace_arguments, trace_from_args
 
 def main():
     parser = argparse.ArgumentParser(description='Parallel Drug Optimizer CLI')
     parser.add_argument('--jobs', type=int, default=4, help='Number of parallel jobs')
-    parser.add_argument('--batch', type=str, required=True, help='Path to batch parameter JSON file')
-    parser.add_argument('--results', type=str, default=None, help='Path to save results JSON file (default: in same dir as batch)')
+    parser.add_argument('--batch', type=str, default=None, help='Path to batch parameter JSON or JSONL file (required unless running from --work-dir)')
+    parser.add_argument('--results', type=str, default=None, help='Path to save results JSON/JSONL/.npz file (default: in same dir as batch)')
+    parser.add_argument('--window', type=int, default=None, help='Maximum number of in-flight jobs (default: 4 per worker)')
+    parser.add_argument('--cache', type=str, default=None, help='Path to a persistent result cache (default: $PATHFINDER_CACHE)')
+    parser.add_argument('--cache-size', type=int, default=256, help='Maximum result cache size in MB (default: 256)')
+    parser.add_argument('--memory-limit', type=float, metavar='MB',
+                        help='Per-job search memory before switching to a bounded depth-first search '
+                             '(default: $PATHFINDER_MEMORY_LIMIT, unlimited)')
+    parser.add_argument('--external-dir', nargs='?', const='', metavar='DIR',
+                        help='Run searches on disk in DIR (default: the system temporary directory)')
+    parser.add_argument('--schedule', action='store_true', help='Submit the longest predicted jobs first and chunk tiny jobs (reads the whole batch into memory)')
+    parser.add_argument('--timings', type=str, default=None, help='Timing history used by --schedule (default: optimizer_timings.json next to batch)')
+    parser.add_argument('--chunk-seconds', type=float, default=0.5, help='Chunk jobs predicted below this many seconds (default: 0.5, 0 disables)')
+    parser.add_argument('--reprice', action='store_true',
+                        help='Recompute results after price changes from saved state graphs instead of searching')
+    parser.add_argument('--graphs', type=str, default=None,
+                        help='Directory of saved state graphs used by --reprice (default: state_graphs next to batch)')
+    parser.add_argument('--top', type=int, default=1, help='Recipes reported per job with --reprice (default: 1)')
+    add_limit_arguments(parser)
+    add_distribution_arguments(parser)
+    add_trace_arguments(parser)
     args = parser.parse_args()
 
+    if args.enqueue:
+        if not (args.batch and args.work_dir):
+            parser.error('--enqueue requires --batch and --work-dir')
+        count = WorkQueue(args.work_dir).enqueue(iter_batch_jobs(args.batch), args.queue_chunk)
+        print(f"Enqueued {count} optimizer jobs in {args.work_dir}")
+        return
+
+    trace_from_args(parser, args)
+    if args.memory_limit:
+        # Workers build their solvers from the environment they inherit
+        os.environ[MEMORY_LIMIT_ENV_VAR] = str(args.memory_limit)
+    if args.external_dir is not None:
+        os.environ[EXTERNAL_DIR_ENV_VAR] = args.external_dir
+
+    options = dict(jobs=args.jobs, window=args.window,
+                   cache_path=args.cache, cache_size=args.cache_size * 1024 * 1024,
+                   schedule=args.schedule, chunk_seconds=args.chunk_seconds,
+                   limits=limits_from_args(args))
+
+    if args.work_dir:
+        if args.batch:
+            parser.error('use --enqueue to add --batch to --work-dir, then run workers without --batch')
+        timings_path = args.timings or os.path.join(args.work_dir, 'optimizer_timings.json')
+        run_queue_worker(args.work_dir, timings_path=timings_path, worker_id=args.worker_id,
+                         requeue_after=args.requeue_after, **options)
+        return
+
+    if not args.batch:
+        parser.error('--batch is required unless running from --work-dir')
     batch_path = args.batch
-    results_path = args.results or os.path.join(os.path.dirname(batch_path), 'parallel_optimizer_results.json')
+    results_path = args.results or default_results_path(batch_path, shard_name('parallel_optimizer_results', args.shard))
+    timings_path = args.timings or os.path.join(os.path.dirname(batch_path), 'optimizer_timings.json')
+
+    if args.reprice:
+        graph_dir = args.graphs or os.path.join(os.path.dirname(batch_path), 'state_graphs')
+        run_reprice_batch(batch_path, results_path, graph_dir, top=args.top)
+        return
 
-    run_parallel_batch(batch_path, results_path, jobs=args.jobs)
+    run_parallel_batch(batch_path, results_path, timings_path=timings_path, shard=args.shard, **options)
 
 if __name__ == '__main__':
     main()
@@ -1,8 +1,7 @@
 import argparse
 from typing import Dict, List, Set, Any, Optional
-from src.engine.core import Engine
-from src.engine.pathfinder import find_path
-from src.utils.parser import parse_effects
+from src.utils.cli_helpers import execute_with_progress, format_path, print_search_stats
+from src.utils.parser import parse_constraints, parse_effects
 
 
 def print_effects_list(effects: List[str]) -> None:
@@ -29,7 +28,7 @@ def print_path_result(path: List[str], effects: Set[str], desired_effects: Set[s
         return
     
     # Print the path
-    print(f"\nPath: {' \u2192 '.join(path)}")
+    print(f"\nPath: {format_path(path)}")
     
     # Print achieved effects
     print("\nAchieved effects:")
@@ -45,12 +44,13 @@ def print_path_result(path: List[str], effects: Set[str], desired_effects: Set[s
     print(f"Desired effects achieved: {len(effects.intersection(desired_effects))} / {len(desired_effects)}")
 
 
-def run_pathfinder(args, data: Dict[str, Any]) -> None:
+def run_pathfinder(args, data: Dict[str, Any], solver=None) -> None:
     """Run the pathfinder with the given arguments.
     
     Args:
         args: Command-line arguments
         data: Dictionary containing all loaded data
+        solver: Optional long-lived Solver to reuse (default: built from data)
     """
     # If list mode is enabled, just print the effects list and exit
     if args.list:
@@ -67,26 +67,27 @@ def run_pathfinder(args, data: Dict[str, Any]) -> None:
         print("Use --list to see available effects or check your input.")
         return
     
-    # Create the engine
-    engine = Engine(data['combinations'], data['max_effects'], data['effect_priorities'])
+    # Imported here so that listing effects does not load the engine or the cache
+    from src.cache.result_cache import get_cache
+    from src.engine.solver import Solver
     
-    # Find the path
-    path = find_path(engine, desired_effects, starting_effects)
+    # Find the path, or serve it from the persistent cache if we have seen this job before
+    solver = solver or Solver(data, get_cache(getattr(args, 'cache', None)))
+    try:
+        constraints = parse_constraints(args, data) if hasattr(args, 'require') else {}
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    result = execute_with_progress(solver.path, sorted(desired_effects), sorted(starting_effects),
+                                   constraints or None, getattr(args, 'stats', False),
+                                   strategy=getattr(args, 'strategy', 'auto'))
     
-    # If we found a path, determine the final effects
-    if path:
-        # Track effects at each step to ensure accuracy
-        current_effects = list(starting_effects)
-        for ingredient in path:
-            current_effects = engine.combine(current_effects, ingredient)
-        final_effects = set(current_effects)  # Convert to set for the print_path_result function
+    if result['status'] == 'ok':
+        print_path_result(result['path'], set(result['effects']), desired_effects)
     else:
-        final_effects = set()
         print("No solution found.")
-    
-    # Print the result only if we found a path
-    if path:
-        print_path_result(path, final_effects, desired_effects)
+    if 'stats' in result:
+        print_search_stats(result['stats'])
 
 
 def setup_pathfinder_parser(subparsers) -> None:
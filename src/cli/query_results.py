@@ -0,0 +1,86 @@
+"""
+CLI entry point for querying columnar batch results.
+
+Usage:
+    python -m src.cli.query_results batch_jobs/results.npz --columns
+    python -m src.cli.query_results batch_jobs/results.npz --where params.drug_type=meth --top 10
+    python -m src.cli.query_results batch_jobs/results.npz --where "profit>100" --where params.depth=5 \\
+        --by ingredient_cost --ascending --show params.drug_type,path,ingredient_cost,profit
+
+Conditions are COLUMN=VALUE, COLUMN!=VALUE or a comparison (<, <=, >, >=); values are
+read as JSON when possible (5, true, ["Cuke"]) and as plain text otherwise. Only the
+columns used are loaded. The core logic is in src.parallel.columnar.
+"""
+import argparse
+import json
+import operator
+import re
+from typing import Any, Callable, Tuple
+from src.parallel.columnar import ResultTable
+from src.utils.cli_helpers import format_path, print_table
+
+_OPERATORS = {'=': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+              '>': operator.gt, '>=': operator.ge}
+
+def parse_condition(text: str) -> Tuple[str, Callable[[Any], bool]]:
+    """Parse COLUMN<op>VALUE into the column and a predicate on its values."""
+    match = re.match(r'^([^<>=!]+?)\s*(!=|<=|>=|=|<|>)\s*(.*)$', text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid condition {text!r}, expected COLUMN=VALUE")
+    name, op, raw = match.groups()
+    try:
+        value = json.loads(raw)
+    except json.JSONDecodeError:
+        value = raw
+    compare = _OPERATORS[op]
+
+    def test(cell):
+        try:
+            return compare(cell, value)
+        except TypeError:
+            return False
+    return name, test
+
+def format_cell(value: Any) -> str:
+    if value is None:
+        return '-'
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return format_path(value)
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+def main():
+    parser = argparse.ArgumentParser(description='Filter and rank columnar batch results')
+    parser.add_argument('results', help='Path of a .npz results file')
+    parser.add_argument('--where', type=parse_condition, action='append', default=[], metavar='CONDITION',
+                        help='Keep rows meeting a condition, e.g. params.drug_type=meth or "profit>100" (repeatable)')
+    parser.add_argument('--by', type=str, default='profit', help='Column to rank by (default: profit)')
+    parser.add_argument('--ascending', action='store_true', help='Rank the smallest values first')
+    parser.add_argument('--top', type=int, default=20, help='Number of rows to show (default: 20, 0 for all)')
+    parser.add_argument('--show', type=str, default='params,path,profit',
+                        help='Comma-separated columns to show; a prefix such as params selects its '
+                             'nested columns (default: params,path,profit)')
+    parser.add_argument('--columns', action='store_true', help='List the columns of the file and exit')
+    args = parser.parse_args()
+
+    with ResultTable(args.results) as table:
+        if args.columns:
+            for name in table.columns:
+                print(name)
+            return
+        where = {}
+        for name, test in args.where:
+            previous = where.get(name)
+            where[name] = test if previous is None else (lambda cell, a=previous, b=test: a(cell) and b(cell))
+        try:
+            rows = table.select(where, args.by, not args.ascending, args.top or None)
+        except KeyError as e:
+            parser.error(e.args[0])
+        show = [name for prefix in args.show.split(',') for name in table.columns
+                if name == prefix or name.startswith(prefix + '.')]
+        print_table(show, [[format_cell(row.get(name)) for name in show] for row in table.rows(rows, show)])
+        print(f"\n{len(rows)} of {len(table)} results shown")
+
+if __name__ == '__main__':
+    main()
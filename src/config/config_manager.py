@@ -13,11 +13,15 @@ class ConfigManager:
                         If None, uses the default data directory.
         """
         self.config_dir = Path(config_dir) if config_dir else Path(__file__).parent.parent / "data"
+        # name -> (modification time in ns, configuration)
         self.config_cache = {}
         
     def load_config(self, name: str) -> Dict[str, Any]:
         """Load a configuration file by name.
         
+        Configurations are cached and re-read when the file's modification
+        time changes, so long-running processes pick up edited files.
+        
         Args:
             name: Name of the configuration file (without extension)
             
@@ -28,15 +32,16 @@ class ConfigManager:
             FileNotFoundError: If the configuration file doesn't exist
             ValueError: If the file format is invalid
         """
-        if name in self.config_cache:
-            return self.config_cache[name]
-            
         file_path = self.config_dir / f"{name}.yaml"
         
         try:
+            mtime = file_path.stat().st_mtime_ns
+            cached = self.config_cache.get(name)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
             with open(file_path, 'r') as f:
                 config = yaml.safe_load(f)
-                self.config_cache[name] = config
+                self.config_cache[name] = (mtime, config)
                 return config
         except FileNotFoundError:
             raise FileNotFoundError(f"Configuration file {file_path} not found")
@@ -1,42 +1,77 @@
-import yaml
+import hashlib
+import os
+import pickle
 from pathlib import Path
-from typing import List, Dict, Tuple, Any
+from collections.abc import Mapping
+from typing import List, Dict, Tuple, Any, Iterator, Optional
+from src.utils.tracing import span
 
-def load_effects_data() -> Tuple[int, List[str]]:
+# Snapshot of the parsed data, stored next to the YAML files
+CACHE_FILE = '.data_cache.pickle'
+CACHE_ENV_VAR = 'PATHFINDER_DATA_CACHE'
+_CACHE_VERSION = 2
+
+def load_yaml(path) -> Any:
+    """Parse a YAML file, using the C-accelerated loader when available.
+    
+    yaml is imported here rather than at module level, so that runs served
+    from the data cache do not pay for importing it.
+    
+    Args:
+        path: Path to the YAML file
+        
+    Returns:
+        Parsed YAML document
+    """
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(path, 'rb') as f:
+        return yaml.load(f, Loader=loader)
+
+def load_effects_data(data_dir: str = 'data') -> Tuple[int, List[str]]:
     """Load effects configuration from YAML file.
     
+    Args:
+        data_dir: Directory containing the YAML data files
+        
     Returns:
         Tuple containing:
         - Maximum number of effects allowed simultaneously
         - List of all possible effects
     """
-    with open(Path('data/effects.yaml'), 'r') as f:
-        data = yaml.safe_load(f)
+    data = load_yaml(Path(data_dir) / 'effects.yaml')
     return int(data['max_effects']), list(data['effects'])
 
-def load_effect_multipliers() -> Dict[str, float]:
+def load_effect_multipliers(data_dir: str = 'data') -> Dict[str, float]:
     """Load effect multipliers from YAML file.
     
+    Args:
+        data_dir: Directory containing the YAML data files
+        
     Returns:
         Dictionary mapping effect names to their value multipliers
     """
-    with open(Path('data/effect_multipliers.yaml'), 'r') as f:
-        data = yaml.safe_load(f)
+    data = load_yaml(Path(data_dir) / 'effect_multipliers.yaml')
     return dict(data['effect_multipliers'])
 
-def load_ingredient_prices() -> Dict[str, int]:
+def load_ingredient_prices(data_dir: str = 'data') -> Dict[str, int]:
     """Load ingredient prices from YAML file.
     
+    Args:
+        data_dir: Directory containing the YAML data files
+        
     Returns:
         Dictionary mapping ingredient names to their prices
     """
-    with open(Path('data/ingredient_prices.yaml'), 'r') as f:
-        data = yaml.safe_load(f)
+    data = load_yaml(Path(data_dir) / 'ingredient_prices.yaml')
     return dict(data['ingredient_prices'])
 
-def load_combinations_data() -> List[Tuple[str, str, str, str, str]]:
+def load_combinations_data(data_dir: str = 'data') -> List[Tuple[str, str, str, str, str]]:
     """Load ingredient combinations and their effects from YAML file.
     
+    Args:
+        data_dir: Directory containing the YAML data files
+        
     Returns:
         List of tuples, each containing:
         - base: Base ingredient name
@@ -45,8 +80,7 @@ def load_combinations_data() -> List[Tuple[str, str, str, str, str]]:
         - result_effect: Effect after combination
         - modifier_effect: Effect of the modifier ingredient
     """
-    with open(Path('data/combinations.yaml'), 'r') as f:
-        data = yaml.safe_load(f)
+    data = load_yaml(Path(data_dir) / 'combinations.yaml')
     return [(str(item.get('base', '')), str(item.get('base_effect', '')), 
              str(item.get('modifier', '')), str(item.get('result_effect', '')), 
              str(item.get('modifier_effect', ''))) for item in data['combinations']]
@@ -62,9 +96,12 @@ def get_effect_priorities(effects: List[str]) -> Dict[str, int]:
     """
     return {effect: idx for idx, effect in enumerate(effects)}
 
-def load_drug_types_data():
+def load_drug_types_data(data_dir: str = 'data'):
     """Load drug types configuration from YAML file.
     
+    Args:
+        data_dir: Directory containing the YAML data files
+        
     Returns:
         Tuple containing:
         - List of drug types
@@ -73,8 +110,7 @@ def load_drug_types_data():
         - List of quality names
         - List of quality costs
     """
-    with open(Path('data/drug_types.yaml'), 'r') as f:
-        data = yaml.safe_load(f)
+    data = load_yaml(Path(data_dir) / 'drug_types.yaml')
     
     strains_data = {}
     for strain, info in data['marijuana_strains'].items():
@@ -88,43 +124,220 @@ def load_drug_types_data():
         data['quality_costs']
     )
 
-def load_drug_pricing_data():
+def load_drug_pricing_data(data_dir: str = 'data'):
     """Load drug pricing configuration from YAML file.
     
+    Args:
+        data_dir: Directory containing the YAML data files
+        
     Returns:
         Dictionary containing drug pricing configuration
     """
-    with open(Path('data/drug_pricing.yaml'), 'r') as f:
-        data = yaml.safe_load(f)
+    data = load_yaml(Path(data_dir) / 'drug_pricing.yaml')
     return data
 
-def load_all_data() -> Dict[str, Any]:
-    """Load and process all required data.
+def data_fingerprint(data_dir: str = 'data') -> str:
+    """Compute a fingerprint of all YAML data files.
     
+    The fingerprint changes whenever any data file is added, removed or edited,
+    which makes it suitable as part of a cache key for computed results.
+    
+    Args:
+        data_dir: Directory containing the YAML data files
+        
     Returns:
-        Dictionary containing all loaded data
+        Hex digest over the names and contents of the data files
     """
-    max_effects, effects = load_effects_data()
-    effects_sorted = sorted(effects)
-    effect_priorities = get_effect_priorities(effects)
-    combinations = load_combinations_data()
-    effect_multipliers = load_effect_multipliers()
-    ingredient_prices = load_ingredient_prices()
-    drug_types, strain_data, meth_qualities, quality_names, quality_costs = load_drug_types_data()
-    drug_pricing = load_drug_pricing_data()
-    
+    digest = hashlib.sha256()
+    for path in sorted(Path(data_dir).glob('*.yaml')):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def _effects_section(data_dir: str) -> Dict[str, Any]:
+    max_effects, effects = load_effects_data(data_dir)
     return {
         'max_effects': max_effects,
         'effects': effects,
-        'effects_sorted': effects_sorted,
-        'effect_priorities': effect_priorities,
-        'combinations': combinations,
-        'effect_multipliers': effect_multipliers,
-        'ingredient_prices': ingredient_prices,
+        'effects_sorted': sorted(effects),
+        'effect_priorities': get_effect_priorities(effects),
+    }
+
+def _drug_types_section(data_dir: str) -> Dict[str, Any]:
+    drug_types, strain_data, meth_qualities, quality_names, quality_costs = load_drug_types_data(data_dir)
+    return {
         'drug_types': drug_types,
         'strain_data': strain_data,
         'meth_qualities': meth_qualities,
         'quality_names': quality_names,
         'quality_costs': quality_costs,
-        'drug_pricing': drug_pricing
-    }
\ No newline at end of file
+    }
+
+# Data sections: name -> (source file, loader, keys provided), in key order
+SECTIONS = {
+    'effects': ('effects.yaml', _effects_section,
+                ('max_effects', 'effects', 'effects_sorted', 'effect_priorities')),
+    'combinations': ('combinations.yaml',
+                     lambda data_dir: {'combinations': load_combinations_data(data_dir)},
+                     ('combinations',)),
+    'effect_multipliers': ('effect_multipliers.yaml',
+                           lambda data_dir: {'effect_multipliers': load_effect_multipliers(data_dir)},
+                           ('effect_multipliers',)),
+    'ingredient_prices': ('ingredient_prices.yaml',
+                          lambda data_dir: {'ingredient_prices': load_ingredient_prices(data_dir)},
+                          ('ingredient_prices',)),
+    'drug_types': ('drug_types.yaml', _drug_types_section,
+                   ('drug_types', 'strain_data', 'meth_qualities', 'quality_names', 'quality_costs')),
+    'drug_pricing': ('drug_pricing.yaml',
+                     lambda data_dir: {'drug_pricing': load_drug_pricing_data(data_dir)},
+                     ('drug_pricing',)),
+}
+
+KEY_SECTIONS = {key: name for name, (_, _, keys) in SECTIONS.items() for key in keys}
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    """Return (mtime_ns, size) of a file."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def _file_hash(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _read_cache(cache_path: str) -> Dict[str, Any]:
+    """Read the cached sections, returning an empty dict if the snapshot is unusable."""
+    try:
+        with open(cache_path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception:
+        # Unpickling a damaged or foreign file can raise almost anything; rebuild from YAML
+        return {}
+    if not isinstance(snapshot, dict) or snapshot.get('version') != _CACHE_VERSION:
+        return {}
+    sections = snapshot.get('sections')
+    return sections if isinstance(sections, dict) else {}
+
+def _write_cache(cache_path: str, sections: Dict[str, Any]) -> None:
+    # Write to a temporary file and rename, so concurrent readers never see a partial snapshot
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': _CACHE_VERSION, 'sections': sections}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Read-only data directory: run without the cache
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+class LazyData(Mapping):
+    """Read-only mapping of all data that loads each section on first access.
+    
+    Keys are the same as those of ``parse_all_data``. Accessing a key loads
+    only the section (YAML file) it comes from, so a run that lists effects
+    never reads the pricing or strain data.
+    
+    Each section is served from the pickle snapshot (``.data_cache.pickle``)
+    next to the YAML files while the modification time and size of its file
+    match; if only the modification time changed (for example after a
+    checkout), the file hash is compared before the file is re-parsed.
+    
+    Attributes:
+        data_dir: Directory containing the YAML data files
+        use_cache: Whether sections are read from and written to the snapshot
+    """
+    
+    def __init__(self, data_dir: str = 'data', use_cache: bool = True):
+        """Create the container without reading any files.
+        
+        Args:
+            data_dir: Directory containing the YAML data files
+            use_cache: Whether to use the snapshot
+        """
+        self.data_dir = data_dir
+        self.use_cache = use_cache
+        self._values: Dict[str, Any] = {}
+        self._snapshot: Optional[Dict[str, Any]] = None
+    
+    @property
+    def loaded_sections(self) -> List[str]:
+        """Names of the sections loaded so far."""
+        return [name for name, (_, _, keys) in SECTIONS.items() if keys[0] in self._values]
+    
+    def _load_section(self, name: str) -> None:
+        filename, loader, _ = SECTIONS[name]
+        if not self.use_cache:
+            self._values.update(loader(self.data_dir))
+            return
+        
+        path = os.path.join(self.data_dir, filename)
+        cache_path = os.path.join(self.data_dir, CACHE_FILE)
+        if self._snapshot is None:
+            self._snapshot = _read_cache(cache_path)
+        signature = _file_signature(path)
+        cached = self._snapshot.get(name)
+        if cached and cached['signature'] == signature:
+            self._values.update(cached['data'])
+            return
+        
+        digest = _file_hash(path)
+        if cached and cached['hash'] == digest:
+            section = cached['data']
+        else:
+            section = loader(self.data_dir)
+        # Merge with the sections other processes may have written meanwhile
+        self._snapshot = _read_cache(cache_path)
+        self._snapshot[name] = {'signature': signature, 'hash': digest, 'data': section}
+        _write_cache(cache_path, self._snapshot)
+        self._values.update(section)
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._values:
+            if key not in KEY_SECTIONS:
+                raise KeyError(key)
+            with span('load data', 'setup', section=KEY_SECTIONS[key]):
+                self._load_section(KEY_SECTIONS[key])
+        return self._values[key]
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(KEY_SECTIONS)
+    
+    def __len__(self) -> int:
+        return len(KEY_SECTIONS)
+    
+    def __reduce__(self):
+        # Worker processes receive the fully loaded data as a plain dict
+        return dict, (dict(self.items()),)
+
+def parse_all_data(data_dir: str = 'data') -> Dict[str, Any]:
+    """Parse and process all required data from the YAML files.
+    
+    Args:
+        data_dir: Directory containing the YAML data files
+        
+    Returns:
+        Dictionary containing all loaded data
+    """
+    data = {}
+    for _, loader, _ in SECTIONS.values():
+        data.update(loader(data_dir))
+    return data
+
+def load_all_data(data_dir: str = 'data', use_cache: Optional[bool] = None) -> LazyData:
+    """Load and process all required data.
+    
+    Sections are loaded on first access; see ``LazyData``.
+    
+    Args:
+        data_dir: Directory containing the YAML data files
+        use_cache: Whether to use the pickle snapshot. Defaults to True unless
+                   the PATHFINDER_DATA_CACHE environment variable is set to 0
+        
+    Returns:
+        Mapping containing all data
+    """
+    if use_cache is None:
+        use_cache = os.environ.get(CACHE_ENV_VAR, '1') != '0'
+    return LazyData(data_dir, use_cache)
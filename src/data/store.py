@@ -0,0 +1,139 @@
+"""
+Watched data store for long-running processes.
+
+``DataStore`` holds an immutable snapshot of the loaded data together with a
+``Solver`` built from it. A background thread polls the modification times of
+the YAML files; when they change, the data is reloaded and a new solver is
+built off to the side, then the snapshot reference is swapped in one
+assignment. Queries that grabbed the old snapshot finish on it, new queries
+see the new one, and a data file with errors leaves the current snapshot in
+place until it is fixed.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from src.data.loader import data_fingerprint, load_all_data
+from src.engine.solver import Solver
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+class DataSnapshot(NamedTuple):
+    """Data and solver loaded from one version of the data files.
+
+    Attributes:
+        version: Number of the snapshot, starting at 1 and increasing with each reload
+        data: Dictionary containing all loaded data
+        solver: Solver built from the data
+        signature: (name, mtime_ns, size) of each YAML file the data was loaded from
+    """
+    version: int
+    data: Dict[str, Any]
+    solver: Solver
+    signature: Tuple[Tuple[str, int, int], ...]
+
+
+def data_signature(data_dir: str = 'data') -> Tuple[Tuple[str, int, int], ...]:
+    """Return (name, mtime_ns, size) for every YAML file in the data directory."""
+    signature = []
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.yaml'):
+                stat = entry.stat()
+                signature.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(signature))
+
+
+class DataStore:
+    """Current data snapshot, reloaded in the background when data files change.
+
+    Attributes:
+        data_dir: Directory containing the YAML data files
+        poll_interval: Seconds between checks for changed files
+        cache: Optional result cache shared by every solver
+        last_error: Error of the last failed reload, or None
+    """
+
+    def __init__(self, data_dir: str = 'data', poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 cache=None):
+        """Load the initial snapshot.
+
+        Args:
+            data_dir: Directory containing the YAML data files
+            poll_interval: Seconds between checks for changed files
+            cache: Optional result cache; every solver gets a view of it
+                   bound to the fingerprint of the data it was built from
+        """
+        self.data_dir = data_dir
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self.last_error: Optional[str] = None
+        self._listeners: List[Callable[[DataSnapshot], None]] = []
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot = self._load(1)
+
+    @property
+    def snapshot(self) -> DataSnapshot:
+        """The current snapshot; hold on to it for the duration of a query."""
+        return self._snapshot
+
+    def on_reload(self, callback: Callable[[DataSnapshot], None]) -> None:
+        """Register a callback invoked with each new snapshot after it is swapped in."""
+        self._listeners.append(callback)
+
+    def _load(self, version: int) -> DataSnapshot:
+        signature = data_signature(self.data_dir)
+        # Taken before loading, so files edited meanwhile are reloaded on the next check
+        cache = self.cache.bind(data_fingerprint(self.data_dir)) if self.cache is not None else None
+        data = dict(load_all_data(self.data_dir).items())
+        return DataSnapshot(version, data, Solver(data, cache), signature)
+
+    def check(self) -> bool:
+        """Reload the data if any data file changed since the current snapshot.
+
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        with self._reload_lock:
+            current = self._snapshot
+            try:
+                if data_signature(self.data_dir) == current.signature:
+                    return False
+                snapshot = self._load(current.version + 1)
+            except Exception as e:
+                # Keep serving the current snapshot until the files are fixed
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+            self.last_error = None
+            self._snapshot = snapshot
+        for callback in self._listeners:
+            callback(snapshot)
+        return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def start(self) -> 'DataStore':
+        """Start polling the data files in a background thread."""
+        if self._thread is None and self.poll_interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name='data-store-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'DataStore':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
@@ -0,0 +1,97 @@
+"""
+Constraints on the recipes returned by the pathfinder and the optimizer.
+
+Constraints are enforced inside the searches rather than by filtering their
+results: banned ingredients are never tried, branches over the budget or the
+ingredient limit are cut as soon as they are generated, and states holding a
+forbidden effect that no allowed ingredient can transform away are dropped.
+Required effects that no allowed ingredient can ever produce make the search
+fail before it starts.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+
+@dataclass(frozen=True)
+class SearchConstraints:
+    """Conditions every returned recipe must meet.
+
+    Attributes:
+        required_effects: Effects the final mix must have
+        forbidden_effects: Effects the final mix must not have
+        allowed_ingredients: If set, the only ingredients that may be used
+        banned_ingredients: Ingredients that may not be used
+        max_cost: Maximum total ingredient cost
+        max_ingredients: Maximum number of ingredients
+    """
+    required_effects: FrozenSet[str] = frozenset()
+    forbidden_effects: FrozenSet[str] = frozenset()
+    allowed_ingredients: Optional[FrozenSet[str]] = None
+    banned_ingredients: FrozenSet[str] = frozenset()
+    max_cost: Optional[float] = None
+    max_ingredients: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, params: Optional[Dict[str, Any]]) -> 'SearchConstraints':
+        """Build constraints from the 'constraints' object of a job.
+
+        Raises:
+            ValueError: If the object has unknown keys
+        """
+        params = dict(params or {})
+        unknown = set(params) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"Unknown constraints: {', '.join(sorted(unknown))}")
+        for key in ('required_effects', 'forbidden_effects', 'banned_ingredients'):
+            params[key] = frozenset(params.get(key) or ())
+        if params.get('allowed_ingredients') is not None:
+            params['allowed_ingredients'] = frozenset(params['allowed_ingredients'])
+        return cls(**params)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the constraints that are set, with sorted lists, as stored in job parameters."""
+        result = {}
+        for key in self.__dataclass_fields__:
+            value = getattr(self, key)
+            if value is None or value == frozenset():
+                continue
+            result[key] = sorted(value) if isinstance(value, frozenset) else value
+        return result
+
+    @property
+    def active(self) -> bool:
+        """True if any constraint is set."""
+        return bool(self.to_dict())
+
+    def ingredients(self, engine) -> List[str]:
+        """Return the engine's ingredients that may be used, in engine order."""
+        return [ingredient for ingredient in engine.base_effects
+                if ingredient not in self.banned_ingredients
+                and (self.allowed_ingredients is None or ingredient in self.allowed_ingredients)]
+
+    def accepts(self, effects: Iterable[str]) -> bool:
+        """Return True if a mix with these effects meets the effect constraints."""
+        effects = set(effects)
+        return self.required_effects <= effects and not (self.forbidden_effects & effects)
+
+    def permanent_effects(self, engine) -> FrozenSet[str]:
+        """Return the forbidden effects that none of the allowed ingredients can transform.
+
+        A state holding one of them can never lead to an acceptable mix.
+        """
+        ingredients = set(self.ingredients(engine))
+        removable = {effect for effect, ingredient in engine.transforms if ingredient in ingredients}
+        return frozenset(self.forbidden_effects - removable)
+
+    def unreachable_effects(self, engine, initial: Iterable[str] = ()) -> FrozenSet[str]:
+        """Return the required effects that the allowed ingredients can never produce."""
+        ingredients = set(self.ingredients(engine))
+        reachable = set(initial) | {engine.base_effects[ingredient] for ingredient in ingredients}
+        grown = True
+        while grown:
+            grown = False
+            for (effect, ingredient), (result, _) in engine.transforms.items():
+                if ingredient in ingredients and effect in reachable and result not in reachable:
+                    reachable.add(result)
+                    grown = True
+        return frozenset(self.required_effects - reachable)
@@ -1,5 +1,5 @@
 from collections import deque
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, FrozenSet, Optional, Sequence, Tuple
 
 class Engine:
     """Core engine for handling effect combinations and transformations.
@@ -12,6 +12,14 @@ class Engine:
         effect_priorities: Dictionary mapping effects to their priority (for sorting)
         base_effects: Dictionary mapping ingredients to their base effects
         transforms: Dictionary mapping (effect, ingredient) pairs to their transformation results
+        effect_bits: Dictionary mapping effects to a distinct bit, for effect masks;
+                     bit i belongs to the effect with the i-th lowest priority
+        transform_targets: Dictionary mapping ingredients to the effects they transform
+                           and the effect each one becomes
+        noop_ingredients: Ingredients that never change any effects
+        commute_witnesses: Dictionary mapping ingredient pairs (a -> b -> mask) to the
+                           effects whose presence may keep them from commuting; pairs that
+                           may not commute on any state are left out (see ``MoveOrder``)
     """
     
     def __init__(self, combinations: List[Tuple[str, str, str, str, str]], 
@@ -37,6 +45,61 @@ class Engine:
             if base_effect and modifier: 
                 self.transforms[(base_effect, modifier)] = (result_effect, mod_effect)
 
+        # Move analysis used by the searches to skip redundant children
+        self.effect_bits = {
+            effect: 1 << index
+            for index, effect in enumerate(
+                sorted(effect_priorities, key=effect_priorities.get)
+            )
+        }
+        self.transform_targets: Dict[str, Dict[str, str]] = {
+            ingredient: {} for ingredient in self.base_effects
+        }
+        for (effect, ingredient), (result_effect, _) in self.transforms.items():
+            self.transform_targets[ingredient][effect] = result_effect
+        # Without a base effect, combine applies neither the effect nor any transform
+        self.noop_ingredients: FrozenSet[str] = frozenset(
+            ingredient for ingredient, effect in self.base_effects.items() if not effect
+        )
+        self.commute_witnesses: Dict[str, Dict[str, int]] = {
+            ingredient: {} for ingredient in self.base_effects
+        }
+        for a in self.base_effects:
+            for b in self.base_effects:
+                witnesses = self._commute_witnesses(a, b) if a != b else None
+                if witnesses is not None:
+                    self.commute_witnesses[a][b] = witnesses
+
+    def _commute_witnesses(self, a: str, b: str) -> Optional[int]:
+        """Return the mask of effects that may keep two ingredients from commuting.
+
+        On a state holding none of these effects and with room for both base
+        effects, adding a then b gives the same effects as adding b then a.
+
+        Returns:
+            Effect mask, or None if the ingredients may not commute on any state
+        """
+        if a in self.noop_ingredients or b in self.noop_ingredients:
+            return 0
+        base_a, base_b = self.base_effects[a], self.base_effects[b]
+        targets_a, targets_b = self.transform_targets[a], self.transform_targets[b]
+        # Adding a base effect the other ingredient also adds or transforms
+        # changes the other's result whatever the state
+        if base_a == base_b or base_a in targets_b or base_b in targets_a:
+            return None
+        touched_a = set(targets_a) | set(targets_a.values()) | {base_a}
+        touched_b = set(targets_b) | set(targets_b.values()) | {base_b}
+        # Effects both transform, and sources of transforms whose result the
+        # other ingredient transforms, produces or adds
+        witnesses = set(targets_a) & set(targets_b)
+        witnesses.update(
+            effect for effect, result in targets_a.items() if result in touched_b
+        )
+        witnesses.update(
+            effect for effect, result in targets_b.items() if result in touched_a
+        )
+        return sum(self.effect_bits[effect] for effect in witnesses)
+
     def combine(self, effects: List[str], ingredient: str) -> List[str]:
         """Combine current effects with a new ingredient.
         
@@ -66,4 +129,75 @@ class Engine:
                 result.append(ingredient_effect)
         
         # Sort by effect priority
-        return sorted(result, key=lambda x: self.effect_priorities[x]) 
\ No newline at end of file
+        return sorted(result, key=lambda x: self.effect_priorities[x])
+
+
+class MoveOrder:
+    """Partial-order reduction for a search trying ingredients in a fixed order.
+
+    Two ingredients that commute on a state reach the same child in either
+    order, at the same cost and length, so a search only needs the order in
+    which the earlier ingredient comes first. When a child is reached from its
+    parent through ingredient ``a``, ``skips`` tells which earlier ingredients
+    commute with ``a`` on the parent; expanding the child can skip them, as
+    the search reaches the same grandchildren through them and then ``a``.
+
+    Ingredients that never change any effects are left out of ``ingredients``
+    altogether.
+
+    Attributes:
+        ingredients: The search's ingredients with their prices, no-ops removed
+        noops: Number of no-op ingredients removed
+    """
+
+    def __init__(self, engine, ingredients: Sequence[Tuple[str, float]]):
+        """Analyze a search order.
+
+        Args:
+            engine: Engine (or engine wrapper) with the move analysis
+            ingredients: Ingredients with their prices, in search order
+        """
+        self.ingredients = [(ingredient, price) for ingredient, price in ingredients
+                            if ingredient not in engine.noop_ingredients]
+        self.noops = len(ingredients) - len(self.ingredients)
+        self._effect_bits = engine.effect_bits
+        self._max_effects = engine.max_effects
+        position = {
+            ingredient: index for index, (ingredient, _) in enumerate(self.ingredients)
+        }
+        self._earlier: Dict[str, List[Tuple[int, int]]] = {
+            a: [
+                (1 << position[b], witnesses)
+                for b, witnesses in engine.commute_witnesses[a].items()
+                if position.get(b, index) < index
+            ]
+            for a, index in position.items()
+        }
+
+    def mask(self, effects: Sequence[str]) -> int:
+        """Return the effect mask of a state."""
+        bits = self._effect_bits
+        mask = 0
+        for effect in effects:
+            mask |= bits[effect]
+        return mask
+
+    def skips(self, parent_mask: int, ingredient: str, child: Sequence[str]) -> int:
+        """Return the ingredient positions a child's expansion can skip.
+
+        Args:
+            parent_mask: Effect mask of the parent state
+            ingredient: Ingredient that led from the parent to the child
+            child: Effects of the child
+
+        Returns:
+            Bit mask over positions in ``ingredients``
+        """
+        # The parent must have had room for both base effects
+        if len(child) >= self._max_effects:
+            return 0
+        skip = 0
+        for bit, witnesses in self._earlier[ingredient]:
+            if not parent_mask & witnesses:
+                skip |= bit
+        return skip
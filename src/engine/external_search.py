@@ -0,0 +1,253 @@
+"""
+External-memory breadth-first search for the most profitable recipe.
+
+At large depths the breadth-first frontier and visited map of
+``find_best_path`` outgrow memory. This search keeps both on disk instead and
+holds only a bounded buffer of states in memory:
+
+1. The current layer is streamed from its file. Every state is priced, and
+   its children go into a buffer. Whenever the buffer is full it is sorted by
+   state, duplicates are dropped, and it is written out as a sorted run.
+2. The runs are merged, several passes deep if there are many, into one
+   sorted stream. Only the cheapest copy of each state is kept.
+3. That stream is merge-joined with the sorted file of every state seen so
+   far. A child is dropped when its state was already reached with at most
+   the same cost: a shallower or equal layer had at least as many ingredients
+   left. The survivors form the next layer's file, and the seen file is
+   rewritten with their costs.
+
+Every state is stored as a packed fixed-width record: effect ids padded to
+the effect limit, the ingredient cost and the recipe's ingredient ids. All
+files are read and written sequentially in large blocks, and the states of a
+block are priced together from their effect ids (see ``EffectValues.values``).
+The pruning is the same dominance rule as in the other searches, so the
+result is exact.
+"""
+import heapq
+import os
+import struct
+import tempfile
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+from .constraints import SearchConstraints
+from .scoring import EffectValues
+from .search_stats import SearchStats
+
+# States buffered in memory before a sorted run is written
+DEFAULT_BUFFER_RECORDS = 1_000_000
+
+# Approximate bytes per buffered state (the tuple and its three members)
+BUFFER_RECORD_BYTES = 250
+
+# Runs merged at once; more runs are merged in several passes
+MERGE_FAN_IN = 64
+
+# Records read per block
+_READ_RECORDS = 65536
+
+# Effect id padding the end of an effect list shorter than the limit
+_PAD = 0xFF
+
+Record = Tuple[bytes, float, bytes]
+
+
+class _Layout:
+    """Packing of states into fixed-width records."""
+
+    def __init__(self, engine, ingredients: List[Tuple[str, float]], root: Tuple[str, ...]):
+        # Effect ids are the engine's effect bit indexes, as in EffectValues
+        self.effects = sorted(engine.effect_bits, key=engine.effect_bits.get)
+        if len(self.effects) >= _PAD or len(ingredients) > 256:
+            raise ValueError("External search supports at most 254 effects and 256 ingredients")
+        self.effect_ids = {effect: index for index, effect in enumerate(self.effects)}
+        self.width = max(engine.max_effects, len(root))
+        self.seen = struct.Struct(f'<{self.width}sd')
+
+    def layer(self, depth: int) -> struct.Struct:
+        """Return the record format of the states at a depth."""
+        return struct.Struct(f'<{self.width}sd{depth}s')
+
+    def encode(self, effects: Iterable[str]) -> bytes:
+        """Return the effect ids of a state, padded to the record width."""
+        return bytes(self.effect_ids[effect] for effect in effects).ljust(self.width, bytes([_PAD]))
+
+    def decode(self, key: bytes) -> Tuple[str, ...]:
+        """Return the effects of an encoded state."""
+        return tuple(self.effects[index] for index in key.rstrip(bytes([_PAD])))
+
+
+def _read_blocks(path: str, fmt: struct.Struct) -> Iterator[List[tuple]]:
+    """Yield the records of a file in lists, one per block read."""
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(fmt.size * _READ_RECORDS)
+            if not block:
+                return
+            yield list(fmt.iter_unpack(block))
+
+
+def _read(path: str, fmt: struct.Struct) -> Iterator[tuple]:
+    """Yield the records of a file, reading it in large blocks."""
+    for block in _read_blocks(path, fmt):
+        yield from block
+
+
+def _unique(records: Iterable[Record]) -> Iterator[Record]:
+    """Yield the first record of each state from records sorted by state."""
+    last = None
+    for record in records:
+        if record[0] != last:
+            last = record[0]
+            yield record
+
+
+def _write(path: str, fmt: struct.Struct, records: Iterable[tuple]) -> str:
+    """Write records to a file and return its path."""
+    with open(path, 'wb') as f:
+        f.writelines(fmt.pack(*record) for record in records)
+    return path
+
+
+def _merge_runs(runs: List[str], fmt: struct.Struct, work_dir: str) -> Iterator[Record]:
+    """Merge sorted runs into one sorted stream with one record per state, removing the runs.
+
+    Runs beyond ``MERGE_FAN_IN`` are first merged in groups into longer runs.
+    """
+    passes = 0
+    while len(runs) > MERGE_FAN_IN:
+        passes += 1
+        merged = []
+        for start in range(0, len(runs), MERGE_FAN_IN):
+            group = runs[start:start + MERGE_FAN_IN]
+            merged.append(_write(os.path.join(work_dir, f"merge-{passes}-{len(merged)}"), fmt,
+                                 _unique(heapq.merge(*(_read(run, fmt) for run in group)))))
+            for run in group:
+                os.remove(run)
+        runs = merged
+    yield from _unique(heapq.merge(*(_read(run, fmt) for run in runs)))
+    for run in runs:
+        os.remove(run)
+
+
+def _join_seen(children: Iterator[Record], layout: _Layout, fmt: struct.Struct,
+               seen_path: str, new_seen_path: str, layer_path: str) -> int:
+    """Write the children not dominated by a seen state, and the updated seen states.
+
+    Args:
+        children: Sorted children, one per state
+        layout: Record layout
+        fmt: Record format of the children's layer
+        seen_path: Sorted file of every state seen so far, with its lowest cost
+        new_seen_path: File receiving the seen states including the children
+        layer_path: File receiving the children that are kept
+
+    Returns:
+        Number of children kept
+    """
+    seen_fmt = layout.seen
+    seen = _read(seen_path, seen_fmt)
+    kept = 0
+    with open(layer_path, 'wb') as layer_out, open(new_seen_path, 'wb') as seen_out:
+        old = next(seen, None)
+        for key, cost, path in children:
+            while old is not None and old[0] < key:
+                seen_out.write(seen_fmt.pack(*old))
+                old = next(seen, None)
+            if old is not None and old[0] == key:
+                if old[1] <= cost:
+                    continue
+                old = next(seen, None)
+            seen_out.write(seen_fmt.pack(key, cost))
+            layer_out.write(fmt.pack(key, cost, path))
+            kept += 1
+        while old is not None:
+            seen_out.write(seen_fmt.pack(*old))
+            old = next(seen, None)
+    return kept
+
+
+def find_best_path_external(engine, base_price: float, prod_cost: float, max_depth: int,
+                            effect_multipliers: Dict[str, float], ingredients: List[Tuple[str, float]],
+                            max_cost: float, permanent: FrozenSet[str], constraints: SearchConstraints,
+                            root: Tuple[str, ...], stats: SearchStats, work_dir: Optional[str] = None,
+                            buffer_records: int = DEFAULT_BUFFER_RECORDS, noops: int = 0
+                            ) -> Optional[Tuple[List[str], List[str], float]]:
+    """Find the most profitable combination with the frontier kept on disk.
+
+    Args:
+        ingredients: Allowed ingredients with their prices, in search order
+        max_cost: Maximum total ingredient cost
+        permanent: Forbidden effects that no allowed ingredient can remove
+        root: Starting effects, sorted by priority
+        stats: Counters to fill in; ``peak_queue`` is the largest layer
+        work_dir: Directory for the temporary layer files (default: the
+                  system temporary directory)
+        buffer_records: States buffered in memory before a run is written
+        noops: No-op ingredients left out of ``ingredients``, counted as skipped
+        Other arguments: see ``find_best_path``
+
+    Returns:
+        Result in the layout of ``find_best_path``
+    """
+    layout = _Layout(engine, ingredients, root)
+    values = EffectValues.for_engine(engine, effect_multipliers, base_price)
+    best_profit, best_state = float('-inf'), None
+    buffer_records = max(1, buffer_records)
+    stats.start(max_depth)
+
+    with tempfile.TemporaryDirectory(prefix='pathfinder-', dir=work_dir) as tmp:
+        layer_path, seen_path = os.path.join(tmp, 'layer-0'), os.path.join(tmp, 'seen-0')
+        _write(layer_path, layout.layer(0), [(layout.encode(root), 0.0, b'')])
+        _write(seen_path, layout.seen, [(layout.encode(root), 0.0)])
+        size = 1
+
+        for depth in range(max_depth + 1):
+            stats.next_layer(size)
+            fmt, child_fmt = layout.layer(depth), layout.layer(depth + 1)
+            runs, buffer, done = [], [], 0
+            for block in _read_blocks(layer_path, fmt):
+                block_values = values.values([record[0] for record in block])
+                for (key, cost, path), value in zip(block, block_values):
+                    stats.pop(size - done)
+                    done += 1
+                    effects = layout.decode(key)
+                    profit = value - (prod_cost + cost)
+                    if profit > best_profit and constraints.accepts(effects):
+                        best_profit = profit
+                        best_state = (effects, [ingredients[index][0] for index in path], cost)
+                    if depth == max_depth:
+                        continue
+
+                    stats.expanded += 1
+                    for index, (ing, price) in enumerate(ingredients):
+                        new_cost = cost + price
+                        if new_cost > max_cost:
+                            stats.pruned += 1
+                            continue
+                        new_eff = engine.combine(list(effects), ing)
+                        if permanent and not permanent.isdisjoint(new_eff):
+                            stats.pruned += 1
+                            continue
+                        buffer.append((layout.encode(new_eff), new_cost, path + bytes((index,))))
+                    if len(buffer) >= buffer_records:
+                        buffer.sort()
+                        runs.append(_write(os.path.join(tmp, f"run-{len(runs)}"), child_fmt, _unique(buffer)))
+                        buffer = []
+            os.remove(layer_path)
+
+            if buffer:
+                buffer.sort()
+                runs.append(_write(os.path.join(tmp, f"run-{len(runs)}"), child_fmt, _unique(buffer)))
+                buffer = []
+            if not runs:
+                break
+            layer_path = os.path.join(tmp, f"layer-{depth + 1}")
+            new_seen_path = os.path.join(tmp, f"seen-{depth + 1}")
+            size = _join_seen(_merge_runs(runs, child_fmt, tmp), layout, child_fmt,
+                              seen_path, new_seen_path, layer_path)
+            os.remove(seen_path)
+            seen_path = new_seen_path
+            if not size:
+                break
+
+    stats.finish(0, len(ingredients), noops)
+    return best_state
@@ -1,6 +1,14 @@
 from collections import deque
 from math import floor
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+from .constraints import SearchConstraints
+from .core import MoveOrder
+from .scoring import DEFAULT_MAX_VALUES, EffectValues
+from .search_stats import SearchProgress, SearchStats
+from .transposition import TranspositionTable
+
+# Approximate bytes per visited state or queued state of the breadth-first search
+_BFS_ENTRY_BYTES = 200
 
 
 def get_effects_value(effects: List[str], base_price: float, effect_multipliers: Dict[str, float]) -> int:
@@ -19,11 +27,30 @@ def get_effects_value(effects: List[str], base_price: float, effect_multipliers:
 
 def find_best_path(engine, base_price: float, prod_cost: float, max_depth: int, 
                   effect_multipliers: Dict[str, float], ingredient_prices: Dict[str, int],
-                  effect_priorities: Dict[str, int], initial: Optional[List[str]] = None) -> Tuple[List[str], List[str], float]:
+                  effect_priorities: Dict[str, int], initial: Optional[List[str]] = None,
+                  constraints: Optional[SearchConstraints] = None,
+                  stats: Optional[SearchStats] = None,
+                  progress: Optional[Callable[[SearchProgress], None]] = None,
+                  memory_limit: Optional[int] = None,
+                  external_dir: Optional[str] = None) -> Optional[Tuple[List[str], List[str], float]]:
     """Find the most profitable combination of ingredients.
     
     Uses a breadth-first search algorithm to find the most profitable combination
-    of ingredients that maximizes the value of the drug.
+    of ingredients that maximizes the value of the drug. Ingredients that never
+    change the effects are not tried, and of two ingredients that commute on a
+    state only one order is expanded (see ``MoveOrder``); either way the same
+    states are reached at the same cost and length. States are priced with an
+    ``EffectValues``, which remembers the value of states priced before.
+    
+    With a memory limit, the size of the search's visited states and queue is
+    tracked; before it exceeds the limit the search switches to a depth-first
+    search whose memory is bounded by a fixed-size transposition table (see
+    ``_find_best_path_dfs``). ``stats.mode`` tells which search produced the result.
+    
+    With an external directory, the breadth-first search keeps its layers and
+    visited states in files there instead, for depths whose frontier does not
+    fit in memory (see ``src.engine.external_search``); the memory limit then
+    sizes its in-memory sort buffer.
     
     Args:
         engine: Engine instance containing combination rules
@@ -34,37 +61,158 @@ def find_best_path(engine, base_price: float, prod_cost: float, max_depth: int,
         ingredient_prices: Dictionary mapping ingredients to their prices
         effect_priorities: Dictionary mapping effects to their sort priorities
         initial: Optional list of effects to start with
+        constraints: Optional conditions on the recipe, enforced while searching
+        stats: Optional counters to fill in with the work done by the search
+        progress: Optional callback receiving a ``SearchProgress`` at every
+                  new depth and every ``stats.progress_every`` states
+        memory_limit: Optional approximate bytes the search structures may use
+        external_dir: Optional directory for the files of an external-memory
+                      search; '' for the system temporary directory
         
     Returns:
         Tuple containing:
         - List of effects in the optimal combination
         - List of ingredients to combine in sequence
         - Total cost of the ingredients
+        or None if no recipe meets the constraints
     """
-    queue = deque([(0, 0.0, tuple(sorted(initial or [], key=lambda x: effect_priorities[x])), [])])
+    constraints = constraints or SearchConstraints()
+    moves = MoveOrder(engine, [(ing, ingredient_prices.get(ing, 0)) for ing in constraints.ingredients(engine)])
+    ingredients = moves.ingredients
+    max_cost = constraints.max_cost if constraints.max_cost is not None else float('inf')
+    if constraints.max_ingredients is not None:
+        max_depth = min(max_depth, constraints.max_ingredients)
+    permanent = constraints.permanent_effects(engine)
+    if constraints.unreachable_effects(engine, initial or []):
+        return None
+    
+    root = tuple(sorted(initial or [], key=lambda x: effect_priorities[x]))
+    stats = stats if stats is not None else SearchStats()
+    if progress is not None:
+        stats.progress = progress
+    if external_dir is not None:
+        from .external_search import BUFFER_RECORD_BYTES, DEFAULT_BUFFER_RECORDS, find_best_path_external
+        stats.mode = 'external'
+        buffer_records = memory_limit // BUFFER_RECORD_BYTES if memory_limit else DEFAULT_BUFFER_RECORDS
+        return find_best_path_external(engine, base_price, prod_cost, max_depth, effect_multipliers,
+                                       ingredients, max_cost, permanent, constraints, root, stats,
+                                       external_dir or None, buffer_records, moves.noops)
+    
+    max_entries = memory_limit // _BFS_ENTRY_BYTES if memory_limit else None
+    values = EffectValues.for_engine(engine, effect_multipliers, base_price,
+                                     max_entries // 4 if max_entries is not None else DEFAULT_MAX_VALUES)
+    queue = deque([(0, 0.0, root, [], 0)])
     visited = {}
     best_profit, best_state = float('-inf'), None
+    stats.start(max_depth)
+    layer = -1
     
     while queue:
-        depth, cost, effects, path = queue.popleft()
-        profit = get_effects_value(effects, base_price, effect_multipliers) - (prod_cost + cost)
+        depth, cost, effects, path, skip = queue.popleft()
+        if depth != layer:
+            layer = depth
+            stats.next_layer(len(queue) + 1)
+        stats.pop(len(queue) + 1)
+        if max_entries is not None and len(visited) + len(queue) > max_entries:
+            del queue, visited
+            stats.reset('dfs')
+            return _find_best_path_dfs(engine, values, prod_cost, max_depth, moves, max_cost,
+                                       permanent, constraints, root,
+                                       TranspositionTable.for_memory(memory_limit), stats)
+        profit = values.value(effects) - (prod_cost + cost)
         
-        if profit > best_profit:
+        if profit > best_profit and constraints.accepts(effects):
             best_profit, best_state = profit, (effects, path, cost)
             
         if depth < max_depth:
-            for ing in engine.base_effects:
+            stats.expanded += 1
+            mask = moves.mask(effects)
+            for index, (ing, price) in enumerate(ingredients):
+                if skip >> index & 1:
+                    stats.skipped += 1
+                    continue
+                new_cost = cost + price
+                if new_cost > max_cost:
+                    stats.pruned += 1
+                    continue
                 new_effects = engine.combine(list(effects), ing)
                 new_eff = tuple(new_effects)
-                new_cost = cost + ingredient_prices.get(ing, 0)
+                if permanent and not permanent.isdisjoint(new_eff):
+                    stats.pruned += 1
+                    continue
                 
                 if new_eff not in visited or new_cost < visited[new_eff][0] or profit > visited[new_eff][1]:
                     visited[new_eff] = (new_cost, profit)
-                    queue.append((depth+1, new_cost, new_eff, path+[ing]))
-                    
+                    queue.append((depth+1, new_cost, new_eff, path+[ing], moves.skips(mask, ing, new_eff)))
+    
+    stats.finish(0, len(ingredients), moves.noops)
     return best_state
 
 
+def _find_best_path_dfs(engine, values: EffectValues, prod_cost: float, max_depth: int,
+                        moves: MoveOrder, max_cost: float, permanent: FrozenSet[str], constraints: SearchConstraints,
+                        root: Tuple[str, ...], table: TranspositionTable,
+                        stats: SearchStats) -> Optional[Tuple[List[str], List[str], float]]:
+    """Find the most profitable combination depth-first, in bounded memory.
+    
+    Every recipe of up to max_depth ingredients is considered, except those
+    continuing from a state that the transposition table shows was already
+    searched with as many ingredients left at no more cost: such recipes can
+    do no better than the ones already seen, so the result is exact. Of
+    equally profitable recipes the shortest one found first is returned.
+    
+    Args:
+        values: Values of effect sets at the drug's base price
+        moves: Allowed ingredients in search order, with their commutations
+        max_cost: Maximum total ingredient cost
+        permanent: Forbidden effects that no allowed ingredient can remove
+        root: Starting effects, sorted by priority
+        table: Transposition table shared by the whole search
+        Other arguments: see ``find_best_path``
+        
+    Returns:
+        Result in the layout of ``find_best_path``
+    """
+    best = [(float('-inf'), 0), None]
+    path: List[str] = []
+    ingredients = moves.ingredients
+    stats.start(max_depth)
+    
+    def visit(effects: Tuple[str, ...], cost: float, depth: int, skip: int) -> None:
+        stats.visit(depth)
+        profit = values.value(effects) - (prod_cost + cost)
+        if (profit, -depth) > best[0] and constraints.accepts(effects):
+            best[0], best[1] = (profit, -depth), (effects, list(path), cost)
+        if depth == max_depth:
+            return
+        stats.expanded += 1
+        remaining = max_depth - depth - 1
+        mask = moves.mask(effects)
+        for index, (ing, price) in enumerate(ingredients):
+            if skip >> index & 1:
+                stats.skipped += 1
+                continue
+            new_cost = cost + price
+            if new_cost > max_cost:
+                stats.pruned += 1
+                continue
+            new_eff = tuple(engine.combine(list(effects), ing))
+            if permanent and not permanent.isdisjoint(new_eff):
+                stats.pruned += 1
+                continue
+            if table.covers(new_eff, remaining, new_cost):
+                continue
+            table.store(new_eff, remaining, new_cost)
+            path.append(ing)
+            visit(new_eff, new_cost, depth + 1, moves.skips(mask, ing, new_eff))
+            path.pop()
+    
+    table.store(root, max_depth, 0.0)
+    visit(root, 0.0, 0, 0)
+    stats.finish(0, len(ingredients), moves.noops)
+    return best[1]
+
+
 def calculate_units(drug_type: str, grow_tent: bool, pgr: bool, production_units: Dict[str, Any]) -> int:
     """Calculate production units based on configuration.
     
@@ -1,51 +1,246 @@
 from collections import deque
-from typing import List, Optional, Set, Tuple, Deque
-from .core import Engine
+from dataclasses import replace
+from math import inf
+from typing import Callable, Deque, Dict, FrozenSet, List, Optional, Tuple
+from .constraints import SearchConstraints
+from .core import Engine, MoveOrder
+from .search_stats import SearchProgress, SearchStats
+from .transposition import TranspositionTable
 
-def find_path(engine: Engine, target_effects: List[str], initial_effects: Optional[List[str]] = None) -> Optional[List[str]]:
+# Search strategies of find_path
+STRATEGIES = ('bfs', 'iddfs', 'auto')
+
+# Slots of the iterative-deepening search's transposition table
+DEFAULT_TABLE_SLOTS = 1 << 18
+
+# Missing target effects from which 'auto' picks iterative deepening
+AUTO_IDDFS_TARGETS = 3
+
+def find_path(engine: Engine, target_effects: List[str], initial_effects: Optional[List[str]] = None,
+              constraints: Optional[SearchConstraints] = None,
+              ingredient_prices: Optional[Dict[str, float]] = None,
+              stats: Optional[SearchStats] = None,
+              progress: Optional[Callable[[SearchProgress], None]] = None,
+              strategy: str = 'bfs', table_slots: int = DEFAULT_TABLE_SLOTS) -> Optional[List[str]]:
     """Find the shortest sequence of ingredients to achieve target effects.
     
     Uses a breadth-first search algorithm to find the shortest path of ingredients
     that will result in having all target effects active simultaneously.
+    Ingredients that never change the effects are not tried, and the
+    breadth-first search expands only one order of ingredients that commute
+    (see ``MoveOrder``).
+    
+    The breadth-first search holds whole layers in memory. The 'iddfs'
+    strategy instead searches depth-first to depth 1, 2, ... until a path is
+    found, remembering searched states in a fixed-size transposition table
+    (see ``_find_path_iddfs``); its memory stays bounded and its paths are
+    equally short. 'auto' picks iterative deepening when at least
+    ``AUTO_IDDFS_TARGETS`` target effects are missing, since those need the
+    deepest and widest searches. ``stats.mode`` tells which search ran.
     
     Args:
         engine: Engine instance containing combination rules
         target_effects: List of effects we want to achieve
         initial_effects: Optional list of effects to start with
+        constraints: Optional conditions on the path, enforced while searching;
+                     required effects are added to the targets
+        ingredient_prices: Ingredient prices, needed for a cost limit
+        stats: Optional counters to fill in with the work done by the search
+        progress: Optional callback receiving a ``SearchProgress`` at every
+                  new depth and every ``stats.progress_every`` states
+                  (breadth-first search only)
+        strategy: 'bfs', 'iddfs' or 'auto'
+        table_slots: Size of the iterative-deepening transposition table
     
     Returns:
         List of ingredients to combine in sequence, or None if no solution exists
+    
+    Raises:
+        ValueError: If a cost limit is given without ingredient prices, or the
+                    strategy is unknown
     """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown search strategy {strategy!r}, expected one of {', '.join(STRATEGIES)}")
+    constraints = constraints or SearchConstraints()
+    if constraints.max_cost is not None and ingredient_prices is None:
+        raise ValueError("A cost limit needs ingredient prices")
+    constraints = replace(constraints, required_effects=constraints.required_effects | set(target_effects))
+    prices = ingredient_prices or {}
+    moves = MoveOrder(engine, [(ingredient, prices.get(ingredient, 0))
+                               for ingredient in constraints.ingredients(engine)])
+    ingredients = moves.ingredients
+    max_cost = constraints.max_cost if constraints.max_cost is not None else inf
+    max_depth = constraints.max_ingredients if constraints.max_ingredients is not None else inf
+    permanent = constraints.permanent_effects(engine)
+    
     # Initialize with empty or provided effects, sorted by priority
     initial = sorted(initial_effects or [], key=lambda x: engine.effect_priorities[x])
     
     # Check if we already have all target effects
-    if set(target_effects).issubset(initial):
+    if constraints.accepts(initial):
         return []
+    if constraints.unreachable_effects(engine, initial):
+        return None
+    
+    stats = stats if stats is not None else SearchStats()
+    if strategy == 'auto':
+        missing = constraints.required_effects.difference(initial)
+        strategy = 'iddfs' if len(missing) >= AUTO_IDDFS_TARGETS else 'bfs'
+    if strategy == 'iddfs':
+        stats.mode = 'iddfs'
+        return _find_path_iddfs(engine, initial, constraints, ingredients, max_cost, max_depth,
+                                permanent, TranspositionTable(table_slots), stats, moves.noops)
     
-    # Setup for BFS
-    seen: Set[Tuple[str, ...]] = {tuple(initial)}
-    queue: Deque[Tuple[List[str], List[str]]] = deque([(initial, [])])
+    # Setup for BFS; only with a cost limit are states revisited along cheaper paths
+    budgeted = constraints.max_cost is not None
+    seen: Dict[Tuple[str, ...], float] = {tuple(initial): 0}
+    queue: Deque[Tuple[List[str], List[str], float, int]] = deque([(initial, [], 0, 0)])
+    if progress is not None:
+        stats.progress = progress
+    stats.start(max_depth)
+    layer = -1
     
     # BFS through possible combinations
-    while queue:
-        current_effects, path = queue.popleft()
-        
-        # Check if we've found a solution
-        if set(target_effects).issubset(current_effects):
-            return path
-        
-        # Try each possible ingredient
-        for ingredient in engine.base_effects:
-            # Get the result of combining current effects with this ingredient
-            result = engine.combine(current_effects, ingredient)
+    try:
+        while queue:
+            current_effects, path, cost, skip = queue.popleft()
+            if len(path) != layer:
+                layer = len(path)
+                stats.next_layer(len(queue) + 1)
+            stats.pop(len(queue) + 1)
+            
+            # Check if we've found a solution
+            if constraints.accepts(current_effects):
+                return path
+            if len(path) >= max_depth:
+                continue
+            stats.expanded += 1
+            mask = moves.mask(current_effects)
             
-            # Only proceed if we have results and within effect limit and haven't seen this state
-            if result and len(result) <= engine.max_effects:
+            # Try each possible ingredient, except commuting ones already tried in the other order
+            for index, (ingredient, price) in enumerate(ingredients):
+                if skip >> index & 1:
+                    stats.skipped += 1
+                    continue
+                new_cost = cost + price
+                if new_cost > max_cost:
+                    stats.pruned += 1
+                    continue
+                
+                # Get the result of combining current effects with this ingredient
+                result = engine.combine(current_effects, ingredient)
+                
+                # Only proceed if we have results and within effect limit and haven't seen this state
+                if not result or len(result) > engine.max_effects or (
+                        permanent and not permanent.isdisjoint(result)):
+                    stats.pruned += 1
+                    continue
                 state = tuple(sorted(result))
-                if state not in seen:
-                    seen.add(state)
-                    queue.append((result, path + [ingredient]))
+                known = seen.get(state)
+                if known is None or (budgeted and known > new_cost):
+                    seen[state] = new_cost
+                    queue.append((result, path + [ingredient], new_cost, moves.skips(mask, ingredient, result)))
+    finally:
+        stats.finish(len(queue), len(ingredients), moves.noops)
     
     # No solution found
-    return None
\ No newline at end of file
+    return None
+
+
+def _find_path_iddfs(engine: Engine, initial: List[str], constraints: SearchConstraints,
+                     ingredients: List[Tuple[str, float]], max_cost: float, max_depth: float,
+                     permanent: FrozenSet[str], table: TranspositionTable,
+                     stats: SearchStats, noops: int = 0) -> Optional[List[str]]:
+    """Find the shortest path by iterative deepening with a transposition table.
+    
+    Each iteration searches depth-first for paths of at most ``limit``
+    ingredients. The table maps a state, keyed like the breadth-first search's
+    seen states, to the most ingredients it was searched with at the lowest
+    cost; since nothing is returned until a path is found, a state stored with
+    at least as many ingredients left at no more cost can be skipped. The
+    table is kept across iterations, and a state whose whole subtree was
+    searched without reaching the depth limit is stored with unlimited
+    ingredients left. States on the current path are skipped, which cuts a
+    subtree like the depth limit: a state whose subtree looped back above it
+    is not stored as fully searched, since its search depended on the path
+    that led to it. The search stops without a path once the start state's
+    subtree was searched without reaching the depth limit, or at the maximum
+    depth.
+    
+    Args:
+        initial: Starting effects, sorted by priority
+        constraints: Constraints with the targets among the required effects
+        ingredients: Allowed ingredients with their prices, in search order
+        max_cost: Maximum total ingredient cost
+        max_depth: Maximum number of ingredients
+        permanent: Forbidden effects that no allowed ingredient can remove
+        table: Transposition table shared by all iterations
+        stats: Counters to fill in; ``frontier`` counts visits over all iterations
+        noops: No-op ingredients left out of ``ingredients``, counted as skipped
+    
+    Returns:
+        List of ingredients to combine in sequence, or None if no solution exists
+    """
+    path: List[str] = []
+    # Depth of each state on the current path
+    on_path = {tuple(sorted(initial)): 0}
+    
+    def search(effects: List[str], cost: float, depth: int, limit: int) -> Tuple[bool, bool, float]:
+        """Return whether a path was found below this state, whether the limit cut
+        the search and the smallest depth of the states on the path it looped back to."""
+        stats.visit(depth)
+        if constraints.accepts(effects):
+            return True, False, inf
+        if depth == limit:
+            return False, True, inf
+        stats.expanded += 1
+        remaining = limit - depth - 1
+        cutoff = False
+        loop = inf
+        for ingredient, price in ingredients:
+            new_cost = cost + price
+            if new_cost > max_cost:
+                stats.pruned += 1
+                continue
+            result = engine.combine(effects, ingredient)
+            if not result or len(result) > engine.max_effects or (
+                    permanent and not permanent.isdisjoint(result)):
+                stats.pruned += 1
+                continue
+            state = tuple(sorted(result))
+            # A state already on the path adds a loop, never a shorter path
+            if state in on_path:
+                loop = min(loop, on_path[state])
+                continue
+            if table.covers(state, inf, new_cost):
+                continue
+            if table.covers(state, remaining, new_cost):
+                cutoff = True
+                continue
+            table.store(state, remaining, new_cost)
+            path.append(ingredient)
+            on_path[state] = depth + 1
+            found, child_cutoff, child_loop = search(result, new_cost, depth + 1, limit)
+            if found:
+                return True, False, inf
+            path.pop()
+            del on_path[state]
+            if not child_cutoff and child_loop > depth:
+                table.store(state, inf, new_cost)
+            cutoff = cutoff or child_cutoff
+            loop = min(loop, child_loop)
+        return False, cutoff, loop
+    
+    stats.start(max_depth)
+    try:
+        limit = 1
+        while limit <= max_depth:
+            found, cutoff, _ = search(initial, 0.0, 0, limit)
+            if found:
+                return path
+            if not cutoff:
+                break
+            limit += 1
+        return None
+    finally:
+        stats.finish(0, len(ingredients), noops)
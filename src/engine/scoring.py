@@ -0,0 +1,128 @@
+"""
+Effect-value scoring by effect ID, bitmask or in batches.
+
+``get_effects_value`` looks every effect name up in the multiplier dictionary
+each time a state is scored, and the searches score many states more than
+once. An ``EffectValues`` fixes the base price and keeps the multipliers in a
+vector indexed by effect ID (the effect's position in priority order, the bit
+it has in ``Engine.effect_bits``). A state can then be scored from its names,
+its effect IDs or its effect bitmask, and values by name are memoized.
+
+Batches of ID-encoded states, such as a layer read by the external-memory
+search, are scored with one vector operation per effect slot when NumPy is
+installed, and one state at a time otherwise.
+
+Multipliers are always summed in the order of the state's effects, starting
+from zero, so every method returns exactly what ``get_effects_value`` returns
+for the same effects in priority order.
+"""
+from math import floor
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batches are then scored one state at a time
+    np = None
+
+# Maximum number of memoized values by name
+DEFAULT_MAX_VALUES = 1 << 18
+
+# Effect IDs up to this one index the multiplier vector; IDs without an
+# effect, such as padding, have no value
+_VECTOR_SIZE = 256
+
+
+class EffectValues:
+    """Value of effect sets for one base price.
+
+    Attributes:
+        base_price: Base price of the drug
+        effect_ids: Dictionary mapping effects to their IDs
+        multipliers: Multiplier per effect ID, zero for unused IDs
+        max_entries: Maximum number of memoized values by name
+    """
+
+    def __init__(self, effect_ids: Dict[str, int], effect_multipliers: Dict[str, float],
+                 base_price: float, max_entries: int = DEFAULT_MAX_VALUES):
+        """Build the multiplier vector.
+
+        Args:
+            effect_ids: Dictionary mapping effects to IDs below 256
+            effect_multipliers: Dictionary mapping effects to their value multipliers
+            base_price: Base price of the drug
+            max_entries: Maximum number of memoized values by name
+
+        Raises:
+            ValueError: If an effect ID does not fit the multiplier vector
+        """
+        if any(not 0 <= effect_id < _VECTOR_SIZE for effect_id in effect_ids.values()):
+            raise ValueError(f"Effect IDs must be below {_VECTOR_SIZE}")
+        self.base_price = base_price
+        self.effect_ids = effect_ids
+        self.multipliers: List[float] = [0] * _VECTOR_SIZE
+        for effect, effect_id in effect_ids.items():
+            self.multipliers[effect_id] = effect_multipliers.get(effect, 0)
+        self.max_entries = max_entries
+        self._by_name = {effect: self.multipliers[effect_id] for effect, effect_id in effect_ids.items()}
+        self._values: Dict[Tuple[str, ...], int] = {}
+
+    @classmethod
+    def for_engine(cls, engine, effect_multipliers: Dict[str, float], base_price: float,
+                   max_entries: int = DEFAULT_MAX_VALUES) -> 'EffectValues':
+        """Return the values with the effect IDs of an engine's effect bits."""
+        effect_ids = {effect: bit.bit_length() - 1 for effect, bit in engine.effect_bits.items()}
+        return cls(effect_ids, effect_multipliers, base_price, max_entries)
+
+    def value(self, effects: Sequence[str]) -> int:
+        """Return the value of a state given by its effect names, see ``get_effects_value``."""
+        key = effects if isinstance(effects, tuple) else tuple(effects)
+        value = self._values.get(key)
+        if value is None:
+            by_name = self._by_name
+            value = floor(self.base_price * (1 + sum(by_name.get(effect, 0) for effect in key)))
+            if len(self._values) < self.max_entries:
+                self._values[key] = value
+        return value
+
+    def value_of_ids(self, ids: Iterable[int]) -> int:
+        """Return the value of a state given by its effect IDs (a bytes object works too)."""
+        multipliers = self.multipliers
+        return floor(self.base_price * (1 + sum(multipliers[effect_id] for effect_id in ids)))
+
+    def value_of_mask(self, mask: int) -> int:
+        """Return the value of a state given by its effect bitmask."""
+        multipliers = self.multipliers
+        total = 0
+        while mask:
+            low = mask & -mask
+            total += multipliers[low.bit_length() - 1]
+            mask ^= low
+        return floor(self.base_price * (1 + total))
+
+    def values(self, states) -> List[int]:
+        """Return the values of a batch of ID-encoded states.
+
+        Args:
+            states: A sequence of effect ID sequences (or bytes objects); with
+                    NumPy, a 2-D integer array with one state per row, or a
+                    sequence of equally long bytes objects, padded with IDs
+                    without an effect (such as 255)
+
+        Returns:
+            List of values, in the order of the states
+        """
+        if np is not None and len(states):
+            if isinstance(states, np.ndarray):
+                ids = states
+            elif isinstance(states[0], bytes) and all(len(state) == len(states[0]) for state in states):
+                ids = np.frombuffer(b''.join(states), dtype=np.uint8).reshape(len(states), -1)
+            else:
+                ids = None
+            if ids is not None:
+                vector = np.asarray(self.multipliers, dtype=np.float64)
+                # Add one effect slot at a time, so sums round as in value_of_ids
+                total = np.zeros(len(ids))
+                for column in ids.T:
+                    total = total + vector[column]
+                return np.floor(self.base_price * (1 + total)).astype(np.int64).tolist()
+        return [self.value_of_ids(state) for state in states]
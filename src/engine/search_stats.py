@@ -0,0 +1,195 @@
+"""
+Counters collected by the breadth-first searches, and progress reports.
+
+The searches update a ``SearchStats`` once per state taken from the queue and
+once per layer, never per generated child: the number of children follows
+from the number of expanded states, and duplicate children from the children
+that were neither pruned nor queued. Collecting them therefore costs next to
+nothing, and callers that want them pass a ``SearchStats`` to fill in.
+
+A progress callback set on the stats receives a ``SearchProgress`` at the
+start of every layer and every ``progress_every`` states in between. Its
+time estimates assume that each layer grows by the same factor as the last
+one did, and that states are processed at the rate measured so far.
+"""
+import time
+from dataclasses import dataclass, field
+from math import inf
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+class SearchProgress(NamedTuple):
+    """Snapshot of a running search, passed to progress callbacks.
+
+    Attributes:
+        depth: Depth of the states being processed
+        frontier: Number of states queued at this depth
+        done: States of this depth processed so far
+        processed: States processed in total
+        elapsed: Seconds since the search started
+        rate: States processed per second so far
+        layer_eta: Estimated seconds until this depth is done
+        eta: Estimated seconds until the search is done, or None if its
+             depth is not bounded
+    """
+    depth: int
+    frontier: int
+    done: int
+    processed: int
+    elapsed: float
+    rate: float
+    layer_eta: float
+    eta: Optional[float]
+
+
+@dataclass
+class SearchStats:
+    """Work done by one search.
+
+    Attributes:
+        expanded: States whose children were generated
+        generated: Children generated (one per expanded state and ingredient tried)
+        skipped: Children not generated: one per expanded state and ingredient
+                 that never changes any effects, and one per ingredient whose
+                 order with a commuting ingredient was already tried the other
+                 way round (see ``MoveOrder``)
+        duplicates: Children dropped because their state was already reached
+                    at least as cheaply
+        pruned: Children cut by a constraint (budget, forbidden effects) or
+                by exceeding the effect limit
+        queued: Children added to the queue (depth-first: children visited)
+        peak_queue: Largest queue length (depth-first: deepest recursion;
+                    external memory: largest layer)
+        frontier: Number of states queued (depth-first: visited) at each depth
+        layer_seconds: Time spent on each depth (breadth-first searches only)
+        seconds: Total search time
+        mode: Search that produced the result: 'bfs' (breadth-first), 'dfs'
+              (depth-first with a transposition table, in bounded memory),
+              'iddfs' (iterative deepening with a transposition table) or
+              'external' (breadth-first with its layers on disk)
+        progress: Optional callback receiving a ``SearchProgress``
+                  (breadth-first searches only)
+        progress_every: States processed between progress reports within a layer
+    """
+    expanded: int = 0
+    generated: int = 0
+    skipped: int = 0
+    duplicates: int = 0
+    pruned: int = 0
+    queued: int = 0
+    peak_queue: int = 0
+    frontier: List[int] = field(default_factory=list)
+    layer_seconds: List[float] = field(default_factory=list)
+    seconds: float = 0.0
+    mode: str = 'bfs'
+    progress: Optional[Callable[[SearchProgress], None]] = field(default=None, repr=False, compare=False)
+    progress_every: int = 10000
+    _popped: int = field(default=0, repr=False)
+    _started: float = field(default=0.0, repr=False)
+    _layer_started: float = field(default=0.0, repr=False)
+    _layer_popped: int = field(default=0, repr=False)
+    _next_report: int = field(default=0, repr=False)
+    _max_depth: float = field(default=inf, repr=False)
+
+    def start(self, max_depth: float = inf) -> None:
+        """Start timing a search that expands states up to max_depth - 1."""
+        self._started = self._layer_started = time.perf_counter()
+        self._max_depth = max_depth
+
+    def reset(self, mode: str) -> None:
+        """Discard the counters collected so far, before restarting the search in another mode."""
+        self.__init__(mode=mode, progress_every=self.progress_every)
+
+    def visit(self, depth: int) -> None:
+        """Record a depth-first search reaching a state at the given depth."""
+        self._popped += 1
+        if depth >= len(self.frontier):
+            self.frontier.append(0)
+            self.peak_queue = depth + 1
+        self.frontier[depth] += 1
+
+    def next_layer(self, queued: int) -> None:
+        """Record the start of a new depth, with the number of states queued at it."""
+        now = time.perf_counter()
+        if self.frontier:
+            self.layer_seconds.append(now - self._layer_started)
+        self._layer_started = now
+        self._layer_popped = self._popped
+        self.frontier.append(queued)
+        if self.progress is not None:
+            self._next_report = self._popped + self.progress_every
+            self.progress(self.snapshot(now))
+
+    def pop(self, queue_length: int) -> None:
+        """Record taking a state off a queue of the given length (counting the state)."""
+        self._popped += 1
+        if queue_length > self.peak_queue:
+            self.peak_queue = queue_length
+        if self.progress is not None and self._popped >= self._next_report:
+            self._next_report = self._popped + self.progress_every
+            self.progress(self.snapshot())
+
+    def snapshot(self, now: Optional[float] = None) -> SearchProgress:
+        """Return the progress of the running search."""
+        now = now or time.perf_counter()
+        elapsed = now - self._started
+        depth = len(self.frontier) - 1
+        frontier = self.frontier[-1] if self.frontier else 0
+        done = self._popped - self._layer_popped
+        rate = self._popped / elapsed if elapsed > 0 else 0.0
+
+        # Seconds per state, measured in this layer once it has some weight
+        layer_elapsed = now - self._layer_started
+        if done >= self.progress_every or not self.layer_seconds:
+            per_state = layer_elapsed / done if done else (1 / rate if rate else 0.0)
+        else:
+            per_state = self.layer_seconds[-1] / max(self.frontier[-2], 1)
+        layer_eta = max(frontier - done, 0) * per_state
+
+        eta = None
+        if self._max_depth != inf:
+            # Later layers are assumed to grow like the last two did
+            growth = frontier / self.frontier[-2] if len(self.frontier) > 1 and self.frontier[-2] else 1.0
+            upcoming, size = 0.0, float(frontier)
+            for _ in range(depth + 1, int(self._max_depth)):
+                size *= growth
+                upcoming += size
+            eta = layer_eta + upcoming * per_state
+        return SearchProgress(depth, frontier, done, self._popped, elapsed, rate, layer_eta, eta)
+
+    def finish(self, queue_length: int, branching: int, noops: int = 0) -> None:
+        """Derive the remaining counters once the search stops.
+
+        Args:
+            queue_length: States left in the queue
+            branching: Ingredients considered per expanded state, including
+                       those skipped as commuting orders (counted in ``skipped``)
+            noops: Ingredients left out of the search because they never
+                   change any effects
+        """
+        now = time.perf_counter()
+        if self.frontier and self.mode in ('bfs', 'external'):
+            self.layer_seconds.append(now - self._layer_started)
+        self.seconds = now - self._started
+        # Every state taken off or left in the queue was queued, except the
+        # start, which iterative deepening visits once per iteration
+        self.queued = self._popped + queue_length - (self.frontier[0] if self.frontier else 1)
+        self.generated = self.expanded * branching - self.skipped
+        self.skipped += self.expanded * noops
+        self.duplicates = self.generated - self.pruned - self.queued
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the counters as stored in result records, with times in seconds."""
+        return {
+            'expanded': self.expanded,
+            'generated': self.generated,
+            'skipped': self.skipped,
+            'duplicates': self.duplicates,
+            'pruned': self.pruned,
+            'queued': self.queued,
+            'peak_queue': self.peak_queue,
+            'frontier': list(self.frontier),
+            'layer_seconds': [round(seconds, 6) for seconds in self.layer_seconds],
+            'seconds': round(self.seconds, 6),
+            'mode': self.mode,
+        }
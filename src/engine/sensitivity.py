@@ -0,0 +1,166 @@
+"""
+Price sensitivity of the optimal recipe.
+
+For one optimizer job this computes how far each ingredient price, and the
+drug's base price, can move before a different recipe becomes more profitable.
+The candidate set comes from a single ``StateGraph``: for every reachable
+effect set the cheapest recipe using each ingredient a given number of times.
+A recipe's profit is linear in every ingredient price (its slope is minus the
+number of uses), so each break-even point follows from the candidates directly
+instead of re-running the search over a grid of prices.
+
+Production costs do not depend on the recipe (cocaine's depends on the price
+of Gasoline, but equally for every recipe), so they never change which recipe
+is optimal.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from .optimizer import get_effects_value
+from .state_graph import Relaxation, StateGraph
+
+
+class PriceInterval(NamedTuple):
+    """Range of one price over which the optimal recipe stays optimal.
+
+    Attributes:
+        parameter: Ingredient name, or 'base_price'
+        value: Current price
+        lower: Lowest price keeping the recipe optimal (never below 0)
+        upper: Highest price keeping the recipe optimal, or None if unbounded
+        below: Recipe taking over below ``lower``, or None
+        above: Recipe taking over above ``upper``, or None
+    """
+    parameter: str
+    value: float
+    lower: float
+    upper: Optional[float]
+    below: Optional[List[str]]
+    above: Optional[List[str]]
+
+
+def ingredient_interval(graph: StateGraph, ingredient: str, ingredient_prices: Dict[str, float],
+                        base_price: float, effect_multipliers: Dict[str, float],
+                        max_depth: int, best_path: Sequence[str], best_profit: float) -> PriceInterval:
+    """Compute the break-even interval of one ingredient price.
+
+    Args:
+        graph: Graph explored from the job's initial effects to at least max_depth
+        ingredient: Ingredient whose price is varied
+        ingredient_prices: Current ingredient prices
+        base_price: Base price of the drug
+        effect_multipliers: Dictionary mapping effects to their value multipliers
+        max_depth: Maximum number of ingredients
+        best_path: The optimal recipe at the current prices
+        best_profit: Its profit before production costs
+
+    Returns:
+        The interval of the ingredient's price
+    """
+    relaxation = graph.relax(ingredient_prices, max_depth, counted=ingredient)
+    stride = max_depth + 1
+    uses = list(best_path).count(ingredient)
+    price = ingredient_prices.get(ingredient, 0)
+
+    # Most profitable recipe for every number of uses of the ingredient
+    values: Dict[int, int] = {}
+    best_by_count: Dict[int, tuple] = {}
+    for label, cost in relaxation.costs.items():
+        state, count = divmod(label, stride)
+        if state not in values:
+            values[state] = get_effects_value(graph.states[state], base_price, effect_multipliers)
+        profit = values[state] - cost
+        if count not in best_by_count or profit > best_by_count[count][0]:
+            best_by_count[count] = (profit, label)
+
+    # A recipe using the ingredient c times instead of `uses` times gains
+    # (uses - c) per unit of price increase
+    upper = above = lower = below = None
+    for count, (profit, label) in best_by_count.items():
+        if count == uses:
+            continue
+        change = (best_profit - profit) / (uses - count)
+        if count < uses and (upper is None or change < upper[0]):
+            upper = (change, label)
+        elif count > uses and (lower is None or change > lower[0]):
+            lower = (change, label)
+    if upper is not None:
+        upper, above = price + upper[0], relaxation.recipe(upper[1])
+    if lower is not None and price + lower[0] > 0:
+        lower, below = price + lower[0], relaxation.recipe(lower[1])
+    else:
+        lower = 0.0
+    return PriceInterval(ingredient, price, lower, upper, below, above)
+
+
+def base_price_interval(relaxation: Relaxation, base_price: float, effect_multipliers: Dict[str, float],
+                        best_state: int) -> PriceInterval:
+    """Compute the break-even interval of the drug's base price.
+
+    The sale value is ``floor(base_price * (1 + sum of multipliers))``; the
+    interval is computed on the unrounded value, so rounding can move its
+    bounds slightly.
+
+    Args:
+        relaxation: Cheapest recipe per state at the current ingredient prices
+        base_price: Current base price of the drug
+        effect_multipliers: Dictionary mapping effects to their value multipliers
+        best_state: State id reached by the optimal recipe
+
+    Returns:
+        The interval of the base price
+    """
+    states = relaxation.graph.states
+    costs = relaxation.costs
+
+    def factor(state):
+        return 1 + sum(effect_multipliers.get(e, 0) for e in states[state])
+
+    best_factor, best_cost = factor(best_state), costs[best_state]
+    upper = lower = None
+    for state, cost in costs.items():
+        slope = factor(state) - best_factor
+        if slope == 0:
+            continue
+        # Price at which both recipes are equally profitable
+        price = (cost - best_cost) / slope
+        if slope > 0 and (upper is None or price < upper[0]):
+            upper = (price, state)
+        elif slope < 0 and (lower is None or price > lower[0]):
+            lower = (price, state)
+    above = below = None
+    if upper is not None:
+        upper, above = max(upper[0], base_price), relaxation.recipe(upper[1])
+    if lower is not None and lower[0] > 0:
+        lower, below = min(lower[0], base_price), relaxation.recipe(lower[1])
+    else:
+        lower = 0.0
+    return PriceInterval('base_price', base_price, lower, upper, below, above)
+
+
+def price_sensitivity(graph: StateGraph, relaxation: Relaxation, ingredient_prices: Dict[str, float],
+                      base_price: float, effect_multipliers: Dict[str, float],
+                      parameters: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Compute the break-even intervals of the optimal recipe of a job.
+
+    Args:
+        graph: Graph explored from the job's initial effects
+        relaxation: ``graph.relax`` at the current prices and the job's depth
+        ingredient_prices: Current ingredient prices
+        base_price: Base price of the drug
+        effect_multipliers: Dictionary mapping effects to their value multipliers
+        parameters: Ingredients and/or 'base_price' to analyse (default: all)
+
+    Returns:
+        Dictionary with the optimal 'path' and one PriceInterval per parameter
+        under 'intervals'
+    """
+    (effects, path, cost), = relaxation.top_recipes(base_price, 0, effect_multipliers)
+    best_state = next(state for state in relaxation.costs if graph.states[state] == tuple(effects))
+    best_profit = get_effects_value(effects, base_price, effect_multipliers) - cost
+    intervals = []
+    for parameter in parameters or ('base_price',) + graph.ingredients:
+        if parameter == 'base_price':
+            intervals.append(base_price_interval(relaxation, base_price, effect_multipliers, best_state))
+        else:
+            intervals.append(ingredient_interval(graph, parameter, ingredient_prices, base_price,
+                                                 effect_multipliers, relaxation.max_depth, path, best_profit))
+    return {'path': path, 'intervals': intervals}
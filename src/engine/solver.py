@@ -0,0 +1,461 @@
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from .constraints import SearchConstraints
+from .core import Engine
+from .optimizer import calculate_cost, calculate_units, find_best_path, get_effects_value
+from .pathfinder import find_path
+from .search_stats import SearchProgress, SearchStats
+from .sensitivity import price_sensitivity
+from .state_graph import Relaxation, StateGraph, rules_fingerprint
+from src.utils.tracing import span
+
+# Maximum number of memoized transitions kept by a Solver
+DEFAULT_MAX_TRANSITIONS = 200_000
+
+
+def calculate_production_cost(drug_type: str, options: Dict[str, Any], data: Dict[str, Any]) -> float:
+    """Calculate the production cost per unit of a drug.
+
+    Args:
+        drug_type: Type of drug being produced
+        options: Production options (grow_tent, pgr, strain, quality)
+        data: Dictionary containing all loaded data
+
+    Returns:
+        Production cost per unit
+    """
+    # Get common parameters
+    constants = data['drug_pricing']['constants']
+    cost_formula = data['drug_pricing']['cost_calculations'][drug_type]['formula']
+
+    # Calculate units based on grow tent and pgr options
+    units = calculate_units(
+        drug_type,
+        options.get('grow_tent', False),
+        options.get('pgr', False),
+        data['drug_pricing']['production_units']
+    )
+
+    # Set up keyword arguments based on drug type
+    kwargs = {'units': units}
+
+    if drug_type == 'marijuana':
+        kwargs.update({
+            'strain': options.get('strain', 'og_kush'),
+            'strain_data': data['strain_data']
+        })
+    elif drug_type == 'meth':
+        kwargs.update({
+            'quality': options.get('quality', 3),
+            'quality_costs': data['quality_costs']
+        })
+    elif drug_type == 'cocaine':
+        kwargs.update({
+            'ingredient_prices': data['ingredient_prices']
+        })
+
+    return calculate_cost(drug_type, constants, cost_formula, **kwargs)
+
+
+class TransitionCache:
+    """Engine wrapper that memoizes the results of ``combine``.
+
+    It offers the attributes and ``combine`` method the search functions use,
+    so it can be passed wherever an Engine is expected. Once ``max_entries``
+    transitions are stored, further transitions are computed but not kept.
+
+    Attributes:
+        engine: The wrapped engine
+        max_entries: Maximum number of memoized transitions
+    """
+
+    def __init__(self, engine: Engine, max_entries: int = DEFAULT_MAX_TRANSITIONS):
+        """Wrap an engine.
+
+        Args:
+            engine: Engine whose transitions are memoized
+            max_entries: Maximum number of memoized transitions
+        """
+        self.engine = engine
+        self.max_entries = max_entries
+        self.base_effects = engine.base_effects
+        self.transforms = engine.transforms
+        self.max_effects = engine.max_effects
+        self.effect_priorities = engine.effect_priorities
+        self.effect_bits = engine.effect_bits
+        self.noop_ingredients = engine.noop_ingredients
+        self.commute_witnesses = engine.commute_witnesses
+        self._table: Dict[Tuple[Tuple[str, ...], str], List[str]] = {}
+
+    def combine(self, effects: List[str], ingredient: str) -> List[str]:
+        """Combine effects with an ingredient, see ``Engine.combine``.
+
+        The returned list is shared with the cache and must not be modified.
+        """
+        key = (tuple(effects), ingredient)
+        result = self._table.get(key)
+        if result is None:
+            result = self.engine.combine(effects, ingredient)
+            if len(self._table) < self.max_entries:
+                self._table[key] = result
+        return result
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+
+class Solver:
+    """Pathfinder and optimizer bound to one set of loaded data.
+
+    A Solver is built once and reused across queries: it owns the engine,
+    a cache of effect transitions, the production costs computed so far and
+    an optional persistent result cache.
+
+    Attributes:
+        data: Dictionary containing all loaded data
+        engine: Engine built from the combination rules
+        transitions: Memoized engine transitions shared by all searches
+        cache: Optional result cache (see src.cache.result_cache.ResultCache)
+        memory_limit: Optional approximate bytes the optimizer's search
+                      structures may use (see ``find_best_path``)
+        external_dir: Optional directory in which the optimizer keeps its
+                      search on disk ('' for the system temporary directory)
+    """
+
+    def __init__(self, data: Dict[str, Any], cache=None,
+                 max_transitions: int = DEFAULT_MAX_TRANSITIONS,
+                 memory_limit: Optional[int] = None, external_dir: Optional[str] = None):
+        """Build the engine and caches from loaded data.
+
+        Args:
+            data: Dictionary containing all loaded data
+            cache: Optional result cache consulted before every search
+            max_transitions: Maximum number of memoized engine transitions
+            memory_limit: Optional approximate bytes the optimizer's search
+                          structures may use
+            external_dir: Optional directory for an external-memory optimizer search
+        """
+        self.data = data
+        self.engine = Engine(data['combinations'], data['max_effects'], data['effect_priorities'])
+        self.transitions = TransitionCache(self.engine, max_transitions)
+        self.cache = cache
+        self.memory_limit = memory_limit
+        self.external_dir = external_dir
+        self.effect_multipliers = data['effect_multipliers']
+        self.ingredient_prices = data['ingredient_prices']
+        self.effect_priorities = data['effect_priorities']
+        self.base_prices = data['drug_pricing']['base_prices']
+        self._production_costs: Dict[Tuple, float] = {}
+        self._relaxations: Dict[Tuple, Relaxation] = {}
+        self._graphs: Dict[Tuple[str, ...], StateGraph] = {}
+
+    def production_cost(self, drug_type: str, options: Dict[str, Any]) -> float:
+        """Return the production cost per unit for a drug and production options."""
+        key = (drug_type, tuple(sorted(options.items())))
+        if key not in self._production_costs:
+            self._production_costs[key] = calculate_production_cost(drug_type, options, self.data)
+        return self._production_costs[key]
+
+    def optimize(self, options: Dict[str, Any], stats: bool = False,
+                 progress: Optional[Callable[[SearchProgress], None]] = None) -> Dict[str, Any]:
+        """Find the most profitable recipe.
+
+        Args:
+            options: Job parameters as in optimizer batch files: drug_type,
+                     depth (default 3), initial_effects, prod_options and
+                     constraints (see ``SearchConstraints.from_dict``)
+            stats: Add the search counters (``SearchStats.to_dict``) under
+                   'stats'; results served from the cache get ``{'cached': True}``
+            progress: Optional callback receiving the search's progress (see
+                      ``SearchStats``); not called for cached results
+
+        Returns:
+            Result record with status 'ok' (effects, path and the cost and
+            value breakdown) or 'no_result'; with a memory limit or external
+            directory, also the 'search_mode' used ('bfs', 'dfs' if the limit
+            was reached, or 'external'; for cached results, the one that
+            found them)
+
+        Raises:
+            ValueError: If the constraints are invalid
+        """
+        if self.cache:
+            with span('cache lookup', 'cache'):
+                cached = self.cache.get('optimize', options)
+            if cached is not None:
+                # The record keeps the mode it was searched in; solvers without
+                # a memory limit or external directory report none
+                if self.memory_limit or self.external_dir is not None:
+                    cached.setdefault('search_mode', 'bfs')
+                else:
+                    cached.pop('search_mode', None)
+                return dict(cached, stats={'cached': True}) if stats else cached
+
+        drug_type = options['drug_type']
+        prod_cost = self.production_cost(drug_type, options.get('prod_options', {}))
+        base_price = self.base_prices[drug_type]
+        search_stats = SearchStats()
+        with span('find_best_path', 'search', depth=options.get('depth', 3)) as trace:
+            result = find_best_path(
+                self.transitions, base_price, prod_cost, options.get('depth', 3),
+                self.effect_multipliers, self.ingredient_prices, self.effect_priorities,
+                options.get('initial_effects', []), SearchConstraints.from_dict(options.get('constraints')),
+                search_stats, progress, self.memory_limit, self.external_dir
+            )
+            trace.update(mode=search_stats.mode, expanded=search_stats.expanded)
+
+        if not result:
+            record = {'status': 'no_result', 'params': options}
+        else:
+            record = self._optimize_record(options, *result)
+        if self.memory_limit or self.external_dir is not None:
+            record = dict(record, search_mode=search_stats.mode)
+        if result and self.cache:
+            self.cache.put('optimize', options, record)
+        return dict(record, stats=search_stats.to_dict()) if stats else record
+
+    def reoptimize(self, options: Dict[str, Any], graph: StateGraph, top: int = 1) -> Dict[str, Any]:
+        """Find the most profitable recipe by relaxing an explored state graph.
+
+        Gives the same result as ``optimize`` without searching: the graph's
+        transitions are re-priced with this solver's ingredient prices. Jobs
+        with the same depth share one relaxation. Jobs with constraints are
+        passed on to ``optimize``.
+
+        Args:
+            options: Job parameters as in optimizer batch files
+            graph: Graph explored from the job's initial effects to at least its depth
+            top: Number of recipes to return; recipes after the best one are
+                 listed under 'alternatives'
+
+        Returns:
+            Result record in the layout of ``optimize``
+
+        Raises:
+            ValueError: If the graph does not start from the job's initial effects
+        """
+        if SearchConstraints.from_dict(options.get('constraints')).active:
+            return self.optimize(options)
+        initial = sorted(options.get('initial_effects', []), key=lambda x: self.effect_priorities[x])
+        if tuple(initial) != graph.initial:
+            raise ValueError(f"Graph starts from {list(graph.initial)}, not {initial}")
+        depth = options.get('depth', 3)
+        key = (graph.fingerprint, graph.initial, depth)
+        if key not in self._relaxations:
+            self._relaxations[key] = graph.relax(self.ingredient_prices, depth)
+
+        drug_type = options['drug_type']
+        prod_cost = self.production_cost(drug_type, options.get('prod_options', {}))
+        recipes = self._relaxations[key].top_recipes(
+            self.base_prices[drug_type], prod_cost, self.effect_multipliers, top)
+        record = self._optimize_record(options, *recipes[0])
+        if top > 1:
+            record['alternatives'] = [
+                {k: v for k, v in self._optimize_record(options, *recipe).items() if k != 'params'}
+                for recipe in recipes[1:]
+            ]
+        return record
+
+    def state_graph(self, initial_effects: Sequence[str], depth: int) -> StateGraph:
+        """Return a state graph explored from the initial effects to at least depth.
+
+        Graphs are kept by the solver and explored deeper only when needed.
+        """
+        key = tuple(sorted(initial_effects, key=lambda x: self.effect_priorities[x]))
+        graph = self._graphs.get(key)
+        if graph is None or graph.max_depth < depth:
+            graph = self._graphs[key] = StateGraph.explore(
+                self.transitions, depth, key, rules_fingerprint(self.data))
+        return graph
+
+    def sensitivity(self, options: Dict[str, Any], parameters: Optional[Sequence[str]] = None,
+                    graph: Optional[StateGraph] = None) -> Dict[str, Any]:
+        """Compute how far each price can move before the optimal recipe changes.
+
+        Args:
+            options: Job parameters as in optimizer batch files
+            parameters: Ingredients and/or 'base_price' to analyse (default: all)
+            graph: Optional graph explored from the job's initial effects
+                   (default: ``state_graph``)
+
+        Returns:
+            Result record of ``reoptimize`` with a 'sensitivity' list holding,
+            per parameter, its current value, the interval over which the
+            recipe stays optimal ('lower', 'upper'; None if unbounded) and the
+            recipes taking over beyond each end ('below', 'above')
+
+        Raises:
+            ValueError: If the job has constraints
+        """
+        if SearchConstraints.from_dict(options.get('constraints')).active:
+            raise ValueError("Constraints are not supported with the graph-based analyses")
+        depth = options.get('depth', 3)
+        graph = graph or self.state_graph(options.get('initial_effects', []), depth)
+        record = self.reoptimize(options, graph)
+        base_price = self.base_prices[options['drug_type']]
+        relaxation = self._relaxations[(graph.fingerprint, graph.initial, depth)]
+        result = price_sensitivity(graph, relaxation, self.ingredient_prices, base_price,
+                                   self.effect_multipliers, parameters)
+        record['sensitivity'] = [interval._asdict() for interval in result['intervals']]
+        return record
+
+    def pareto(self, options: Dict[str, Any], graph: Optional[StateGraph] = None) -> Dict[str, Any]:
+        """Find the recipes trading off profit, number of ingredients and ingredient cost.
+
+        Args:
+            options: Job parameters as in optimizer batch files
+            graph: Optional graph explored from the job's initial effects
+                   (default: ``state_graph``)
+
+        Returns:
+            Result record of ``reoptimize`` for the most profitable recipe, with
+            every recipe on the Pareto frontier, most profitable first, under
+            'frontier'
+
+        Raises:
+            ValueError: If the job has constraints
+        """
+        if SearchConstraints.from_dict(options.get('constraints')).active:
+            raise ValueError("Constraints are not supported with the graph-based analyses")
+        depth = options.get('depth', 3)
+        graph = graph or self.state_graph(options.get('initial_effects', []), depth)
+        record = self.reoptimize(options, graph)
+        drug_type = options['drug_type']
+        prod_cost = self.production_cost(drug_type, options.get('prod_options', {}))
+        relaxation = self._relaxations[(graph.fingerprint, graph.initial, depth)]
+        front = relaxation.pareto_front(self.base_prices[drug_type], prod_cost, self.effect_multipliers)
+        record['frontier'] = [
+            {k: v for k, v in self._optimize_record(options, *recipe).items() if k not in ('status', 'params')}
+            for recipe in front
+        ]
+        return record
+
+    def _optimize_record(self, options: Dict[str, Any], effects: Sequence[str], path: List[str],
+                         ingredient_cost: float) -> Dict[str, Any]:
+        """Build the result record of an optimizer job from its recipe."""
+        drug_type = options['drug_type']
+        prod_cost = self.production_cost(drug_type, options.get('prod_options', {}))
+        base_price = self.base_prices[drug_type]
+        total_value = get_effects_value(effects, base_price, self.effect_multipliers)
+        total_cost = prod_cost + ingredient_cost
+        return {
+            'status': 'ok',
+            'params': options,
+            'effects': list(effects),
+            'path': path,
+            'ingredient_cost': ingredient_cost,
+            'production_cost': prod_cost,
+            'base_price': base_price,
+            'total_value': total_value,
+            'total_cost': total_cost,
+            'profit': total_value - total_cost
+        }
+
+    def path(self, targets: Sequence[str], start: Optional[Sequence[str]] = None,
+             constraints: Optional[Dict[str, Any]] = None, stats: bool = False,
+             progress: Optional[Callable[[SearchProgress], None]] = None,
+             strategy: str = 'auto') -> Dict[str, Any]:
+        """Find the shortest ingredient sequence reaching all target effects.
+
+        Args:
+            targets: Effects that must all be active
+            start: Effects present before the first ingredient
+            constraints: Optional constraints as in batch files (see ``SearchConstraints.from_dict``)
+            stats: Add the search counters under 'stats', as in ``optimize``
+            progress: Optional progress callback, as in ``optimize``
+            strategy: Search strategy: 'bfs', 'iddfs' or 'auto' (see ``find_path``);
+                      all find equally short paths, but not always the same
+                      one, so results are cached per strategy
+
+        Returns:
+            Result record with status 'ok' (path and final effects) or 'fail'
+
+        Raises:
+            ValueError: If the constraints or the strategy are invalid
+        """
+        params = {'desired_effects': list(targets), 'initial_effects': list(start or [])}
+        if constraints:
+            params['constraints'] = constraints
+        if strategy != 'auto':
+            params['strategy'] = strategy
+        if self.cache:
+            with span('cache lookup', 'cache'):
+                cached = self.cache.get('path', params)
+            if cached is not None:
+                return dict(cached, stats={'cached': True}) if stats else cached
+
+        initial_effects = set(params['initial_effects'])
+        search_stats = SearchStats()
+        with span('find_path', 'search', strategy=strategy) as trace:
+            path = find_path(self.transitions, set(targets), initial_effects,
+                             SearchConstraints.from_dict(constraints), self.ingredient_prices, search_stats,
+                             progress, strategy)
+            trace.update(mode=search_stats.mode, expanded=search_stats.expanded)
+        if path:
+            current_effects = list(initial_effects)
+            for ingredient in path:
+                current_effects = self.engine.combine(current_effects, ingredient)
+            record = {'status': 'ok', 'params': params,
+                      'effects': sorted(set(current_effects)), 'path': path}
+        else:
+            record = {'status': 'fail', 'params': params, 'reason': 'No solution found.'}
+        if self.cache:
+            self.cache.put('path', params, record)
+        return dict(record, stats=search_stats.to_dict()) if stats else record
+
+
+# Environment variable holding the optimizer's search memory limit in MB, so
+# that batch workers inherit it from the runner
+MEMORY_LIMIT_ENV_VAR = 'PATHFINDER_MEMORY_LIMIT'
+
+# Environment variable naming the directory of external-memory optimizer searches
+EXTERNAL_DIR_ENV_VAR = 'PATHFINDER_EXTERNAL_DIR'
+
+
+def memory_limit_bytes(megabytes: Optional[float] = None) -> Optional[int]:
+    """Return a search memory limit in bytes, from MB or $PATHFINDER_MEMORY_LIMIT.
+
+    Args:
+        megabytes: Limit in MB (default: the environment variable, if set)
+
+    Returns:
+        Limit in bytes, or None for no limit
+    """
+    if megabytes is None:
+        value = os.environ.get(MEMORY_LIMIT_ENV_VAR)
+        megabytes = float(value) if value else None
+    return int(megabytes * 1024 * 1024) if megabytes else None
+
+
+_solvers: Dict[Tuple[Optional[str], int], Solver] = {}
+
+
+def get_solver(data: Optional[Dict[str, Any]] = None, cache_path: Optional[str] = None,
+               cache_size: Optional[int] = None) -> Solver:
+    """Return the Solver of this process, building it on first use.
+
+    Batch workers call this for every job, so the engine and caches are built
+    once per worker process rather than once per job. The solver's search
+    memory limit is read from $PATHFINDER_MEMORY_LIMIT (MB), and searches run
+    on disk in $PATHFINDER_EXTERNAL_DIR if it is set.
+
+    Args:
+        data: Loaded data; only used when the solver is first built
+              (default: load_all_data())
+        cache_path: Optional result cache file (default: $PATHFINDER_CACHE)
+        cache_size: Maximum size of the result cache in bytes
+
+    Returns:
+        The per-process solver for the given result cache
+    """
+    from src.cache.result_cache import DEFAULT_MAX_BYTES, get_cache
+    cache = get_cache(cache_path, cache_size or DEFAULT_MAX_BYTES)
+    key = (os.path.abspath(cache.path) if cache else None, os.getpid())
+    if key not in _solvers:
+        if data is None:
+            from src.data.loader import load_all_data
+            data = load_all_data()
+        with span('build solver', 'setup'):
+            _solvers[key] = Solver(data, cache, memory_limit=memory_limit_bytes(),
+                                   external_dir=os.environ.get(EXTERNAL_DIR_ENV_VAR))
+    return _solvers[key]
@@ -0,0 +1,308 @@
+"""
+Explored state graph of the optimizer search, reusable across price changes.
+
+Which effect sets can be reached, and through which ingredients, depends only
+on the combination rules; prices only change what each recipe costs. A
+``StateGraph`` records every effect set reachable from a starting set within
+a number of ingredients, together with the state each ingredient leads to.
+After a price update the cheapest recipe for every state is recomputed by
+relaxing the stored transitions (a hop-bounded Bellman-Ford pass) instead of
+searching again, and the most profitable recipes are read off the result.
+
+Graphs are saved with ``save`` and reused by ``load_or_explore`` as long as the
+combination rules they were built from are unchanged.
+"""
+import hashlib
+import heapq
+import os
+import pickle
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .optimizer import get_effects_value
+
+_GRAPH_VERSION = 1
+
+
+def rules_fingerprint(data: Dict[str, Any]) -> str:
+    """Return a hash of the data the reachable states depend on.
+
+    Prices and pricing constants are not part of the fingerprint, so a graph
+    stays valid when they change.
+    """
+    rules = (data['combinations'], data['max_effects'], sorted(data['effect_priorities'].items()))
+    return hashlib.sha256(repr(rules).encode()).hexdigest()
+
+
+class Relaxation:
+    """Cheapest recipe for every state of a graph under one set of prices.
+
+    Attributes:
+        graph: The relaxed graph
+        max_depth: Maximum number of ingredients per recipe
+        costs: Cheapest ingredient cost per reachable state id
+    """
+
+    def __init__(self, graph: 'StateGraph', max_depth: int, costs: Dict[int, float],
+                 history: Dict[int, List[Tuple[int, float, int, int]]]):
+        self.graph = graph
+        self.max_depth = max_depth
+        self.costs = costs
+        # state id -> improvements as (ingredients used, cost, previous state id, ingredient index)
+        self._history = history
+
+    def recipe(self, state: int) -> List[str]:
+        """Return the cheapest ingredient sequence reaching a state."""
+        return self._recipe(state, self.max_depth)
+
+    def top_recipes(self, base_price: float, prod_cost: float, effect_multipliers: Dict[str, float],
+                    count: int = 1) -> List[Tuple[List[str], List[str], float]]:
+        """Return the most profitable recipes, best first.
+
+        Args:
+            base_price: Base price of the drug
+            prod_cost: Production cost per unit
+            effect_multipliers: Dictionary mapping effects to their value multipliers
+            count: Number of recipes to return
+
+        Returns:
+            List of (effects, ingredients, ingredient cost) tuples, in the same
+            layout as the result of ``find_best_path``
+        """
+        states = self.graph.states
+
+        def profit(state):
+            value = get_effects_value(states[state], base_price, effect_multipliers)
+            return value - (prod_cost + self.costs[state]), -state
+
+        best = heapq.nlargest(count, self.costs, key=profit)
+        return [(list(states[state]), self.recipe(state), self.costs[state]) for state in best]
+
+    def pareto_front(self, base_price: float, prod_cost: float,
+                     effect_multipliers: Dict[str, float]) -> List[Tuple[List[str], List[str], float]]:
+        """Return the recipes not dominated in profit, length and ingredient cost.
+
+        A recipe is dominated if another one is at least as profitable, uses at
+        most as many ingredients and costs at most as much, and is strictly
+        better in one of them. Every improvement recorded while relaxing is a
+        recipe that no shorter recipe to the same state matches in cost, so
+        the candidates are already pruned per state.
+
+        Args:
+            base_price: Base price of the drug
+            prod_cost: Production cost per unit
+            effect_multipliers: Dictionary mapping effects to their value multipliers
+
+        Returns:
+            List of (effects, ingredients, ingredient cost) tuples, most
+            profitable first
+        """
+        states = self.graph.states
+        # Only the most profitable candidate per (length, cost) can be on the front
+        candidates: Dict[Tuple[int, float], Tuple[float, int]] = {}
+        for state, improvements in self._history.items():
+            value = get_effects_value(states[state], base_price, effect_multipliers)
+            for hops, cost, _, _ in improvements:
+                if hops > self.max_depth:
+                    continue
+                profit = value - (prod_cost + cost)
+                best = candidates.get((hops, cost))
+                if best is None or (profit, -state) > (best[0], -best[1]):
+                    candidates[(hops, cost)] = (profit, state)
+
+        front = []
+        for (hops, cost), (profit, state) in sorted(candidates.items()):
+            # Earlier candidates are never longer, so only cost and profit need comparing
+            if any(c <= cost and p >= profit for _, c, p, _ in front):
+                continue
+            front.append((hops, cost, profit, state))
+        front.sort(key=lambda item: (-item[2], item[0], item[1]))
+        return [(list(states[state]), self._recipe(state, hops), cost) for hops, cost, _, state in front]
+
+    def _recipe(self, state: int, hops: int) -> List[str]:
+        """Return the cheapest ingredient sequence reaching a state with at most hops ingredients."""
+        path = []
+        while True:
+            hops, _, previous, ingredient = next(
+                entry for entry in reversed(self._history[state]) if entry[0] <= hops)
+            if previous < 0:
+                break
+            path.append(self.graph.ingredients[ingredient])
+            state, hops = previous, hops - 1
+        path.reverse()
+        return path
+
+
+class StateGraph:
+    """Effect sets reachable from a starting set, and the transitions between them.
+
+    States are numbered in breadth-first order, so the states that can still
+    be extended (those reached with fewer than ``max_depth`` ingredients) are
+    exactly the ids below ``expandable``.
+
+    Attributes:
+        initial: Starting effects, sorted by priority
+        max_depth: Maximum number of ingredients explored
+        ingredients: Ingredients in transition order
+        states: Effect tuple of every state id
+        depths: Fewest ingredients needed to reach every state id
+        expandable: Number of states with outgoing transitions
+        successors: Flat table; the state reached from state ``s`` with
+                    ingredient ``i`` is ``successors[s * len(ingredients) + i]``
+        fingerprint: ``rules_fingerprint`` of the data the graph was built from
+    """
+
+    def __init__(self, initial: Tuple[str, ...], max_depth: int, ingredients: Tuple[str, ...],
+                 states: List[Tuple[str, ...]], depths: array, expandable: int,
+                 successors: array, fingerprint: str):
+        self.initial = initial
+        self.max_depth = max_depth
+        self.ingredients = ingredients
+        self.states = states
+        self.depths = depths
+        self.expandable = expandable
+        self.successors = successors
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def explore(cls, engine, max_depth: int, initial: Optional[Sequence[str]] = None,
+                fingerprint: str = '') -> 'StateGraph':
+        """Explore every state reachable within max_depth ingredients.
+
+        Args:
+            engine: Engine instance containing combination rules
+            max_depth: Maximum number of ingredients
+            initial: Optional list of effects to start with
+            fingerprint: ``rules_fingerprint`` of the engine's data
+
+        Returns:
+            The explored graph
+        """
+        ingredients = tuple(engine.base_effects)
+        root = tuple(sorted(initial or [], key=lambda x: engine.effect_priorities[x]))
+        ids = {root: 0}
+        states = [root]
+        depths = array('b', [0])
+        successors = array('i')
+        frontier = [0]
+        for depth in range(1, max_depth + 1):
+            next_frontier = []
+            for state in frontier:
+                effects = list(states[state])
+                for ingredient in ingredients:
+                    new_state = tuple(engine.combine(effects, ingredient))
+                    new_id = ids.get(new_state)
+                    if new_id is None:
+                        new_id = ids[new_state] = len(states)
+                        states.append(new_state)
+                        depths.append(depth)
+                        next_frontier.append(new_id)
+                    successors.append(new_id)
+            frontier = next_frontier
+        return cls(root, max_depth, ingredients, states, depths, len(successors) // len(ingredients),
+                   successors, fingerprint)
+
+    def relax(self, ingredient_prices: Dict[str, float], max_depth: Optional[int] = None,
+              counted: Optional[str] = None) -> Relaxation:
+        """Compute the cheapest recipe for every state under the given prices.
+
+        With ``counted`` set, recipes are additionally told apart by how often
+        they use that ingredient: the relaxation then holds the cheapest recipe
+        for every (state, count) pair, numbered ``state * (max_depth + 1) + count``.
+
+        Args:
+            ingredient_prices: Dictionary mapping ingredients to their prices
+            max_depth: Maximum number of ingredients (default and at most: the graph's depth)
+            counted: Optional ingredient whose uses are counted
+
+        Returns:
+            Cheapest costs and recipes per state, or per (state, count) pair
+
+        Raises:
+            ValueError: If max_depth exceeds the explored depth
+        """
+        if max_depth is None:
+            max_depth = self.max_depth
+        if max_depth > self.max_depth:
+            raise ValueError(f"Graph was explored to depth {self.max_depth}, not {max_depth}")
+        prices = [ingredient_prices.get(ingredient, 0) for ingredient in self.ingredients]
+        width = len(prices)
+        stride = max_depth + 1 if counted else 1
+        steps = [int(ingredient == counted) for ingredient in self.ingredients]
+        successors = self.successors
+        costs = {0: 0.0}
+        history = {0: [(0, 0.0, -1, -1)]}
+        changed = [0]
+        # Only labels that got cheaper in the previous round can improve others
+        for hops in range(1, max_depth + 1):
+            improved = {}
+            for label in changed:
+                state, count = divmod(label, stride)
+                if state >= self.expandable:
+                    continue
+                base = costs[label]
+                row = state * width
+                for ingredient, price in enumerate(prices):
+                    target = successors[row + ingredient] * stride + count + steps[ingredient]
+                    cost = base + price
+                    if cost < costs.get(target, float('inf')) and (
+                            target not in improved or cost < improved[target][0]):
+                        improved[target] = (cost, label, ingredient)
+            for target, (cost, label, ingredient) in improved.items():
+                costs[target] = cost
+                history.setdefault(target, []).append((hops, cost, label, ingredient))
+            changed = list(improved)
+        return Relaxation(self, max_depth, costs, history)
+
+    def save(self, path: str) -> None:
+        """Write the graph to a file, replacing it atomically."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((_GRAPH_VERSION, self.__dict__), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['StateGraph']:
+        """Read a graph written by ``save``; return None if it is missing or outdated."""
+        try:
+            with open(path, 'rb') as f:
+                version, fields = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+        if version != _GRAPH_VERSION:
+            return None
+        graph = cls.__new__(cls)
+        graph.__dict__.update(fields)
+        return graph
+
+
+def graph_path(directory: str, fingerprint: str, initial: Sequence[str]) -> str:
+    """Return the file holding the graph for the given rules and starting effects."""
+    key = hashlib.sha256(repr((fingerprint, sorted(initial))).encode()).hexdigest()[:16]
+    return os.path.join(directory, f"graph-{key}.pickle")
+
+
+def load_or_explore(directory: str, engine, data: Dict[str, Any], max_depth: int,
+                    initial: Optional[Sequence[str]] = None) -> StateGraph:
+    """Return the saved graph for the starting effects, exploring and saving it if needed.
+
+    A saved graph is reused for any depth up to the one it was explored to;
+    graphs built from different combination rules are explored again.
+
+    Args:
+        directory: Directory holding saved graphs
+        engine: Engine instance containing combination rules
+        data: Dictionary containing all loaded data
+        max_depth: Maximum number of ingredients needed
+        initial: Optional list of effects to start with
+
+    Returns:
+        A graph explored to at least max_depth
+    """
+    fingerprint = rules_fingerprint(data)
+    path = graph_path(directory, fingerprint, initial or [])
+    graph = StateGraph.load(path)
+    if graph is None or graph.fingerprint != fingerprint or graph.max_depth < max_depth:
+        graph = StateGraph.explore(engine, max_depth, initial, fingerprint)
+        os.makedirs(directory, exist_ok=True)
+        graph.save(path)
+    return graph
@@ -0,0 +1,55 @@
+"""
+Fixed-size transposition table for the depth-first searches.
+
+The depth-first searches revisit the same effect set along many ingredient
+orders. A ``TranspositionTable`` remembers, per state, the largest number of
+ingredients still allowed and the lowest cost with which the state has been
+searched; a later visit that can add no more ingredients and costs no less
+can find nothing new and is skipped.
+
+The table is direct-mapped: a state's slot is its hash modulo the capacity,
+and storing a state replaces whatever held its slot. Memory use is therefore
+fixed up front, lookups never confuse two states, and a lost entry only costs
+repeated work, never a wrong result.
+"""
+from typing import Hashable, List, Optional, Tuple
+
+# Approximate bytes per slot: the slot pointer and the (state, remaining, cost)
+# tuple; state tuples are shared with the engine's transition cache
+SLOT_BYTES = 100
+
+
+class TranspositionTable:
+    """Best remaining depth and cost searched per state, in a fixed number of slots.
+
+    Attributes:
+        capacity: Number of slots
+        hits: Visits skipped because a stored entry covered them
+    """
+
+    def __init__(self, capacity: int):
+        """Allocate the slots.
+
+        Args:
+            capacity: Number of slots (at least 1)
+        """
+        self.capacity = max(1, capacity)
+        self.hits = 0
+        self._slots: List[Optional[Tuple[Hashable, int, float]]] = [None] * self.capacity
+
+    @classmethod
+    def for_memory(cls, memory: int) -> 'TranspositionTable':
+        """Return a table using about the given number of bytes."""
+        return cls(memory // SLOT_BYTES)
+
+    def covers(self, state: Hashable, remaining: int, cost: float = 0) -> bool:
+        """Return True if the state was searched with at least as many ingredients left at no more cost."""
+        entry = self._slots[hash(state) % self.capacity]
+        if entry is not None and entry[1] >= remaining and entry[2] <= cost and entry[0] == state:
+            self.hits += 1
+            return True
+        return False
+
+    def store(self, state: Hashable, remaining: int, cost: float = 0) -> None:
+        """Record that the state is searched with the given ingredients left and cost."""
+        self._slots[hash(state) % self.capacity] = (state, remaining, cost)
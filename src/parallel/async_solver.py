@@ -0,0 +1,215 @@
+"""
+Asyncio facade for running pathfinder and optimizer searches from services.
+
+``find_path`` and ``find_best_path`` are CPU bound and can run for seconds, so
+calling them from a coroutine blocks the event loop. ``AsyncSolver`` runs them
+in a managed pool of worker processes instead:
+
+* identical requests that are in flight at the same time are coalesced into a
+  single computation whose result is shared by all callers;
+* cancelling a caller only abandons that caller, and the computation is stopped
+  (its worker killed and replaced) once no caller is waiting for it any more;
+* the per-task time and memory limits of ``WorkerLimits`` are enforced as in
+  ``SupervisedPool``.
+
+Example:
+    async with AsyncSolver(workers=4) as solver:
+        result = await solver.optimize('meth', depth=4)
+        path = await solver.find_path(['Calming', 'Energizing'])
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+from src.cache.result_cache import DEFAULT_MAX_BYTES, normalize_job
+from src.parallel.batch_io import failure_record
+from src.parallel.supervisor import WorkerLimits, Worker, process_rss
+
+
+def _run_path_job(job: Dict[str, Any], cache_path: Optional[str], cache_size: int) -> Dict[str, Any]:
+    from src.cli.batch_pathfinder import process_pathfinder_job
+    return process_pathfinder_job(job, None, cache_path, cache_size)
+
+
+def _run_optimize_job(params: Dict[str, Any], cache_path: Optional[str], cache_size: int) -> Dict[str, Any]:
+    from src.parallel.batch_optimizer import run_optimizer_task
+    return run_optimizer_task(params, cache_path, cache_size)
+
+
+class AsyncSolver:
+    """Run searches in worker processes from asyncio code.
+
+    Attributes:
+        workers: Maximum number of worker processes
+        limits: Limits enforced on every computation
+        cache_path: Optional persistent result cache shared by the workers
+        cache_size: Maximum size of the persistent result cache in bytes
+        computations: Number of computations started (coalesced requests count once)
+    """
+
+    def __init__(self, workers: Optional[int] = None, limits: Optional[WorkerLimits] = None,
+                 cache_path: Optional[str] = None, cache_size: int = DEFAULT_MAX_BYTES,
+                 poll_interval: float = 0.1):
+        """Create the solver; worker processes are started on first use.
+
+        Args:
+            workers: Maximum number of worker processes (default: CPU count)
+            limits: Limits enforced on every computation
+            cache_path: Optional persistent result cache file
+            cache_size: Maximum size of the persistent result cache in bytes
+            poll_interval: Seconds between time and memory limit checks
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.limits = limits or WorkerLimits()
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        self.poll_interval = poll_interval
+        self.computations = 0
+        self._started = 0
+        self._idle: Optional[asyncio.Queue] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+
+    async def find_path(self, desired_effects: Sequence[str], initial_effects: Sequence[str] = (),
+                        constraints: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Find the shortest ingredient sequence reaching the desired effects.
+
+        Args:
+            desired_effects: Effects that must all be active
+            initial_effects: Effects present before the first ingredient
+            constraints: Optional constraints as in batch files (see ``SearchConstraints``)
+
+        Returns:
+            Pathfinder result record (status 'ok' with 'path' and 'effects',
+            'fail', or 'timeout'/'oom'/'error' with a 'reason')
+        """
+        job = {'desired_effects': list(desired_effects), 'initial_effects': list(initial_effects)}
+        if constraints:
+            job['constraints'] = constraints
+        return await self._submit('path', job, _run_path_job)
+
+    async def optimize(self, drug_type: str, depth: int = 3, initial_effects: Sequence[str] = (),
+                       prod_options: Optional[Dict[str, Any]] = None,
+                       constraints: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Find the most profitable recipe.
+
+        Args:
+            drug_type: 'marijuana', 'meth' or 'cocaine'
+            depth: Maximum number of ingredients
+            initial_effects: Effects present before the first ingredient
+            prod_options: Production options as in batch files (grow_tent, pgr, strain, quality)
+            constraints: Optional constraints as in batch files (see ``SearchConstraints``)
+
+        Returns:
+            Optimizer result record as written by the batch runner
+        """
+        params = {'drug_type': drug_type, 'depth': depth,
+                  'initial_effects': list(initial_effects), 'prod_options': dict(prod_options or {})}
+        if constraints:
+            params['constraints'] = constraints
+        return await self._submit('optimize', params, _run_optimize_job)
+
+    async def _submit(self, kind: str, params: Dict[str, Any], fn) -> Dict[str, Any]:
+        """Run a job, sharing the computation with identical in-flight requests."""
+        key = json.dumps([kind, normalize_job(kind, params)], sort_keys=True)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(fn, params))
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            self.computations += 1
+            task.add_done_callback(lambda _: self._forget(key, task))
+        self._waiters[key] += 1
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Stop the computation once nobody is waiting for it any more
+            if self._waiters.get(key) == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            if key in self._waiters:
+                self._waiters[key] -= 1
+        return dict(result, params=params)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+
+    async def _acquire(self) -> Worker:
+        """Return an idle worker, starting one if the pool is not full yet."""
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        if self._idle.empty() and self._started < self.workers:
+            self._started += 1
+            return Worker(multiprocessing.get_context(), self.limits)
+        return await self._idle.get()
+
+    async def _run(self, fn, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one computation on an idle worker, enforcing the limits."""
+        loop = asyncio.get_running_loop()
+        worker = await self._acquire()
+        ready = loop.create_future()
+        fd = worker.conn.fileno()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            worker.dispatch(fn, params, (self.cache_path, self.cache_size))
+            while not ready.done():
+                await asyncio.wait({ready}, timeout=self.poll_interval)
+                failure = None if ready.done() else self._check_limits(worker)
+                if failure:
+                    loop.remove_reader(fd)
+                    worker = self._replace(worker, kill=True)
+                    return failure_record(params, *failure)
+            loop.remove_reader(fd)
+            try:
+                status, value, retire = worker.conn.recv()
+            except (EOFError, OSError):
+                worker.process.join(timeout=5)
+                status, value, retire = 'error', f"Worker exited with code {worker.process.exitcode}", True
+            worker.busy = False
+            if retire:
+                worker = self._replace(worker, kill=False)
+            return value if status == 'ok' else failure_record(params, status, value)
+        except asyncio.CancelledError:
+            loop.remove_reader(fd)
+            worker = self._replace(worker, kill=True)
+            raise
+        finally:
+            self._idle.put_nowait(worker)
+
+    def _check_limits(self, worker: Worker) -> Optional[Tuple[str, str]]:
+        """Return (status, reason) if the running task exceeded a limit."""
+        elapsed = time.monotonic() - worker.started
+        timeout, memory_limit = self.limits.timeout, self.limits.memory_limit
+        if timeout is not None and elapsed > timeout:
+            return 'timeout', f"Exceeded time limit of {timeout:g}s"
+        if memory_limit is not None and (process_rss(worker.process.pid) or 0) > memory_limit:
+            return 'oom', f"Exceeded memory limit of {memory_limit / 2**20:.0f} MB"
+        return None
+
+    def _replace(self, worker: Worker, kill: bool) -> Worker:
+        """Stop a worker and start a fresh one in its place."""
+        worker.stop(kill=kill)
+        return Worker(multiprocessing.get_context(), self.limits)
+
+    async def close(self) -> None:
+        """Cancel in-flight computations and stop all worker processes."""
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        if self._idle is not None:
+            while not self._idle.empty():
+                self._idle.get_nowait().stop()
+        self._started = 0
+
+    async def __aenter__(self) -> 'AsyncSolver':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
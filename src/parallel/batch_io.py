@@ -0,0 +1,265 @@
+"""
+Streaming input/output helpers for batch runners.
+
+Batch files ending in ``.jsonl`` are read lazily, one job per line, and jobs are
+submitted to the executor through a bounded window so that only a fixed number
+of futures is ever pending. Results are written as they complete, either as a
+JSON array (same layout as ``json.dump(results, f, indent=2)``) or as JSONL, or
+collected into a columnar ``.npz`` file (see ``src.parallel.columnar``).
+"""
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, as_completed, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple, Union
+from src.parallel.columnar import ColumnarWriter, ResultTable, is_columnar
+from src.utils.formatting import format_duration
+
+JSONL_SUFFIXES = ('.jsonl', '.ndjson')
+
+
+def is_jsonl(path: str) -> bool:
+    """Return True if the path names a line-delimited JSON file."""
+    return path.lower().endswith(JSONL_SUFFIXES)
+
+
+def iter_batch_jobs(batch_path: str) -> Iterator[Dict[str, Any]]:
+    """Iterate over the jobs in a batch file.
+
+    JSONL files are read one line at a time; blank lines are skipped.
+    JSON files must contain a list of jobs and are loaded in one go.
+    Columnar ``.npz`` results files yield their result records.
+
+    Args:
+        batch_path: Path to a ``.json``, ``.jsonl`` or ``.npz`` file
+
+    Yields:
+        Job parameter dictionaries in file order
+
+    Raises:
+        ValueError: If a JSONL line is not valid JSON
+    """
+    if is_columnar(batch_path):
+        with ResultTable(batch_path) as table:
+            yield from table.records()
+        return
+    if not is_jsonl(batch_path):
+        with open(batch_path, 'r') as f:
+            yield from json.load(f)
+        return
+
+    with open(batch_path, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_no} of {batch_path}: {e}")
+
+
+def count_batch_jobs(batch_path: str, shard: Optional[Tuple[int, int]] = None) -> int:
+    """Count the jobs in a batch file, or in one shard of it, without keeping them.
+
+    Args:
+        batch_path: Path to a ``.json``, ``.jsonl`` or ``.npz`` file
+        shard: Optional (shard index, shard count), 1-based
+
+    Returns:
+        Number of jobs
+    """
+    if is_columnar(batch_path):
+        with ResultTable(batch_path) as table:
+            total = len(table)
+    elif is_jsonl(batch_path):
+        with open(batch_path, 'r') as f:
+            total = sum(1 for line in f if line.strip())
+    else:
+        with open(batch_path, 'r') as f:
+            total = len(json.load(f))
+    if shard:
+        index, count = shard
+        total = max(0, (total - index) // count + 1)
+    return total
+
+
+def default_results_path(batch_path: str, name: str) -> str:
+    """Build the default results path next to a batch file.
+
+    Args:
+        batch_path: Path to the batch file
+        name: Base name of the results file without extension
+
+    Returns:
+        ``<batch dir>/<name>.jsonl`` for JSONL batches, ``<name>.json`` otherwise
+    """
+    suffix = '.jsonl' if is_jsonl(batch_path) else '.json'
+    return os.path.join(os.path.dirname(batch_path), name + suffix)
+
+
+def failure_record(params: Dict[str, Any], status: str, reason: str) -> Dict[str, Any]:
+    """Build the result record of a job that did not complete.
+
+    Args:
+        params: Job parameters
+        status: Failure status, e.g. 'timeout', 'oom' or 'error'
+        reason: Human readable explanation
+
+    Returns:
+        Result record in the same layout as failed optimizer/pathfinder jobs
+    """
+    return {'status': status, 'params': params, 'reason': reason}
+
+
+def submit_bounded(executor: Executor, fn: Callable, items: Iterable[Any], window: int,
+                   *args: Any) -> Iterator[Future]:
+    """Submit ``fn(item, *args)`` for every item, keeping at most ``window`` in flight.
+
+    Items are pulled from the iterable only when a slot frees up, so a lazily
+    read batch never has more than ``window`` pending futures.
+
+    Args:
+        executor: Executor to submit work to
+        fn: Callable to run for each item
+        items: Iterable of items, consumed lazily
+        window: Maximum number of submitted but unfinished futures
+        *args: Extra positional arguments passed to ``fn`` after the item
+
+    Yields:
+        Completed futures in completion order
+    """
+    window = max(1, window)
+    pending: Set[Future] = set()
+    for item in items:
+        pending.add(executor.submit(fn, item, *args))
+        if len(pending) >= window:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from done
+    yield from as_completed(pending)
+
+
+class BatchProgress:
+    """Aggregate progress of a batch run, printed every few seconds.
+
+    Reports the jobs finished, the jobs finished per second and, when the
+    size of the batch is known, the estimated time left.
+
+    Attributes:
+        total: Number of jobs in the batch, or None if unknown
+        done: Number of jobs finished so far
+    """
+
+    def __init__(self, total: Optional[int] = None, interval: float = 5.0):
+        """Start measuring.
+
+        Args:
+            total: Number of jobs in the batch, or None if unknown
+            interval: Seconds between progress lines
+        """
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self._started = self._last = time.monotonic()
+
+    def rate(self) -> float:
+        """Return the jobs finished per second so far."""
+        elapsed = time.monotonic() - self._started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def remaining(self) -> Optional[float]:
+        """Return the estimated seconds until the batch is done, or None if unknown."""
+        rate = self.rate()
+        if self.total is None or not rate:
+            return None
+        return max(self.total - self.done, 0) / rate
+
+    def update(self, count: int = 1) -> None:
+        """Record finished jobs, printing a progress line if one is due."""
+        self.done += count
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            print(self.format())
+
+    def format(self) -> str:
+        """Return the current progress line."""
+        done = f"{self.done}/{self.total}" if self.total is not None else str(self.done)
+        line = f"Progress: {done} jobs, {self.rate():.2f} jobs/s"
+        remaining = self.remaining()
+        if remaining is not None:
+            line += f", about {format_duration(remaining)} left"
+        return line
+
+
+def open_results(path: str, append: bool = False) -> Union['ResultWriter', ColumnarWriter]:
+    """Open a results file for writing: columnar if it ends in ``.npz``, JSON or JSONL otherwise.
+
+    Args:
+        path: Path of the results file
+        append: Append to an existing file instead of truncating it (JSONL only)
+
+    Returns:
+        A ``ResultWriter`` or ``ColumnarWriter``
+    """
+    if is_columnar(path):
+        return ColumnarWriter(path, append)
+    return ResultWriter(path, append=append)
+
+
+class ResultWriter:
+    """Incrementally write batch results to a JSON or JSONL file.
+
+    JSON output is a list of objects indented exactly like
+    ``json.dump(results, f, indent=2)``; JSONL output has one object per line.
+
+    Attributes:
+        path: Path of the results file
+        count: Number of results written so far
+    """
+
+    def __init__(self, path: str, jsonl: Optional[bool] = None, append: bool = False):
+        """Open the results file for writing.
+
+        Args:
+            path: Path of the results file
+            jsonl: Force JSONL (True) or JSON (False); inferred from the suffix if None
+            append: Append to an existing file instead of truncating it (JSONL only)
+
+        Raises:
+            ValueError: If appending is requested for JSON output
+        """
+        self.path = path
+        self.jsonl = is_jsonl(path) if jsonl is None else jsonl
+        if append and not self.jsonl:
+            raise ValueError("Appending is only supported for JSONL results")
+        self.count = 0
+        self._file = open(path, 'a' if append else 'w')
+
+    def write(self, result: Dict[str, Any]) -> None:
+        """Append a single result record."""
+        if self.jsonl:
+            self._file.write(json.dumps(result) + '\n')
+        else:
+            body = json.dumps(result, indent=2).replace('\n', '\n  ')
+            self._file.write(('[\n  ' if self.count == 0 else ',\n  ') + body)
+        self.count += 1
+
+    def flush(self) -> None:
+        """Flush written results to disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Finish the file and close it."""
+        if self._file.closed:
+            return
+        if not self.jsonl:
+            self._file.write('\n]' if self.count else '[]')
+        self._file.close()
+
+    def __enter__(self) -> 'ResultWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -1,108 +1,338 @@
 import json
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from typing import List, Dict, Any
-from src.data.loader import load_all_data
-from src.engine.core import Engine
-from src.engine.optimizer import find_best_path, calculate_cost, calculate_units, get_effects_value
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from src.cache.result_cache import DEFAULT_MAX_BYTES, get_cache, normalize_job
+from src.engine.solver import Solver, get_solver
+from src.parallel.batch_io import (BatchProgress, ResultWriter, count_batch_jobs, failure_record,
+                                   iter_batch_jobs, open_results, submit_bounded)
+from src.parallel.scheduler import DEFAULT_CHUNK_SECONDS, CostModel, schedule_jobs
+from src.parallel.supervisor import SupervisedPool, WorkerLimits
+from src.parallel.work_queue import WorkQueue, default_worker_id, shard_jobs
+from src.utils.tracing import job_span, span, write_trace
 
-def run_optimizer_task(params: Dict[str, Any]) -> Dict[str, Any]:
+def run_optimizer_task(params: Dict[str, Any], cache_path: Optional[str] = None,
+                       cache_size: int = DEFAULT_MAX_BYTES,
+                       solver: Optional[Solver] = None, stats: bool = False) -> Dict[str, Any]:
     """
     Run a single optimizer task with given parameters.
+
+    Uses the per-process ``Solver`` (see ``get_solver``), so data, engine and
+    transition cache are set up once per worker. If a result cache is
+    configured (``cache_path`` or the PATHFINDER_CACHE environment variable),
+    cached results are returned without searching. Long-running callers can
+    pass their own ``solver``. With ``stats`` set, the record carries the
+    search counters under 'stats'.
     """
-    data = load_all_data()
-    engine = Engine(data['combinations'], data['max_effects'], data['effect_priorities'])
-    drug_type = params['drug_type']
-    depth = params.get('depth', 3)
-    initial_effects = params.get('initial_effects', [])
-    prod_options = params.get('prod_options', {})
-
-    # Calculate production cost
-    units = calculate_units(
-        drug_type,
-        prod_options.get('grow_tent', False),
-        prod_options.get('pgr', False),
-        data['drug_pricing']['production_units']
-    )
-    constants = data['drug_pricing']['constants']
-    cost_formula = data['drug_pricing']['cost_calculations'][drug_type]['formula']
-    kwargs = {'units': units}
-    if drug_type == 'marijuana':
-        kwargs.update({
-            'strain': prod_options.get('strain', 'og_kush'),
-            'strain_data': data['strain_data']
-        })
-    elif drug_type == 'meth':
-        kwargs.update({
-            'quality': prod_options.get('quality', 3),
-            'quality_costs': data['quality_costs']
-        })
-    elif drug_type == 'cocaine':
-        kwargs.update({
-            'ingredient_prices': data['ingredient_prices']
-        })
-    prod_cost = calculate_cost(drug_type, constants, cost_formula, **kwargs)
-    base_price = data['drug_pricing']['base_prices'][drug_type]
-
-    # Run optimizer
-    result = find_best_path(
-        engine,
-        base_price,
-        prod_cost,
-        depth,
-        data['effect_multipliers'],
-        data['ingredient_prices'],
-        data['effect_priorities'],
-        initial_effects
-    )
-
-    if not result:
-        return {'status': 'no_result', 'params': params}
-    effects, path, ingredient_cost = result
-    total_value = get_effects_value(effects, base_price, data['effect_multipliers'])
-    total_cost = prod_cost + ingredient_cost
-    profit = total_value - total_cost
-    return {
-        'status': 'ok',
-        'params': params,
-        'effects': effects,
-        'path': path,
-        'ingredient_cost': ingredient_cost,
-        'production_cost': prod_cost,
-        'base_price': base_price,
-        'total_value': total_value,
-        'total_cost': total_cost,
-        'profit': profit
-    }
-
-def run_parallel_batch(batch_path: str, results_path: str, jobs: int = 4):
+    solver = solver or get_solver(cache_path=cache_path, cache_size=cache_size)
+    return solver.optimize(params, stats=stats)
+
+def format_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Round the money fields of an optimizer result to 2 decimal places."""
+    if result.get('status') == 'ok':
+        for key in ['ingredient_cost', 'production_cost', 'total_cost', 'profit']:
+            if key in result:
+                result[key] = round(result[key], 2)
+    return result
+
+def run_optimizer_chunk(chunk: List[Tuple[Optional[float], Dict[str, Any]]],
+                        cache_path: Optional[str] = None,
+                        cache_size: int = DEFAULT_MAX_BYTES) -> List[Tuple[Dict[str, Any], Optional[float], float, bool]]:
     """
-    Run multiple optimizer jobs in parallel from a batch JSON file.
+    Run a chunk of optimizer tasks in a single worker call, timing each task.
+
     Args:
-        batch_path: Path to the JSON file with parameter sets.
-        results_path: Path to save the JSON results.
+        chunk: List of (predicted seconds or None, job parameters).
+        cache_path: Optional result cache file shared by all workers.
+        cache_size: Maximum size of the result cache in bytes.
+    Returns:
+        List of (result, predicted seconds, elapsed seconds, served from cache).
+    """
+    cache = get_cache(cache_path, cache_size)
+    timed = []
+    for predicted, params in chunk:
+        hits = cache.hits if cache else 0
+        start = time.perf_counter()
+        with job_span('optimize', params) as trace:
+            result = run_optimizer_task(params, cache_path, cache_size, stats=True)
+            trace['status'] = result['status']
+        elapsed = time.perf_counter() - start
+        timed.append((result, predicted, elapsed, bool(cache) and cache.hits > hits))
+    return timed
+
+def iter_chunk_results(tasks: Iterable[List[Tuple[Optional[float], Dict[str, Any]]]], jobs: int,
+                       window: int, cache_path: Optional[str], cache_size: int,
+                       limits: Optional[WorkerLimits] = None) -> Iterator[List[Tuple[Dict[str, Any], Optional[float], float, bool]]]:
+    """
+    Run optimizer chunks on a worker pool and yield their timed results.
+
+    Without limits the chunks run on a ``ProcessPoolExecutor`` with a bounded
+    submission window. With limits they run on a ``SupervisedPool``: a task
+    that exceeds its time or memory limit is killed and reported with status
+    ``timeout`` or ``oom``. Since the pool enforces them per task, chunks are
+    split into single jobs under a time or memory limit, so only the job over
+    the limit fails.
+    """
+    if limits is None or not limits.active:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for future in submit_bounded(executor, run_optimizer_chunk, tasks, window, cache_path, cache_size):
+                yield future.result()
+        return
+
+    if limits.timeout or limits.memory_limit:
+        tasks = ([job] for chunk in tasks for job in chunk)
+    with SupervisedPool(jobs, limits) as pool:
+        for outcome in pool.imap_unordered(run_optimizer_chunk, tasks, cache_path, cache_size):
+            if outcome.status == 'ok':
+                yield outcome.value
+            else:
+                yield [(failure_record(params, outcome.status, outcome.value), predicted, outcome.elapsed, False)
+                       for predicted, params in outcome.item]
+
+def run_optimizer_jobs(batch_jobs: Iterable[Dict[str, Any]], writer: ResultWriter, jobs: int = 4,
+                       window: Optional[int] = None, cache_path: Optional[str] = None,
+                       cache_size: int = DEFAULT_MAX_BYTES, model: Optional[CostModel] = None,
+                       chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+                       limits: Optional[WorkerLimits] = None,
+                       progress: Optional[BatchProgress] = None) -> Dict[str, float]:
+    """
+    Run optimizer jobs on a worker pool and write each result as it completes.
+
+    Args:
+        batch_jobs: Job parameters, consumed lazily unless ``model`` is given.
+        writer: Writer receiving the (rounded) result records.
         jobs: Number of parallel worker processes.
+        window: Maximum number of in-flight tasks (default: 4 per worker).
+        cache_path: Optional result cache file shared by all workers.
+        cache_size: Maximum size of the result cache in bytes.
+        model: Cost model; if given, jobs are scheduled longest-first and timed.
+        chunk_seconds: Jobs predicted below this many seconds are chunked.
+        limits: Optional per-job time/memory limits and worker recycling policy.
+        progress: Optional tracker notified of every finished job.
+    Returns:
+        Timing totals: number of timed jobs, predicted, actual and absolute error seconds.
     """
-    with open(batch_path, 'r') as f:
-        batch_params = json.load(f)
-    print(f"Running {len(batch_params)} optimizer jobs in parallel (max {jobs} workers)...")
-
-    results = []
-    with ProcessPoolExecutor(max_workers=jobs) as executor:
-        futures = [executor.submit(run_optimizer_task, p) for p in batch_params]
-        for future in as_completed(futures):
-            result = future.result()
-            results.append(result)
+    window = window or jobs * 4
+    if model:
+        tasks = schedule_jobs(list(batch_jobs), model, chunk_seconds)
+        print(f"Scheduled {sum(len(chunk) for chunk in tasks)} optimizer jobs longest-first in {len(tasks)} tasks")
+    else:
+        tasks = ([(None, params)] for params in batch_jobs)
+
+    totals = {'count': 0, 'predicted': 0.0, 'actual': 0.0, 'abs_error': 0.0}
+    for chunk_results in iter_chunk_results(tasks, jobs, window, cache_path, cache_size, limits):
+        for result, predicted, elapsed, cached in chunk_results:
+            timing = ''
+            if model:
+                result['timing'] = {'predicted': round(predicted, 3), 'actual': round(elapsed, 3)}
+                timing = f" ({elapsed:.2f}s, predicted {predicted:.2f}s)"
+                totals['count'] += 1
+                totals['predicted'] += predicted
+                totals['actual'] += elapsed
+                totals['abs_error'] += abs(elapsed - predicted)
+                if result['status'] == 'ok' and not cached:
+                    model.record(result['params'], elapsed)
             if result['status'] == 'ok':
-                print(f"[DONE] {result['params']} -> Profit: ${result['profit']:.2f}, Recipe: {' → '.join(result['path'])}")
+                print(f"[DONE] {result['params']} -> Profit: ${result['profit']:.2f}, Recipe: {' → '.join(result['path'])}{timing}")
+            elif 'reason' in result:
+                print(f"[{result['status'].upper()}] {result['params']} -> {result['reason']}{timing}")
             else:
-                print(f"[FAIL] {result['params']} -> No result found.")
-
-    # Format floats to 2 decimal places for relevant fields in each result
-    for result in results:
-        if result.get('status') == 'ok':
-            for key in ['ingredient_cost', 'production_cost', 'total_cost', 'profit']:
-                if key in result:
-                    result[key] = round(result[key], 2)
-    with open(results_path, 'w') as f:
-        json.dump(results, f, indent=2)
-    print(f"All results saved to {results_path}")
+                print(f"[FAIL] {result['params']} -> No result found.{timing}")
+            with span('write result', 'io'):
+                writer.write(format_result(result))
+            if progress:
+                progress.update()
+    return totals
+
+def _print_summary(model: Optional[CostModel], totals: Dict[str, float],
+                   cache_path: Optional[str], cache_size: int) -> None:
+    if model and totals['count']:
+        model.save()
+        print(f"Timing: predicted {totals['predicted']:.2f}s, actual {totals['actual']:.2f}s of work, "
+              f"mean absolute error {totals['abs_error'] / totals['count']:.2f}s per job")
+    cache = get_cache(cache_path, cache_size)
+    if cache:
+        print(f"Cache: {cache.summary()}")
+
+def _print_trace() -> None:
+    trace_path = write_trace()
+    if trace_path:
+        print(f"Trace: {trace_path}")
+
+def run_parallel_batch(batch_path: str, results_path: str, jobs: int = 4,
+                       window: Optional[int] = None, cache_path: Optional[str] = None,
+                       cache_size: int = DEFAULT_MAX_BYTES, schedule: bool = False,
+                       timings_path: Optional[str] = None,
+                       chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+                       limits: Optional[WorkerLimits] = None,
+                       shard: Optional[Tuple[int, int]] = None):
+    """
+    Run multiple optimizer jobs in parallel from a batch JSON or JSONL file.
+
+    JSONL batches are read lazily and at most ``window`` jobs are submitted to
+    the pool at any time, so memory use does not grow with the batch size.
+    Results are written to ``results_path`` as they complete.
+
+    With ``schedule`` enabled the whole batch is read up front, jobs are
+    submitted longest-predicted-first and tiny jobs are chunked together (see
+    ``src.parallel.scheduler``). Each result then carries its predicted and
+    actual run time, and measured timings are saved to ``timings_path`` to
+    tune future predictions.
+
+    With ``limits`` set, jobs that run too long or use too much memory are
+    killed and recorded with status ``timeout`` or ``oom``, and workers are
+    recycled after a number of tasks or above a memory threshold.
+
+    With ``shard`` set to (i, n), only every n-th job starting at job i is run.
+
+    While tracing is on ($PATHFINDER_TRACE, see ``src.utils.tracing``), every
+    job, search and result write is recorded and the trace is written at the end.
+    Args:
+        batch_path: Path to the JSON/JSONL file with parameter sets.
+        results_path: Path to save the results (JSONL if it ends in .jsonl, columnar if .npz).
+        jobs: Number of parallel worker processes.
+        window: Maximum number of in-flight tasks (default: 4 per worker).
+        cache_path: Optional result cache file shared by all workers.
+        cache_size: Maximum size of the result cache in bytes.
+        schedule: Submit jobs in cost-aware order instead of file order.
+        timings_path: JSON file with historical timings for the cost model.
+        chunk_seconds: Jobs predicted below this many seconds are chunked.
+        limits: Optional per-job time/memory limits and worker recycling policy.
+        shard: Optional (shard index, shard count), 1-based.
+    """
+    batch_jobs = iter_batch_jobs(batch_path)
+    if shard:
+        batch_jobs = shard_jobs(batch_jobs, *shard)
+    model = CostModel(timings_path) if schedule else None
+    progress = BatchProgress(count_batch_jobs(batch_path, shard))
+    print(f"Running optimizer jobs from {batch_path} in parallel (max {jobs} workers)...")
+
+    with span('run_parallel_batch', 'batch', batch=batch_path, jobs=jobs):
+        with open_results(results_path) as writer:
+            totals = run_optimizer_jobs(batch_jobs, writer, jobs, window, cache_path, cache_size,
+                                        model, chunk_seconds, limits, progress)
+    print(f"All {writer.count} results saved to {results_path} ({progress.rate():.2f} jobs/s)")
+    _print_summary(model, totals, cache_path, cache_size)
+    _print_trace()
+
+def run_queue_worker(work_dir: str, jobs: int = 4, window: Optional[int] = None,
+                     cache_path: Optional[str] = None, cache_size: int = DEFAULT_MAX_BYTES,
+                     schedule: bool = False, timings_path: Optional[str] = None,
+                     chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+                     limits: Optional[WorkerLimits] = None, worker_id: Optional[str] = None,
+                     requeue_after: Optional[float] = None) -> str:
+    """
+    Process optimizer tasks from a shared work directory until it is empty.
+
+    Several workers, on one or many hosts, can drain the same directory; see
+    ``src.parallel.work_queue``. Results are appended to
+    ``<work_dir>/results/<worker_id>.jsonl``.
+    Args:
+        work_dir: Work directory populated with ``WorkQueue.enqueue``.
+        worker_id: Identifier of this worker (default: hostname-pid).
+        requeue_after: Requeue claims older than this many seconds before starting.
+        Other arguments: see ``run_parallel_batch``.
+    Returns:
+        Path of this worker's results file.
+    """
+    queue = WorkQueue(work_dir)
+    worker_id = worker_id or default_worker_id()
+    model = CostModel(timings_path) if schedule else None
+    totals = {'count': 0, 'predicted': 0.0, 'actual': 0.0, 'abs_error': 0.0}
+    progress = BatchProgress()
+
+    def run_task(batch_jobs, writer):
+        task_totals = run_optimizer_jobs(batch_jobs, writer, jobs, window, cache_path, cache_size,
+                                         model, chunk_seconds, limits, progress)
+        for key, value in task_totals.items():
+            totals[key] += value
+
+    print(f"Worker {worker_id} processing optimizer tasks from {work_dir} (max {jobs} workers)...")
+    tasks = queue.drain(worker_id, run_task, requeue_after)
+    results_path = queue.results_path(worker_id)
+    print(f"Processed {tasks} tasks, results appended to {results_path}")
+    _print_summary(model, totals, cache_path, cache_size)
+    _print_trace()
+    return results_path
+
+def _job_key(params: Dict[str, Any]) -> str:
+    return json.dumps(normalize_job('optimize', params), sort_keys=True)
+
+def run_reprice_batch(batch_path: str, results_path: str, graph_dir: str,
+                      previous_path: Optional[str] = None, top: int = 1) -> List[Dict[str, Any]]:
+    """
+    Recompute the results of an optimizer batch after price changes.
+
+    Instead of searching again, every job is answered from the explored state
+    graph of its initial effects (see ``src.engine.state_graph``), re-priced
+    with the current data files. Graphs are saved in ``graph_dir`` and only
+    explored again when the combination rules change, so a price update costs
+    a relaxation per (initial effects, depth) rather than a search per job.
+
+    Results are compared with the previous results of the batch and jobs whose
+    best recipe changed cost or profit, or that no longer have a result, are
+    reported.
+    Args:
+        batch_path: Path to the JSON/JSONL file with parameter sets.
+        results_path: Path to save the results (JSONL if it ends in .jsonl, columnar if .npz).
+        graph_dir: Directory holding the saved state graphs.
+        previous_path: Results to compare with (default: results_path, if it exists).
+        top: Number of recipes per job; recipes after the best are listed under 'alternatives'.
+    Returns:
+        Rows of the change report: params, old and new recipe and profit.
+    """
+    from src.data.loader import load_all_data
+    from src.engine.state_graph import load_or_explore
+    from src.utils.cli_helpers import format_path, print_table
+
+    previous_path = previous_path or results_path
+    previous = {}
+    if os.path.exists(previous_path):
+        previous = {_job_key(record['params']): record for record in iter_batch_jobs(previous_path)
+                    if record.get('status') == 'ok'}
+
+    # Explore each graph once, to the deepest job starting from its effects
+    depths: Dict[Tuple[str, ...], int] = {}
+    for params in iter_batch_jobs(batch_path):
+        initial = tuple(sorted(params.get('initial_effects', [])))
+        depths[initial] = max(depths.get(initial, 0), params.get('depth', 3))
+
+    data = load_all_data()
+    solver = Solver(data)
+    graphs = {}
+    changes = []
+    print(f"Re-pricing optimizer jobs from {batch_path} using state graphs in {graph_dir}...")
+    with open_results(results_path) as writer:
+        for params in iter_batch_jobs(batch_path):
+            initial = tuple(sorted(params.get('initial_effects', [])))
+            if initial not in graphs:
+                graphs[initial] = load_or_explore(graph_dir, solver.engine, data, depths[initial], initial)
+            result = format_result(solver.reoptimize(params, graphs[initial], top))
+            old = previous.get(_job_key(params))
+            if result.get('status') != 'ok':
+                # Constrained jobs are searched again and may no longer have a result
+                if old is not None:
+                    changes.append({'params': params, 'old_path': old['path'], 'old_profit': old['profit'],
+                                    'path': None, 'profit': None})
+            # A different recipe with the same cost and profit is a tie, not a change
+            elif old is None or (old['profit'], old['ingredient_cost']) != (result['profit'], result['ingredient_cost']):
+                changes.append({'params': params, 'old_path': old and old['path'],
+                                'old_profit': old and old['profit'],
+                                'path': result['path'], 'profit': result['profit']})
+            writer.write(result)
+    print(f"All {writer.count} results saved to {results_path}")
+
+    if changes:
+        print(f"\n{len(changes)} of {writer.count} jobs changed:")
+        print_table(['Job', 'Old recipe', 'Old profit', 'New recipe', 'New profit'], [
+            [json.dumps(change['params']),
+             format_path(change['old_path']) if change['old_path'] is not None else '-',
+             f"${change['old_profit']:.2f}" if change['old_profit'] is not None else '-',
+             format_path(change['path']) if change['path'] is not None else '-',
+             f"${change['profit']:.2f}" if change['profit'] is not None else '-']
+            for change in changes
+        ])
+    else:
+        print("No recipe or profit changed.")
+    return changes
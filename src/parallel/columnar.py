@@ -0,0 +1,464 @@
+"""
+Columnar result files for large sweeps and batches.
+
+Batch results ending in ``.npz`` are written column by column instead of as
+one JSON object per job. Every result is flattened, nested dictionaries such
+as ``params`` and ``stats`` becoming dotted columns (``params.drug_type``,
+``stats.expanded``), and each column is stored as one NumPy ``.npy`` array in
+the ``.npz`` zip archive:
+
+- numbers and flags are fixed-width arrays: ``<i8`` integers, ``<f8`` floats
+  and ``|b1`` booleans. A column with a missing value is stored as floats,
+  with NaN marking the missing rows.
+- strings and everything else, including recipes (``path``) and effect lists,
+  are dictionary encoded: an ``<i4`` array of codes, -1 where missing, plus
+  the distinct values as a fixed-width ``<U`` array, ``dictionary/<column>``
+  for plain strings or ``json/<column>`` for JSON texts.
+
+Columns are moved to temporary files in blocks while results arrive, so a
+writer holds little more than the distinct strings in memory. The ``.npy``
+headers are written and read with ``numpy.lib.format`` when NumPy is
+installed and by hand otherwise; either way ``numpy.load`` opens the files
+as they are. A ``ResultTable`` filters and ranks the rows of a file while
+loading only the columns involved; dictionary-encoded columns are compared
+by code, so a condition is checked once per distinct value, not per row.
+"""
+import ast
+import heapq
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from array import array
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; .npy headers are then handled by hand
+    np = None
+
+COLUMNAR_SUFFIXES = ('.npz',)
+
+# Values a column keeps in memory before moving them to its temporary file
+SPILL_ROWS = 1 << 16
+
+_MAGIC = b'\x93NUMPY\x01\x00'
+
+# array typecodes of the fixed-width NumPy types
+_TYPECODES = {'<i8': 'q', '<f8': 'd', '<i4': 'i', '|b1': 'b'}
+_KIND_DESCR = {'bool': '|b1', 'int': '<i8', 'float': '<f8'}
+_NUMERIC = ('bool', 'int', 'float')
+
+
+def is_columnar(path: str) -> bool:
+    """Return True if the path names a columnar results file."""
+    return path.lower().endswith(COLUMNAR_SUFFIXES)
+
+
+def _kind(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int' if -2 ** 63 <= value < 2 ** 63 else 'json'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, str):
+        return 'str'
+    return 'json'
+
+
+def _flatten(record: Dict[str, Any], prefix: str = '') -> Iterator[Tuple[str, Any]]:
+    """Yield the dotted column names and values of a result, skipping None values."""
+    for key, value in record.items():
+        name = prefix + str(key)
+        if isinstance(value, dict) and value:
+            yield from _flatten(value, name + '.')
+        elif value is not None:
+            yield name, value
+
+
+class _Column:
+    """Values of one column, widened as values of other kinds arrive.
+
+    Every ``SPILL_ROWS`` values, the array is appended to a temporary file in
+    ``spill_dir`` and emptied. The distinct values of a dictionary-encoded
+    column stay in memory.
+    """
+
+    def __init__(self, kind: str, missing: int, spill_dir: Optional[str] = None):
+        self.kind = kind
+        self.length = 0
+        self._spill_dir = spill_dir
+        # Values before those in ``data``, little-endian
+        self._spill: Optional[BinaryIO] = None
+        if kind in _NUMERIC:
+            self.data = array(_TYPECODES[_KIND_DESCR[kind]])
+        else:
+            self.data = array('i')
+            self.codes: Dict[str, int] = {}
+            self.values: List[str] = []
+        if missing:
+            self.pad(missing)
+
+    def pad(self, count: int) -> None:
+        """Append missing values."""
+        if self.kind in ('bool', 'int'):
+            self._widen('float')
+        missing = math.nan if self.kind == 'float' else -1
+        while count > 0:
+            block = min(count, SPILL_ROWS)
+            self.data.extend([missing] * block)
+            self.length += block
+            count -= block
+            self._spill_full()
+
+    def append(self, value: Any) -> None:
+        kind = _kind(value)
+        if kind != self.kind:
+            if self.kind in _NUMERIC and kind in _NUMERIC:
+                if _NUMERIC.index(kind) > _NUMERIC.index(self.kind):
+                    self._widen(kind)
+            elif self.kind != 'json':
+                self._widen('json')
+        if self.kind in _NUMERIC:
+            self.data.append(value)
+        else:
+            self.data.append(self._code(value if self.kind == 'str' else json.dumps(value)))
+        self.length += 1
+        self._spill_full()
+
+    def _code(self, text: str) -> int:
+        code = self.codes.get(text)
+        if code is None:
+            code = self.codes[text] = len(self.values)
+            self.values.append(text)
+        return code
+
+    def _spill_full(self) -> None:
+        if len(self.data) < SPILL_ROWS:
+            return
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(dir=self._spill_dir)
+        self._spill.write(_little_endian(self.data))
+        self.data = array(self.data.typecode)
+
+    def _unspill(self) -> None:
+        """Read the spilled values back in front of ``data``."""
+        if self._spill is None:
+            return
+        self._spill.seek(0)
+        restored = array(self.data.typecode)
+        restored.frombytes(self._spill.read())
+        if sys.byteorder == 'big':
+            restored.byteswap()
+        restored.extend(self.data)
+        self.data = restored
+        self._spill.close()
+        self._spill = None
+
+    def _widen(self, kind: str) -> None:
+        if kind in _NUMERIC or self.kind in _NUMERIC:
+            # The stored type changes, so every value is converted (rare: at
+            # most a few times per column)
+            self._unspill()
+        old_kind, old = self.kind, self.data
+        self.kind = kind
+        if kind in _NUMERIC:
+            self.data = array(_TYPECODES[_KIND_DESCR[kind]], old)
+        elif old_kind in _NUMERIC:
+            self.data, self.codes, self.values = array('i'), {}, []
+            for value in old:
+                if old_kind == 'float' and math.isnan(value):
+                    self.data.append(-1)
+                else:
+                    self.data.append(self._code(json.dumps(bool(value) if old_kind == 'bool' else value)))
+        else:
+            self.values = [json.dumps(value) for value in self.values]
+            self.codes = {value: code for code, value in enumerate(self.values)}
+        self._spill_full()
+
+    def write(self, archive: zipfile.ZipFile, name: str) -> None:
+        """Write the column's array members, consuming its temporary file."""
+        descr = _KIND_DESCR[self.kind] if self.kind in _NUMERIC else '<i4'
+        with _npy_member(archive, name, descr, self.length) as f:
+            if self._spill is not None:
+                self._spill.seek(0)
+                shutil.copyfileobj(self._spill, f)
+                self._spill.close()
+                self._spill = None
+            f.write(_little_endian(self.data))
+        if self.kind in _NUMERIC:
+            return
+        width = max([len(value) for value in self.values] + [1])
+        folder = 'dictionary' if self.kind == 'str' else 'json'
+        with _npy_member(archive, f"{folder}/{name}", f'<U{width}', len(self.values)) as f:
+            for value in self.values:
+                f.write(value.encode('utf-32-le').ljust(4 * width, b'\0'))
+
+
+@contextmanager
+def _npy_member(archive: zipfile.ZipFile, name: str, descr: str, count: int) -> Iterator[BinaryIO]:
+    """Open a one-dimensional array member in NumPy's ``.npy`` format for its data."""
+    with archive.open(name + '.npy', 'w', force_zip64=True) as f:
+        header = {'descr': descr, 'fortran_order': False, 'shape': (count,)}
+        if np is not None:
+            np.lib.format.write_array_header_1_0(f, header)
+        else:
+            text = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({count},), }}"
+            # The header, magic and length field are padded to a multiple of 64 bytes
+            text += ' ' * (-(len(_MAGIC) + 2 + len(text) + 1) % 64) + '\n'
+            f.write(_MAGIC + len(text).to_bytes(2, 'little') + text.encode('latin1'))
+        yield f
+
+
+def _little_endian(data: array) -> bytes:
+    if sys.byteorder == 'big':
+        data = array(data.typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+
+class ColumnarWriter:
+    """Collect batch results and write them as a columnar ``.npz`` file.
+
+    Has the interface of ``ResultWriter``. Columns are kept in compact
+    arrays, moved in blocks to temporary files next to the results file
+    while results arrive, and the file is assembled on ``close``. The
+    distinct values of string and JSON columns (such as recipes) stay in
+    memory until then.
+
+    Attributes:
+        path: Path of the results file
+        count: Number of results written so far
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        """Start collecting results.
+
+        Args:
+            path: Path of the results file
+            append: Not supported; columnar files are written in one go
+
+        Raises:
+            ValueError: If appending is requested
+        """
+        if append:
+            raise ValueError("Appending is not supported for columnar results")
+        self.path = path
+        self.count = 0
+        self._columns: Dict[str, _Column] = {}
+        self._spill_dir = os.path.dirname(os.path.abspath(path))
+        self._closed = False
+
+    def write(self, result: Dict[str, Any]) -> None:
+        """Add a single result record."""
+        for name, value in _flatten(result):
+            column = self._columns.get(name)
+            if column is None:
+                column = self._columns[name] = _Column(_kind(value), self.count, self._spill_dir)
+            elif column.length < self.count:
+                column.pad(self.count - column.length)
+            column.append(value)
+        self.count += 1
+
+    def flush(self) -> None:
+        """Do nothing; the file is only written when closed."""
+
+    def close(self) -> None:
+        """Write the file."""
+        if self._closed:
+            return
+        self._closed = True
+        with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, column in self._columns.items():
+                if column.length < self.count:
+                    column.pad(self.count - column.length)
+                column.write(archive, name)
+
+    def __enter__(self) -> 'ColumnarWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _read_npy(archive: zipfile.ZipFile, name: str):
+    """Return the array of a ``.npy`` member: an ``array`` for numbers, a list for strings."""
+    with archive.open(name + '.npy') as f:
+        if np is not None:
+            version = np.lib.format.read_magic(f)
+            read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            descr = read_header(f)[2].str
+        else:
+            magic = f.read(len(_MAGIC))
+            if magic[:6] != _MAGIC[:6]:
+                raise ValueError(f"{name} is not a NumPy array")
+            size = int.from_bytes(f.read(2 if magic[6] == 1 else 4), 'little')
+            descr = ast.literal_eval(f.read(size).decode('latin1'))['descr']
+        data = f.read()
+    if descr.startswith('<U'):
+        width = 4 * int(descr[2:])
+        return [data[start:start + width].decode('utf-32-le').rstrip('\0')
+                for start in range(0, len(data), width)]
+    values = array(_TYPECODES[descr])
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class ResultTable:
+    """Columnar results file opened for queries.
+
+    Columns are read from the file the first time they are used. A query
+    selects rows by index (``select``) and only the rows asked for are
+    turned into dictionaries (``rows``).
+
+    Attributes:
+        path: Path of the results file
+        columns: Column names, in the order they first appeared
+    """
+
+    def __init__(self, path: str):
+        """Open a results file.
+
+        Args:
+            path: Path of an ``.npz`` file written by ``ColumnarWriter``
+        """
+        self.path = path
+        self._archive = zipfile.ZipFile(path)
+        names = [info.filename[:-4] for info in self._archive.infolist() if info.filename.endswith('.npy')]
+        self._dictionaries = {name.split('/', 1)[1]: name for name in names
+                              if name.startswith(('dictionary/', 'json/'))}
+        self.columns = [name for name in names if not name.startswith(('dictionary/', 'json/'))]
+        self._cache: Dict[str, Any] = {}
+        self._length: Optional[int] = None
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = len(self.column(self.columns[0])) if self.columns else 0
+        return self._length
+
+    def close(self) -> None:
+        self._archive.close()
+
+    def __enter__(self) -> 'ResultTable':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _check(self, name: str) -> None:
+        if name not in self.columns:
+            raise KeyError(f"No column {name!r} in {self.path}")
+
+    def column(self, name: str) -> array:
+        """Return a column's stored array: numbers, or the codes of a dictionary-encoded column."""
+        self._check(name)
+        if name not in self._cache:
+            self._cache[name] = _read_npy(self._archive, name)
+        return self._cache[name]
+
+    def dictionary(self, name: str) -> Optional[List[Any]]:
+        """Return the distinct values of a dictionary-encoded column by code, or None for numbers."""
+        self._check(name)
+        member = self._dictionaries.get(name)
+        if member is None:
+            return None
+        key = 'dictionary/' + name
+        if key not in self._cache:
+            values = _read_npy(self._archive, member)
+            self._cache[key] = [json.loads(value) for value in values] if member.startswith('json/') else values
+        return self._cache[key]
+
+    def values(self, name: str) -> List[Any]:
+        """Return a column's values, None where missing."""
+        data, dictionary = self.column(name), self.dictionary(name)
+        if dictionary is not None:
+            return [dictionary[code] if code >= 0 else None for code in data]
+        if data.typecode == 'b':
+            return [bool(value) for value in data]
+        if data.typecode == 'd':
+            return [None if math.isnan(value) else value for value in data]
+        return list(data)
+
+    def _matches(self, name: str, condition: Any) -> Callable[[int], bool]:
+        """Return a test of row indexes for one condition."""
+        test = condition if callable(condition) else (lambda value: value == condition)
+        data, dictionary = self.column(name), self.dictionary(name)
+        if dictionary is not None:
+            # Test each distinct value once, then compare codes
+            codes = {code for code, value in enumerate(dictionary) if test(value)}
+            return lambda row: data[row] in codes
+        if data.typecode == 'd':
+            return lambda row: not math.isnan(data[row]) and test(data[row])
+        if data.typecode == 'b':
+            return lambda row: test(bool(data[row]))
+        return lambda row: test(data[row])
+
+    def select(self, where: Optional[Dict[str, Any]] = None, order_by: Optional[str] = None,
+               descending: bool = True, limit: Optional[int] = None) -> List[int]:
+        """Return the indexes of the rows meeting every condition, optionally ranked.
+
+        Args:
+            where: Dictionary mapping columns to a value the row must equal,
+                   or to a predicate on the row's value; rows missing the
+                   column never match
+            order_by: Optional column to rank the rows by; rows missing it come last
+            descending: Rank the largest values first
+            limit: Maximum number of rows to return
+
+        Returns:
+            Row indexes, in file order unless ranked (ties keep file order)
+
+        Raises:
+            KeyError: If a column does not exist
+        """
+        rows: Sequence[int] = range(len(self))
+        for name, condition in (where or {}).items():
+            test = self._matches(name, condition)
+            rows = [row for row in rows if test(row)]
+        if order_by is None:
+            return list(rows)[:limit]
+
+        values = self.values(order_by)
+
+        def key(row):
+            missing = values[row] is None
+            return (not missing, values[row]) if descending else (missing, values[row])
+
+        if limit is None:
+            return sorted(rows, key=key, reverse=descending)
+        return (heapq.nlargest if descending else heapq.nsmallest)(limit, rows, key=key)
+
+    def rows(self, indexes: Sequence[int], columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Return rows as dictionaries of column values, leaving out missing values.
+
+        Args:
+            indexes: Row indexes, e.g. from ``select``
+            columns: Columns to include (default: all)
+        """
+        columns = list(columns) if columns is not None else self.columns
+        values = {name: self.values(name) for name in columns}
+        return [{name: values[name][row] for name in columns if values[name][row] is not None}
+                for row in indexes]
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Yield the results with their nested dictionaries restored.
+
+        Numbers of a column with missing values come back as floats.
+        """
+        for row in self.rows(range(len(self))):
+            record: Dict[str, Any] = {}
+            for name, value in row.items():
+                *parents, key = name.split('.')
+                target = record
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[key] = value
+            yield record
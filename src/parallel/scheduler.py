@@ -0,0 +1,154 @@
+"""
+Cost-aware scheduling for batch optimizer jobs.
+
+The search cost of an optimizer job grows roughly geometrically with its depth,
+so submitting jobs in file order can leave a single deep job running long after
+every other worker has gone idle. ``CostModel`` predicts the run time of each job
+from its depth, its number of initial effects and previously recorded timings;
+``schedule_jobs`` orders jobs longest-first and packs tiny jobs into chunks so
+that they share a single task submission.
+"""
+import json
+import os
+import statistics
+from typing import Any, Dict, List, Optional, Tuple
+
+# Default model: seconds = OVERHEAD + SCALE * GROWTH ** depth * (1 + INITIAL_FACTOR * n_initial)
+DEFAULT_OVERHEAD = 0.05
+DEFAULT_SCALE = 5.5e-5
+DEFAULT_GROWTH = 7.0
+DEFAULT_INITIAL_FACTOR = 0.5
+
+# Jobs predicted to take less than this many seconds are grouped into chunks
+DEFAULT_CHUNK_SECONDS = 0.5
+
+
+def job_features(params: Dict[str, Any]) -> Tuple[int, int]:
+    """Extract the features the cost model uses from job parameters.
+
+    Args:
+        params: Optimizer job parameters
+
+    Returns:
+        Tuple of (search depth, number of initial effects)
+    """
+    return params.get('depth', 3), len(params.get('initial_effects', []))
+
+
+class CostModel:
+    """Predicts optimizer job run times and learns from recorded timings.
+
+    Timings are kept per (depth, number of initial effects). A prediction for a
+    feature pair with history is the median of its recorded timings; other
+    pairs use the geometric default model scaled by how far the recorded
+    timings deviate from it on this machine.
+
+    Attributes:
+        history_path: Optional JSON file the timings are loaded from and saved to
+        history: Recorded run times in seconds keyed by "depth:initial"
+    """
+
+    def __init__(self, history_path: Optional[str] = None):
+        """Create a cost model, loading recorded timings if a history file exists.
+
+        Args:
+            history_path: Optional JSON file with recorded timings
+        """
+        self.history_path = history_path
+        self.history: Dict[str, List[float]] = {}
+        if history_path and os.path.exists(history_path):
+            with open(history_path, 'r') as f:
+                self.history = json.load(f)
+
+    @staticmethod
+    def _key(depth: int, n_initial: int) -> str:
+        return f"{depth}:{n_initial}"
+
+    @staticmethod
+    def default_estimate(depth: int, n_initial: int) -> float:
+        """Estimate a run time in seconds from the built-in geometric model."""
+        return DEFAULT_OVERHEAD + DEFAULT_SCALE * DEFAULT_GROWTH ** depth * (1 + DEFAULT_INITIAL_FACTOR * n_initial)
+
+    def calibration(self) -> float:
+        """Return the median ratio of recorded timings to the default model."""
+        ratios = []
+        for key, timings in self.history.items():
+            depth, n_initial = (int(part) for part in key.split(':'))
+            ratios.append(statistics.median(timings) / self.default_estimate(depth, n_initial))
+        return statistics.median(ratios) if ratios else 1.0
+
+    def predict(self, params: Dict[str, Any], calibration: Optional[float] = None) -> float:
+        """Predict the run time of a job in seconds.
+
+        Args:
+            params: Optimizer job parameters
+            calibration: Result of ``calibration()``, for callers predicting
+                         many jobs at once (default: computed on demand)
+
+        Returns:
+            Predicted run time in seconds
+        """
+        depth, n_initial = job_features(params)
+        timings = self.history.get(self._key(depth, n_initial))
+        if timings:
+            return statistics.median(timings)
+        if calibration is None:
+            calibration = self.calibration()
+        return self.default_estimate(depth, n_initial) * calibration
+
+    def record(self, params: Dict[str, Any], elapsed: float, keep: int = 20) -> None:
+        """Record the measured run time of a job.
+
+        Args:
+            params: Optimizer job parameters
+            elapsed: Measured run time in seconds
+            keep: Number of most recent timings kept per feature pair
+        """
+        timings = self.history.setdefault(self._key(*job_features(params)), [])
+        timings.append(round(elapsed, 4))
+        del timings[:-keep]
+
+    def save(self) -> None:
+        """Write the recorded timings back to the history file, if one is set."""
+        if not self.history_path:
+            return
+        with open(self.history_path, 'w') as f:
+            json.dump(self.history, f, indent=2, sort_keys=True)
+
+
+def schedule_jobs(jobs: List[Dict[str, Any]], model: CostModel,
+                  chunk_seconds: float = DEFAULT_CHUNK_SECONDS) -> List[List[Tuple[float, Dict[str, Any]]]]:
+    """Order jobs longest-first and group tiny jobs into chunks.
+
+    Jobs are sorted by predicted run time in descending order (longest
+    processing time first). Consecutive jobs predicted below ``chunk_seconds``
+    are packed into chunks whose total predicted time stays below that limit,
+    so their submission and result overhead is paid once per chunk. Sorting
+    needs every job, so the whole batch is held in memory.
+
+    Args:
+        jobs: Optimizer job parameters
+        model: Cost model used for predictions
+        chunk_seconds: Jobs (and chunks) shorter than this are grouped; 0 disables chunking
+
+    Returns:
+        List of chunks in submission order, each a list of (predicted seconds, params)
+    """
+    calibration = model.calibration()
+    predicted = sorted(((model.predict(job, calibration), job) for job in jobs),
+                       key=lambda item: item[0], reverse=True)
+    chunks: List[List[Tuple[float, Dict[str, Any]]]] = []
+    current: List[Tuple[float, Dict[str, Any]]] = []
+    current_total = 0.0
+    for seconds, job in predicted:
+        if seconds >= chunk_seconds:
+            chunks.append([(seconds, job)])
+            continue
+        if current and current_total + seconds > chunk_seconds:
+            chunks.append(current)
+            current, current_total = [], 0.0
+        current.append((seconds, job))
+        current_total += seconds
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,282 @@
+"""
+Supervised worker pool with per-task time and memory limits.
+
+``ProcessPoolExecutor`` cannot stop a single running task: a runaway search
+blocks ``as_completed`` forever and a worker keeps whatever memory its largest
+task reached. ``SupervisedPool`` runs every worker as its own process connected
+through a pipe, so the parent can kill a worker whose task exceeds its time or
+memory limit, report the task as ``timeout`` or ``oom`` and start a fresh worker
+in its place. Workers are also recycled after a fixed number of tasks or when
+their resident memory grows above a threshold.
+
+Memory is measured as resident set size from ``/proc``; on platforms without
+``/proc`` the memory limits are not enforced.
+"""
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def process_rss(pid: int) -> Optional[int]:
+    """Return the resident set size of a process in bytes.
+
+    Args:
+        pid: Process id
+
+    Returns:
+        Resident memory in bytes, or None if it cannot be determined
+    """
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@dataclass
+class WorkerLimits:
+    """Limits enforced by a SupervisedPool.
+
+    Attributes:
+        timeout: Maximum seconds a single task may run
+        memory_limit: Maximum resident bytes of a worker while running a task
+        max_tasks: Recycle a worker after this many tasks
+        max_rss: Recycle a worker after a task if its resident bytes exceed this
+    """
+    timeout: Optional[float] = None
+    memory_limit: Optional[int] = None
+    max_tasks: Optional[int] = None
+    max_rss: Optional[int] = None
+
+    @property
+    def active(self) -> bool:
+        """True if any limit is set."""
+        return any(value for value in (self.timeout, self.memory_limit, self.max_tasks, self.max_rss))
+
+
+def add_limit_arguments(parser) -> None:
+    """Add the job limit and worker recycling options to a batch runner's parser."""
+    group = parser.add_argument_group('Job limits')
+    group.add_argument('--job-timeout', type=float, default=None, metavar='SECONDS',
+                       help='Kill jobs running longer than this and record them as status "timeout"')
+    group.add_argument('--job-memory', type=int, default=None, metavar='MB',
+                       help='Kill jobs whose worker exceeds this resident memory and record them as status "oom"')
+    group.add_argument('--max-tasks-per-worker', type=int, default=None, metavar='N',
+                       help='Recycle each worker process after N tasks')
+    group.add_argument('--max-worker-rss', type=int, default=None, metavar='MB',
+                       help='Recycle a worker after a task if its resident memory exceeds this')
+
+
+def limits_from_args(args) -> WorkerLimits:
+    """Build WorkerLimits from parsed command-line arguments."""
+    mb = 1024 * 1024
+    return WorkerLimits(
+        timeout=args.job_timeout,
+        memory_limit=args.job_memory * mb if args.job_memory else None,
+        max_tasks=args.max_tasks_per_worker,
+        max_rss=args.max_worker_rss * mb if args.max_worker_rss else None,
+    )
+
+
+class TaskOutcome(NamedTuple):
+    """Outcome of a task run by a SupervisedPool.
+
+    Attributes:
+        item: The item the task was run for
+        status: 'ok', 'timeout', 'oom' or 'error'
+        value: Return value for 'ok', otherwise a human readable reason
+        elapsed: Seconds between dispatch and completion (or the kill)
+    """
+    item: Any
+    status: str
+    value: Any
+    elapsed: float
+
+
+def _worker_main(conn, max_tasks: Optional[int], max_rss: Optional[int]) -> None:
+    """Run tasks received over a pipe until told to stop or due for recycling."""
+    done = 0
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        fn, item, args = message
+        try:
+            status, value = 'ok', fn(item, *args)
+        except MemoryError:
+            status, value = 'oom', 'MemoryError raised in worker'
+        except Exception as e:
+            status, value = 'error', f"{type(e).__name__}: {e}"
+        done += 1
+
+        rss = process_rss(os.getpid())
+        retire = (status == 'oom'
+                  or (max_tasks is not None and done >= max_tasks)
+                  or (max_rss is not None and rss is not None and rss > max_rss))
+        conn.send((status, value, retire))
+        if retire:
+            return
+
+
+class Worker:
+    """Parent-side handle of a worker process.
+
+    Used by ``SupervisedPool`` and ``AsyncSolver``, which dispatch one task at
+    a time to it and replace it when it breaks a limit.
+    """
+
+    def __init__(self, ctx, limits: WorkerLimits):
+        """Start a worker process.
+
+        Args:
+            ctx: Multiprocessing context to start the process from
+            limits: Limits of the pool; the worker retires itself by max_tasks and max_rss
+        """
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main,
+                                   args=(child_conn, limits.max_tasks, limits.max_rss),
+                                   daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.item = None
+        self.started = 0.0
+        self.busy = False
+
+    def dispatch(self, fn: Callable, item: Any, args: tuple) -> None:
+        self.conn.send((fn, item, args))
+        self.item, self.started, self.busy = item, time.monotonic(), True
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SupervisedPool:
+    """Process pool that enforces per-task time and memory limits.
+
+    Each worker handles one task at a time, so at most ``workers`` items are
+    pulled from the input iterable ahead of completion.
+
+    Attributes:
+        workers: Number of worker processes
+        limits: Limits enforced on tasks and workers
+        recycled: Number of workers replaced so far
+    """
+
+    def __init__(self, workers: int, limits: Optional[WorkerLimits] = None,
+                 poll_interval: float = 0.1):
+        """Create the pool; worker processes are started lazily.
+
+        Args:
+            workers: Number of worker processes
+            limits: Limits enforced on tasks and workers
+            poll_interval: Seconds between time and memory checks
+        """
+        self.workers = max(1, workers)
+        self.limits = limits or WorkerLimits()
+        self.poll_interval = poll_interval
+        self.recycled = 0
+        self._ctx = multiprocessing.get_context()
+        self._pool: List[Worker] = []
+
+    def imap_unordered(self, fn: Callable, items: Iterable[Any], *args: Any) -> Iterator[TaskOutcome]:
+        """Run ``fn(item, *args)`` for every item, yielding outcomes as they finish.
+
+        Args:
+            fn: Module-level callable to run in the workers
+            items: Iterable of items, consumed lazily
+            *args: Extra positional arguments passed to ``fn`` after the item
+
+        Yields:
+            TaskOutcome for every item in completion order
+        """
+        if not self._pool:
+            self._pool = [Worker(self._ctx, self.limits) for _ in range(self.workers)]
+        iterator = iter(items)
+        exhausted = False
+
+        while True:
+            for worker in self._pool:
+                if worker.busy or exhausted:
+                    continue
+                try:
+                    worker.dispatch(fn, next(iterator), args)
+                except StopIteration:
+                    exhausted = True
+
+            busy = [worker for worker in self._pool if worker.busy]
+            if not busy:
+                return
+
+            ready = wait([worker.conn for worker in busy], timeout=self.poll_interval)
+            for worker in busy:
+                if worker.conn in ready:
+                    yield self._collect(worker)
+                else:
+                    outcome = self._check_limits(worker)
+                    if outcome:
+                        yield outcome
+
+    def _collect(self, worker: Worker) -> TaskOutcome:
+        """Receive a finished task from a worker, replacing the worker if it retired."""
+        elapsed = time.monotonic() - worker.started
+        try:
+            status, value, retire = worker.conn.recv()
+        except (EOFError, OSError):
+            worker.process.join(timeout=5)
+            status, value, retire = 'error', f"Worker exited with code {worker.process.exitcode}", True
+        outcome = TaskOutcome(worker.item, status, value, elapsed)
+        worker.busy = False
+        if retire:
+            self._replace(worker, kill=False)
+        return outcome
+
+    def _check_limits(self, worker: Worker) -> Optional[TaskOutcome]:
+        """Kill a worker whose running task exceeded the time or memory limit."""
+        elapsed = time.monotonic() - worker.started
+        timeout, memory_limit = self.limits.timeout, self.limits.memory_limit
+        if timeout is not None and elapsed > timeout:
+            outcome = TaskOutcome(worker.item, 'timeout', f"Exceeded time limit of {timeout:g}s", elapsed)
+        elif memory_limit is not None and (process_rss(worker.process.pid) or 0) > memory_limit:
+            outcome = TaskOutcome(worker.item, 'oom',
+                                  f"Exceeded memory limit of {memory_limit / 2**20:.0f} MB", elapsed)
+        else:
+            return None
+        self._replace(worker, kill=True)
+        return outcome
+
+    def _replace(self, worker: Worker, kill: bool) -> None:
+        worker.stop(kill=kill)
+        self._pool[self._pool.index(worker)] = Worker(self._ctx, self.limits)
+        self.recycled += 1
+
+    def close(self) -> None:
+        """Stop all worker processes, killing any that are still busy."""
+        for worker in self._pool:
+            worker.stop(kill=worker.busy)
+        self._pool = []
+
+    def __enter__(self) -> 'SupervisedPool':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,342 @@
+"""
+File-based work queue and sharding helpers for multi-host batch runs.
+
+A batch can be spread across machines without a broker in two ways:
+
+* Static sharding: every host runs the same batch with ``--shard i/n`` and
+  processes only every n-th job starting at job i (1-based).
+* Work directory: the batch is split into task files in a shared directory
+  (``--enqueue``). Any number of workers on any host then claim task files by
+  atomically renaming them from ``pending/`` into ``claimed/``, append their
+  results to ``results/<worker>.jsonl`` and move finished tasks to ``done/``.
+  Every result is tagged with the identity of its job, ``job_id``
+  (``<queue id>:<task>/<index>``), which stays the same when a requeued task
+  is run again.
+
+Either way, ``merge_results`` combines the per-shard or per-worker result files
+into a single results file, dropping the repeated results of requeued tasks.
+"""
+import argparse
+import json
+import os
+import socket
+import time
+import uuid
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.parallel.batch_io import ResultWriter, iter_batch_jobs, open_results
+
+QUEUE_DIRS = ('pending', 'claimed', 'done', 'results')
+
+# File in the work directory holding the queue's identifier
+QUEUE_ID_FILE = 'queue_id'
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse a shard specification of the form "i/n".
+
+    Args:
+        spec: Shard specification, 1 <= i <= n
+
+    Returns:
+        Tuple of (shard index, shard count)
+
+    Raises:
+        ValueError: If the specification is malformed or out of range
+    """
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/n (for example 1/4)")
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}', index must be between 1 and {count}")
+    return index, count
+
+
+def add_distribution_arguments(parser) -> None:
+    """Add the sharding and work-directory options to a batch runner's parser."""
+    def shard_type(spec):
+        try:
+            return parse_shard(spec)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+
+    group = parser.add_argument_group('Multi-host')
+    group.add_argument('--shard', type=shard_type, default=None, metavar='I/N',
+                       help='Only run every N-th job of the batch, starting at job I (1-based)')
+    group.add_argument('--work-dir', type=str, default=None, metavar='DIR',
+                       help='Shared work directory; without --enqueue, claim and run tasks from it')
+    group.add_argument('--enqueue', action='store_true',
+                       help='Split --batch into task files in --work-dir and exit')
+    group.add_argument('--queue-chunk', type=int, default=10, metavar='N',
+                       help='Jobs per task file when enqueuing (default: 10)')
+    group.add_argument('--worker-id', type=str, default=None,
+                       help='Worker identifier in the work directory (default: hostname-pid)')
+    group.add_argument('--requeue-after', type=float, default=None, metavar='SECONDS',
+                       help='Return tasks claimed longer ago than this to the queue before starting')
+
+
+def shard_jobs(batch_jobs: Iterable[Dict[str, Any]], index: int, count: int) -> Iterator[Dict[str, Any]]:
+    """Select the jobs belonging to one shard of a batch.
+
+    Args:
+        batch_jobs: Jobs in batch file order
+        index: Shard index (1-based)
+        count: Total number of shards
+
+    Yields:
+        Every count-th job, starting with job number ``index``
+    """
+    return islice(batch_jobs, index - 1, None, count)
+
+
+def shard_name(name: str, shard: Optional[Tuple[int, int]]) -> str:
+    """Add a shard tag to a results file base name, e.g. "results.shard-1-of-4"."""
+    return f"{name}.shard-{shard[0]}-of-{shard[1]}" if shard else name
+
+
+def default_worker_id() -> str:
+    """Return an identifier unique to this process across hosts."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """Work queue stored as task files in a (shared) directory.
+
+    Claims rely on ``os.rename`` being atomic, which holds for local file
+    systems and NFS alike as long as the directory is on a single file system.
+
+    Attributes:
+        work_dir: Root directory of the queue
+        queue_id: Identifier of the queue, unique across work directories
+    """
+
+    def __init__(self, work_dir: str):
+        """Open a work directory, creating its subdirectories and identifier if needed.
+
+        Args:
+            work_dir: Root directory of the queue
+        """
+        self.work_dir = work_dir
+        for name in QUEUE_DIRS:
+            os.makedirs(os.path.join(work_dir, name), exist_ok=True)
+        id_path = os.path.join(work_dir, QUEUE_ID_FILE)
+        try:
+            # Exclusive creation, so concurrent workers agree on one identifier
+            with open(id_path, 'x') as f:
+                f.write(uuid.uuid4().hex[:12])
+        except FileExistsError:
+            pass
+        with open(id_path) as f:
+            self.queue_id = f.read().strip()
+
+    def _dir(self, name: str) -> str:
+        return os.path.join(self.work_dir, name)
+
+    def enqueue(self, batch_jobs: Iterable[Dict[str, Any]], chunk_size: int = 10) -> int:
+        """Split jobs into task files in the pending directory.
+
+        Task files are written under a temporary name and renamed into place,
+        so workers never see partially written tasks. Their names start with
+        the enqueue time and a random run id, so they are unique across
+        overlapping runs and pruned done tasks, and tasks are claimed in the
+        order they were enqueued.
+
+        Args:
+            batch_jobs: Jobs to enqueue, consumed lazily
+            chunk_size: Number of jobs per task file
+
+        Returns:
+            Number of jobs enqueued
+        """
+        run = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        seq = 0
+        total = 0
+        iterator = iter(batch_jobs)
+        while True:
+            chunk = list(islice(iterator, max(1, chunk_size)))
+            if not chunk:
+                return total
+            name = f"{run}-{seq:08d}.json"
+            tmp_path = os.path.join(self._dir('pending'), f".{name}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(chunk, f)
+            os.rename(tmp_path, os.path.join(self._dir('pending'), name))
+            seq += 1
+            total += len(chunk)
+
+    def claim(self, worker_id: str) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """Atomically claim the next pending task file.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+
+        Returns:
+            Tuple of (task id, jobs) or None if nothing is pending
+        """
+        for name in sorted(os.listdir(self._dir('pending'))):
+            if not name.endswith('.json'):
+                continue
+            task_id = f"{name[:-5]}@{worker_id}"
+            pending = os.path.join(self._dir('pending'), name)
+            claimed = os.path.join(self._dir('claimed'), f"{task_id}.json")
+            try:
+                # Touched first, so requeue_stale never sees a fresh claim with its enqueue time
+                os.utime(pending)
+                os.rename(pending, claimed)
+            except FileNotFoundError:
+                continue  # Another worker claimed it first
+            with open(claimed, 'r') as f:
+                return task_id, json.load(f)
+        return None
+
+    def complete(self, task_id: str) -> None:
+        """Mark a claimed task as done.
+
+        If the claim was requeued as stale in the meantime, the task stays
+        pending and will be run again; ``merge_results`` drops the duplicates
+        by their ``job_id``.
+        """
+        try:
+            os.rename(os.path.join(self._dir('claimed'), f"{task_id}.json"),
+                      os.path.join(self._dir('done'), f"{task_id}.json"))
+        except FileNotFoundError:
+            pass
+
+    def requeue_stale(self, max_age: float) -> int:
+        """Return claimed tasks older than ``max_age`` seconds to the pending directory.
+
+        Use this to recover tasks claimed by workers that died.
+
+        Args:
+            max_age: Age in seconds after which a claim is considered stale
+
+        Returns:
+            Number of tasks requeued
+        """
+        requeued = 0
+        now = time.time()
+        for name in os.listdir(self._dir('claimed')):
+            path = os.path.join(self._dir('claimed'), name)
+            try:
+                if now - os.path.getmtime(path) < max_age:
+                    continue
+                os.rename(path, os.path.join(self._dir('pending'), name.split('@')[0] + '.json'))
+                requeued += 1
+            except FileNotFoundError:
+                continue
+        return requeued
+
+    def results_path(self, worker_id: str) -> str:
+        """Return the results file a worker appends to."""
+        return os.path.join(self._dir('results'), f"{worker_id}.jsonl")
+
+    def status(self) -> Dict[str, int]:
+        """Return the number of task files in each state."""
+        return {name: len([f for f in os.listdir(self._dir(name)) if f.endswith('.json')])
+                for name in ('pending', 'claimed', 'done')}
+
+    def drain(self, worker_id: str, run_jobs: Callable[[List[Dict[str, Any]], ResultWriter], None],
+              requeue_after: Optional[float] = None) -> int:
+        """Claim and run tasks until the queue is empty.
+
+        Results of each task are flushed to the worker's results file before
+        the task is marked done, so a crashed worker loses at most the task it
+        was working on (which ``requeue_stale`` can return to the queue). Each
+        result gets the ``job_id`` of the job whose parameters it carries.
+
+        Args:
+            worker_id: Identifier of this worker
+            run_jobs: Callable running a list of jobs and writing their results
+            requeue_after: If set, requeue claims older than this many seconds first
+
+        Returns:
+            Number of tasks processed
+        """
+        if requeue_after:
+            self.requeue_stale(requeue_after)
+        processed = 0
+        with ResultWriter(self.results_path(worker_id), append=True) as writer:
+            while True:
+                claimed = self.claim(worker_id)
+                if claimed is None:
+                    return processed
+                task_id, batch_jobs = claimed
+                task = f"{self.queue_id}:{task_id.split('@')[0]}"
+                run_jobs(batch_jobs, _JobTagger(writer, task, batch_jobs))
+                writer.flush()
+                self.complete(task_id)
+                processed += 1
+
+
+class _JobTagger:
+    """Writer adding the ``job_id`` of a task's job to each result before writing it.
+
+    Results arrive in completion order; each one is matched to the first job
+    of the task with the same parameters that has no result yet. A result
+    whose parameters match no such job (e.g. a cached record) takes the first
+    job without a result.
+    """
+
+    def __init__(self, writer: ResultWriter, task: str, batch_jobs: List[Dict[str, Any]]):
+        self._writer = writer
+        self._task = task
+        self._keys = [json.dumps(job, sort_keys=True) for job in batch_jobs]
+        self._open = list(range(len(batch_jobs)))
+
+    def write(self, result: Dict[str, Any]) -> None:
+        key = json.dumps(result.get('params'), sort_keys=True)
+        index = next((i for i in self._open if self._keys[i] == key), self._open[0] if self._open else None)
+        if index is not None:
+            self._open.remove(index)
+            result = dict(result, job_id=f"{self._task}/{index}")
+        self._writer.write(result)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._writer, name)
+
+
+def _iter_result_files(inputs: Iterable[str]) -> Iterator[str]:
+    for path in inputs:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(('.json', '.jsonl', '.ndjson', '.npz')):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def merge_results(inputs: Iterable[str], output_path: str, dedupe: bool = True,
+                  dedupe_params: bool = False) -> int:
+    """Combine result files from several shards or workers into one file.
+
+    Args:
+        inputs: Result files (JSON, JSONL or columnar) or directories containing them
+        output_path: Path of the merged results file (JSONL if it ends in .jsonl, columnar if .npz)
+        dedupe: Drop repeated results of the same job (same ``job_id``), which
+                occur when a task was requeued after its worker died
+        dedupe_params: Also drop results repeating the parameters of an
+                       earlier result, even from different jobs (such as a
+                       job submitted twice on purpose)
+
+    Returns:
+        Number of results written
+    """
+    seen = set()
+    with open_results(output_path) as writer:
+        for path in _iter_result_files(inputs):
+            if os.path.abspath(path) == os.path.abspath(output_path):
+                continue
+            for result in iter_batch_jobs(path):
+                if dedupe_params:
+                    key = json.dumps(result.get('params'), sort_keys=True)
+                elif dedupe and 'job_id' in result:
+                    key = result['job_id']
+                else:
+                    key = None
+                if key is not None:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                writer.write(result)
+        return writer.count
@@ -0,0 +1,128 @@
+"""
+Client for the query daemon (see src/server/daemon.py).
+
+The protocol is newline-delimited JSON over a Unix socket: every request is
+one JSON object on a line and is answered by one JSON object on a line.
+This module only uses the standard socket and json modules, so forwarding a
+query from main.py costs far less than loading data and importing the engine.
+"""
+import json
+import os
+import socket
+from typing import Any, Dict, List, Optional
+
+# Environment variable overriding the default socket path
+SOCKET_ENV_VAR = 'PATHFINDER_SOCKET'
+
+# Environment variables configuring the solver of the process running a query
+# (see src/engine/solver.py); the daemon cannot see the client's environment
+LOCAL_ENV_VARS = ('PATHFINDER_MEMORY_LIMIT', 'PATHFINDER_EXTERNAL_DIR')
+
+
+def default_socket_path() -> str:
+    """Return the socket path used when none is given.
+
+    Returns:
+        $PATHFINDER_SOCKET, or pathfinder-<uid>.sock in $XDG_RUNTIME_DIR
+        (falling back to the temporary directory)
+    """
+    if os.environ.get(SOCKET_ENV_VAR):
+        return os.environ[SOCKET_ENV_VAR]
+    directory = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(directory, f"pathfinder-{os.getuid()}.sock")
+
+
+class DaemonClient:
+    """Connection to a running query daemon.
+
+    Attributes:
+        socket_path: Path of the daemon's Unix socket
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = None):
+        """Connect to the daemon.
+
+        Args:
+            socket_path: Path of the daemon's Unix socket (default: default_socket_path())
+            timeout: Socket timeout in seconds for each request (default: none)
+
+        Raises:
+            OSError: If no daemon is listening on the socket
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(self.socket_path)
+        except OSError:
+            self._sock.close()
+            raise
+        self._file = self._sock.makefile('rb')
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request and wait for its response.
+
+        Args:
+            payload: Request object with an 'op' field
+
+        Returns:
+            Response object; 'status' is 'error' with a 'reason' if the request failed
+
+        Raises:
+            ConnectionError: If the daemon closed the connection
+        """
+        self._sock.sendall(json.dumps(payload).encode() + b'\n')
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('Daemon closed the connection')
+        return json.loads(line)
+
+    def path(self, desired_effects: List[str], initial_effects: Optional[List[str]] = None,
+             constraints: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Find a path on the daemon; returns a pathfinder result record."""
+        params = {'desired_effects': list(desired_effects), 'initial_effects': list(initial_effects or [])}
+        if constraints:
+            params['constraints'] = constraints
+        return self.request({'op': 'path', 'params': params})
+
+    def optimize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Optimize a recipe on the daemon; returns an optimizer result record."""
+        return self.request({'op': 'optimize', 'params': params})
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self) -> 'DaemonClient':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def forward_cli(argv: List[str], socket_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Run a main.py command line on the daemon if one is running.
+
+    Command lines the daemon cannot run as given, because they configure the
+    solver of the process running them (through options or the environment),
+    are not forwarded.
+
+    Args:
+        argv: Command-line arguments of main.py (without the program name)
+        socket_path: Path of the daemon's Unix socket (default: default_socket_path())
+
+    Returns:
+        Response with the captured 'stdout', or None if the command line
+        should run locally
+    """
+    socket_path = socket_path or default_socket_path()
+    if not os.path.exists(socket_path) or any(os.environ.get(name) for name in LOCAL_ENV_VARS):
+        return None
+    try:
+        with DaemonClient(socket_path) as client:
+            response = client.request({'op': 'cli', 'argv': list(argv)})
+    except OSError:
+        # Stale socket file or the daemon went away: run locally
+        return None
+    return None if response.get('status') == 'local' else response
@@ -0,0 +1,319 @@
+"""
+Resident query daemon keeping data and results warm between queries.
+
+Every main.py invocation otherwise starts a fresh interpreter, loads the data
+files and imports the engine before answering. The daemon does that once and
+then serves queries over a Unix socket (newline-delimited JSON, see
+src/server/client.py). Answers are memoized in memory, so repeated queries are
+served without searching again.
+
+Requests:
+    {"op": "path", "params": {"desired_effects": [...], "initial_effects": [...]}}
+    {"op": "optimize", "params": {"drug_type": ..., "depth": ..., ...}}
+    {"op": "cli", "argv": ["1", "-d", "Calming"]}   # main.py command line, returns its stdout
+    {"op": "ping"}
+    {"op": "shutdown"}
+
+Queries are run one at a time in a worker thread, so the daemon stays
+responsive to pings while a long search is running. The data files are
+watched (see src/data/store.py): edits are picked up without a restart, and
+the memo is cleared whenever a new version of the data is swapped in.
+
+Command lines that configure the search process itself (--cache,
+--memory-limit, --external-dir) are answered with status 'local', and the
+client runs them in its own process instead.
+
+Usage:
+    python -m src.server.daemon [--socket PATH] [--cache PATH] [--watch-interval SECONDS]
+    python -m src.server.daemon --status
+    python -m src.server.daemon --stop
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from src.cache.result_cache import DEFAULT_MAX_BYTES, get_cache, normalize_job
+from src.cli.arguments import build_main_parser
+from src.cli.batch_pathfinder import process_pathfinder_job
+from src.data.store import DEFAULT_POLL_INTERVAL, DataSnapshot, DataStore
+from src.parallel.batch_optimizer import run_optimizer_task
+from src.server.client import DaemonClient, default_socket_path
+
+DEFAULT_MEMO_SIZE = 4096
+
+# main.py options configuring the solver of the process running the query; the
+# daemon's shared solver cannot honor them, so such command lines run locally
+LOCAL_OPTIONS = ('cache', 'memory_limit', 'external_dir')
+
+
+class QueryDaemon:
+    """Query server holding the loaded data and a memo of recent answers.
+
+    Attributes:
+        socket_path: Path of the Unix socket the daemon listens on
+        cache_path: Optional persistent result cache shared with the CLIs
+        cache_size: Maximum size of the persistent result cache in bytes
+        memo_size: Maximum number of answers kept in memory
+        store: Watched data store holding the current data and solver
+        requests: Number of requests served
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, cache_path: Optional[str] = None,
+                 cache_size: int = DEFAULT_MAX_BYTES, memo_size: int = DEFAULT_MEMO_SIZE,
+                 data_dir: str = 'data', watch_interval: float = DEFAULT_POLL_INTERVAL):
+        """Load all data and prepare the daemon.
+
+        Args:
+            socket_path: Path of the Unix socket (default: default_socket_path())
+            cache_path: Optional persistent result cache file
+            cache_size: Maximum size of the persistent result cache in bytes
+            memo_size: Maximum number of answers kept in memory
+            data_dir: Directory containing the YAML data files
+            watch_interval: Seconds between checks for changed data files (0 disables)
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        self.memo_size = memo_size
+        self.store = DataStore(data_dir, watch_interval, cache=get_cache(cache_path, cache_size, data_dir))
+        self.store.on_reload(self._on_reload)
+        self.requests = 0
+        self._memo: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._memo_version = self.store.snapshot.version
+        self._started = time.monotonic()
+        self._stop: Optional[asyncio.Event] = None
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a single request.
+
+        Args:
+            request: Request object with an 'op' field
+
+        Returns:
+            Response object; errors are reported with status 'error' and a reason
+        """
+        self.requests += 1
+        op = request.get('op')
+        # The whole request runs on one snapshot, even if a reload happens meanwhile
+        snapshot = self.store.snapshot
+        try:
+            if op == 'ping':
+                return {'status': 'ok', 'pid': os.getpid(), 'requests': self.requests,
+                        'memo_entries': len(self._memo), 'data_version': snapshot.version,
+                        'data_error': self.store.last_error,
+                        'uptime': round(time.monotonic() - self._started, 3)}
+            if op == 'path':
+                params = request['params']
+                result = self._memoized(snapshot, ('path', normalize_job('path', params)),
+                                        lambda: process_pathfinder_job(params, snapshot.data,
+                                                                       solver=snapshot.solver))
+                return dict(result, params=params)
+            if op == 'optimize':
+                params = request['params']
+                result = self._memoized(snapshot, ('optimize', normalize_job('optimize', params)),
+                                        lambda: run_optimizer_task(params, solver=snapshot.solver))
+                return dict(result, params=params)
+            if op == 'cli':
+                argv = [str(arg) for arg in request['argv']]
+                return self._memoized(snapshot, ('cli', argv), lambda: self._run_cli(snapshot, argv))
+        except (KeyError, TypeError, ValueError) as e:
+            return {'status': 'error', 'reason': f"Invalid request: {type(e).__name__}: {e}"}
+        except Exception as e:
+            return {'status': 'error', 'reason': f"{type(e).__name__}: {e}"}
+        return {'status': 'error', 'reason': f"Unknown op: {op}"}
+
+    def _on_reload(self, snapshot: DataSnapshot) -> None:
+        print(f"Data files changed, loaded data version {snapshot.version}", flush=True)
+
+    def _memoized(self, snapshot: DataSnapshot, key, compute) -> Dict[str, Any]:
+        """Return a memoized answer, computing and storing it on a miss."""
+        if snapshot.version != self._memo_version:
+            # Answers computed from older data are stale
+            self._memo.clear()
+            self._memo_version = snapshot.version
+        key = json.dumps(key, sort_keys=True)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+        answer = compute()
+        if answer.get('status') in ('ok', 'fail', 'no_result'):
+            self._memo[key] = answer
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return answer
+
+    def _run_cli(self, snapshot: DataSnapshot, argv) -> Dict[str, Any]:
+        """Run a main.py command line against the loaded data, capturing its output."""
+        with _capture_stdout() as output:
+            try:
+                args = build_main_parser().parse_args(argv)
+            except SystemExit:
+                return {'status': 'error', 'reason': f"Invalid arguments: {' '.join(argv)}",
+                        'stdout': output.getvalue()}
+            local = [option for option in LOCAL_OPTIONS if getattr(args, option, None) is not None]
+            if local:
+                options = ', '.join('--' + option.replace('_', '-') for option in local)
+                return {'status': 'local', 'reason': f"{options} must run in the client process"}
+            if args.mode == '1':
+                from src.cli.pathfinder_cli import run_pathfinder
+                run_pathfinder(args, snapshot.data, snapshot.solver)
+            elif args.mode == '2':
+                from src.cli.optimizer_cli import run_optimizer
+                run_optimizer(args, snapshot.data, snapshot.solver)
+            return {'status': 'ok', 'stdout': output.getvalue()}
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                executor: ThreadPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    response = {'status': 'error', 'reason': f"Invalid JSON: {e}"}
+                else:
+                    if request.get('op') == 'shutdown':
+                        self._stop.set()
+                        writer.write(json.dumps({'status': 'ok'}).encode() + b'\n')
+                        await writer.drain()
+                        break
+                    response = await loop.run_in_executor(executor, self.handle, request)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Client went away, or the daemon is shutting down with the connection open
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        """Listen on the socket until a shutdown request or SIGTERM/SIGINT."""
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self._stop.set)
+
+        _remove_stale_socket(self.socket_path)
+        with ThreadPoolExecutor(max_workers=1) as executor, self.store:
+            server = await asyncio.start_unix_server(
+                lambda reader, writer: self._serve_connection(reader, writer, executor),
+                path=self.socket_path)
+            os.chmod(self.socket_path, 0o600)
+            print(f"Pathfinder daemon listening on {self.socket_path} (pid {os.getpid()})", flush=True)
+            try:
+                async with server:
+                    await self._stop.wait()
+            finally:
+                try:
+                    os.remove(self.socket_path)
+                except FileNotFoundError:
+                    pass
+
+
+class _ThreadStdout(io.TextIOBase):
+    """Stand-in for sys.stdout sending each thread's output to its own capture buffer.
+
+    Threads that are not capturing, such as the data watcher, write to the
+    original stream, so their messages never end up in a response.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def _target(self):
+        return getattr(self._local, 'buffer', None) or self.stream
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def writable(self) -> bool:
+        return True
+
+
+_stdout_lock = threading.Lock()
+
+
+@contextmanager
+def _capture_stdout() -> Iterator[io.StringIO]:
+    """Capture what the current thread prints, leaving other threads' output alone."""
+    with _stdout_lock:
+        if not isinstance(sys.stdout, _ThreadStdout):
+            sys.stdout = _ThreadStdout(sys.stdout)
+        proxy = sys.stdout
+    output = io.StringIO()
+    previous = getattr(proxy._local, 'buffer', None)
+    proxy._local.buffer = output
+    try:
+        yield output
+    finally:
+        proxy._local.buffer = previous
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Remove a socket file left behind by a daemon that died.
+
+    Raises:
+        RuntimeError: If another daemon is listening on the socket
+    """
+    if not os.path.exists(socket_path):
+        return
+    try:
+        DaemonClient(socket_path, timeout=1).close()
+    except OSError:
+        os.remove(socket_path)
+    else:
+        raise RuntimeError(f"A daemon is already listening on {socket_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pathfinder query daemon')
+    parser.add_argument('--socket', type=str, default=None,
+                        help='Unix socket path (default: $PATHFINDER_SOCKET or pathfinder-<uid>.sock in the runtime dir)')
+    parser.add_argument('--cache', type=str, default=None, help='Persistent result cache file (default: $PATHFINDER_CACHE)')
+    parser.add_argument('--cache-size', type=int, default=256, help='Maximum result cache size in MB (default: 256)')
+    parser.add_argument('--memo-size', type=int, default=DEFAULT_MEMO_SIZE,
+                        help=f'Answers kept in memory (default: {DEFAULT_MEMO_SIZE})')
+    parser.add_argument('--watch-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f'Seconds between checks for changed data files, 0 disables '
+                             f'(default: {DEFAULT_POLL_INTERVAL:g})')
+    parser.add_argument('--status', action='store_true', help='Report whether a daemon is running and exit')
+    parser.add_argument('--stop', action='store_true', help='Stop the running daemon and exit')
+    args = parser.parse_args()
+
+    socket_path = args.socket or default_socket_path()
+    if args.status or args.stop:
+        try:
+            with DaemonClient(socket_path, timeout=5) as client:
+                response = client.request({'op': 'shutdown' if args.stop else 'ping'})
+        except OSError:
+            print(f"No daemon running on {socket_path}")
+            sys.exit(1)
+        print("Daemon stopped" if args.stop else f"Daemon running: {response}")
+        return
+
+    daemon = QueryDaemon(socket_path, args.cache, args.cache_size * 1024 * 1024, args.memo_size,
+                         watch_interval=args.watch_interval)
+    try:
+        asyncio.run(daemon.serve())
+    except RuntimeError as e:
+        parser.error(str(e))
+
+
+if __name__ == '__main__':
+    main()
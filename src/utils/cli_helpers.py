@@ -1,8 +1,7 @@
 from typing import Dict, List, Set, Any, Callable
 import sys
 import time
-from threading import Thread
-from queue import Queue
+from src.utils.formatting import format_duration
 
 def format_list(items: List[str], prefix: str = "") -> str:
     """Format a list of items for display.
@@ -55,8 +54,54 @@ def process_effects(engine, path: List[str], starting_effects: List[str]) -> Lis
         current_effects = engine.combine(current_effects, ingredient)
     return current_effects
 
+class ProgressLine:
+    """Progress callback for searches that redraws a single status line.
+    
+    Shows the depth being searched, how much of it is done, the states
+    processed per second and the estimated time left.
+    """
+    
+    def __init__(self, stream=None, interval: float = 0.2):
+        """Initialize the status line.
+        
+        Args:
+            stream: Stream to write to (default: sys.stderr)
+            interval: Minimum seconds between redraws, except at a new depth
+        """
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self._last = 0.0
+        self._width = 0
+    
+    def __call__(self, progress) -> None:
+        now = time.monotonic()
+        if progress.done and now - self._last < self.interval:
+            return
+        self._last = now
+        percent = progress.done / progress.frontier * 100 if progress.frontier else 100.0
+        if progress.eta is not None:
+            eta = f"ETA {format_duration(progress.eta)}"
+        else:
+            eta = f"depth ETA {format_duration(progress.layer_eta)}"
+        line = (f"Depth {progress.depth}: {progress.done:,}/{progress.frontier:,} states ({percent:.0f}%), "
+                f"{progress.rate:,.0f} states/s, {eta}")
+        self.stream.write("\r" + line.ljust(self._width))
+        self.stream.flush()
+        self._width = len(line)
+    
+    def clear(self) -> None:
+        """Erase the status line."""
+        if self._width:
+            self.stream.write("\r" + " " * self._width + "\r")
+            self.stream.flush()
+            self._width = 0
+
 def execute_with_progress(func: Callable, *args, **kwargs) -> Any:
-    """Execute a function with a progress indicator.
+    """Execute a search with a progress indicator.
+    
+    The function must accept a ``progress`` callback, as ``Solver.optimize``
+    and ``Solver.path`` do. Progress is shown on stderr, and only when stderr
+    is a terminal, so redirected output stays clean.
     
     Args:
         func: Function to execute
@@ -66,40 +111,13 @@ def execute_with_progress(func: Callable, *args, **kwargs) -> Any:
     Returns:
         Result of the function
     """
-    start_time = time.time()
-    spinner = "|/-\\"
-    i = 0
-    
-    # Start a background thread to execute the function
-    result_queue = Queue()
-    
-    def worker():
-        try:
-            result = func(*args, **kwargs)
-            result_queue.put(("success", result))
-        except Exception as e:
-            result_queue.put(("error", e))
-    
-    thread = Thread(target=worker)
-    thread.start()
-    
-    # Show spinner while waiting
-    while thread.is_alive():
-        sys.stdout.write(f"\rProcessing {spinner[i % len(spinner)]}")
-        sys.stdout.flush()
-        i += 1
-        time.sleep(0.1)
-    
-    # Get result
-    status, result = result_queue.get()
-    elapsed = time.time() - start_time
-    
-    sys.stdout.write(f"\rCompleted in {elapsed:.2f}s{'.' + ' ' * 20}\n")
-    
-    if status == "error":
-        raise result
-    
-    return result
+    if not sys.stderr.isatty():
+        return func(*args, **kwargs)
+    line = ProgressLine()
+    try:
+        return func(*args, progress=line, **kwargs)
+    finally:
+        line.clear()
 
 def format_path(path: List[str]) -> str:
     """Format a path of ingredients with arrow separators.
@@ -131,3 +149,41 @@ def format_effects(effects: List[str], desired_effects: Set[str] = None) -> str:
         result.append(f"{marker} {effect}")
     
     return "\n".join(result)
+
+def print_search_stats(stats: Dict[str, Any]) -> None:
+    """Print the search counters of a result record.
+    
+    Args:
+        stats: The 'stats' entry of a result record (see ``SearchStats.to_dict``)
+    """
+    if stats.get('cached'):
+        print("\nSearch Statistics: served from the result cache")
+        return
+    if stats.get('mode') in ('dfs', 'iddfs'):
+        # Depth-first: states visited per depth and the deepest recursion
+        search = 'iterative deepening' if stats['mode'] == 'iddfs' else 'depth-first in bounded memory'
+        print(f"\nSearch Statistics ({stats['seconds']:.3f}s, {search}):")
+        print(f"  States expanded: {stats['expanded']:,}")
+        print(f"  Children generated: {stats['generated']:,}")
+        print(f"  Not generated (no-op or commuting order): {stats.get('skipped', 0):,}")
+        print(f"  Skipped by the transposition table: {stats['duplicates']:,}")
+        print(f"  Pruned: {stats['pruned']:,}")
+        print(f"  Visited: {stats['queued']:,} (deepest {stats['peak_queue'] - 1})")
+        print()
+        print_table(['Depth', 'Visited'], [
+            [depth, f"{visited:,}"] for depth, visited in enumerate(stats['frontier'])
+        ])
+        return
+    on_disk = ', external memory' if stats.get('mode') == 'external' else ''
+    print(f"\nSearch Statistics ({stats['seconds']:.3f}s{on_disk}):")
+    print(f"  States expanded: {stats['expanded']:,}")
+    print(f"  Children generated: {stats['generated']:,}")
+    print(f"  Not generated (no-op or commuting order): {stats.get('skipped', 0):,}")
+    print(f"  Duplicates: {stats['duplicates']:,}")
+    print(f"  Pruned: {stats['pruned']:,}")
+    print(f"  Queued: {stats['queued']:,} (peak queue {stats['peak_queue']:,})")
+    print()
+    print_table(['Depth', 'Frontier', 'Seconds'], [
+        [depth, f"{frontier:,}", f"{seconds:.3f}"]
+        for depth, (frontier, seconds) in enumerate(zip(stats['frontier'], stats['layer_seconds']))
+    ])
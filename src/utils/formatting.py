@@ -0,0 +1,19 @@
+"""
+Formatting helpers shared by the CLIs and the library modules.
+"""
+
+def format_duration(seconds: float) -> str:
+    """Format a duration as e.g. '42s', '3m05s' or '2h07m'.
+    
+    Args:
+        seconds: Duration in seconds
+        
+    Returns:
+        Formatted duration string
+    """
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
@@ -1,4 +1,4 @@
-from typing import List, Set
+from typing import Any, Dict, List, Optional, Set
 
 def parse_effects(args: List[str], effects: List[str], effects_sorted: List[str]) -> Set[str]:
     """Parse command-line arguments into a set of valid effects.
@@ -12,31 +12,100 @@ def parse_effects(args: List[str], effects: List[str], effects_sorted: List[str]
         Set of valid effect names
     """
     result = set()
-    
-    # Process all arguments and split any comma-separated values
+    for part in _split_parts(args):
+        effect = _match_name(part, effects, effects_sorted)
+        if effect is not None:
+            result.add(effect)
+    return result
+
+def _split_parts(args: List[str]) -> List[str]:
+    """Split command-line arguments into their comma-separated parts."""
     parts = []
     for arg in args:
         parts.extend(part.strip() for part in arg.split(',') if part.strip())
+    return parts
+
+def _match_name(part: str, names: List[str], names_sorted: List[str]) -> Optional[str]:
+    """Return the name a part stands for (1-based number, exact or case-insensitive name), or None."""
+    # Try to parse as a number first
+    try:
+        index = int(part) - 1  # Convert to 0-based index
+        return names_sorted[index] if 0 <= index < len(names_sorted) else None
+    except ValueError:
+        pass
     
-    for part in parts:
-        # Try to parse as a number first
-        try:
-            effect_index = int(part) - 1  # Convert to 0-based index
-            if 0 <= effect_index < len(effects_sorted):
-                result.add(effects_sorted[effect_index])
-            continue
-        except ValueError:
-            pass
+    # Try as an exact name
+    if part in names:
+        return part
+    
+    # Try case-insensitive matching
+    for name in names:
+        if name.lower() == part.lower():
+            return name
+    return None
+
+def parse_names(args: List[str], names: List[str], names_sorted: List[str], kind: str) -> Set[str]:
+    """Parse command-line arguments into a set of names, rejecting unknown ones.
+    
+    Names are matched as in ``parse_effects``. Names containing spaces may
+    also be given unquoted, as consecutive arguments (``--ban Horse Semen``).
+    
+    Args:
+        args: List of names or numbers from command line
+        names: List of all valid names
+        names_sorted: List of names that numbers refer to (empty if numbers are not accepted)
+        kind: What the names are, e.g. 'ingredient', for error messages
         
-        # Try as an exact effect name
-        if part in effects:
-            result.add(part)
-            continue
+    Returns:
+        Set of valid names
         
-        # Try case-insensitive matching
-        for effect in effects:
-            if effect.lower() == part.lower():
-                result.add(effect)
+    Raises:
+        ValueError: If a part matches no name
+    """
+    parts = _split_parts(args)
+    result = set()
+    start = 0
+    while start < len(parts):
+        # Prefer the longest run of parts that forms a name
+        for end in range(len(parts), start, -1):
+            name = _match_name(' '.join(parts[start:end]), names, names_sorted if end == start + 1 else [])
+            if name is not None:
+                result.add(name)
+                start = end
                 break
+        else:
+            raise ValueError(f"Unknown {kind} '{parts[start]}'. Valid {kind}s: {', '.join(sorted(names))}")
+    return result
+
+def parse_constraints(args, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Collect the constraint options of a command line into a job's constraints.
     
-    return result
\ No newline at end of file
+    Effects are given as in ``parse_effects``; ingredients by name, either as
+    separate arguments or comma-separated, matched case-insensitively. Unknown
+    effects or ingredients are rejected (see ``parse_names``).
+    
+    Args:
+        args: Parsed arguments with the options added by ``add_constraint_arguments``
+        data: Dictionary containing all loaded data
+        
+    Returns:
+        Dictionary in the format of the 'constraints' field of batch jobs,
+        holding only the constraints that were given
+        
+    Raises:
+        ValueError: If an effect or ingredient is unknown
+    """
+    ingredients = list(data['ingredient_prices'])
+    constraints = {}
+    for key, values, names, names_sorted, kind in (
+            ('required_effects', args.require, data['effects'], data['effects_sorted'], 'effect'),
+            ('forbidden_effects', args.forbid, data['effects'], data['effects_sorted'], 'effect'),
+            ('allowed_ingredients', args.only, ingredients, [], 'ingredient'),
+            ('banned_ingredients', args.ban, ingredients, [], 'ingredient')):
+        if values:
+            constraints[key] = sorted(parse_names(values, names, names_sorted, kind))
+    if args.max_cost is not None:
+        constraints['max_cost'] = args.max_cost
+    if args.max_ingredients is not None:
+        constraints['max_ingredients'] = args.max_ingredients
+    return constraints
@@ -0,0 +1,192 @@
+"""
+Opt-in tracing of batch runs, exported as Chrome trace events.
+
+Tracing is on while $PATHFINDER_TRACE names a directory; the batch runners'
+``--trace DIR`` option sets it, and worker processes inherit it, so no code
+changes are needed to trace a run. Spans are recorded around data loading,
+solver construction, every job, every search and every result written. Each
+process appends its finished spans as trace events ('ph': 'X'), one JSON
+object per line, to ``events-<pid>.jsonl`` in the directory, so the spans
+of a killed worker are kept. ``write_trace`` merges them into ``trace.json``
+in the Trace Event Format, which chrome://tracing and https://ui.perfetto.dev
+open with one track per worker process.
+
+With $PATHFINDER_PROFILE also set (``--profile``), every job runs under
+cProfile and its statistics are dumped to ``profiles/<pid>-<n>.prof``, named
+in the job's span; ``python -m pstats`` or snakeviz read them.
+
+While tracing is off a span costs one environment lookup.
+"""
+import cProfile
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# Environment variable naming the trace directory; tracing is off when unset
+TRACE_ENV_VAR = 'PATHFINDER_TRACE'
+
+# Environment variable enabling a cProfile dump per job while tracing
+PROFILE_ENV_VAR = 'PATHFINDER_PROFILE'
+
+# Name of the merged trace in the trace directory
+TRACE_FILE = 'trace.json'
+
+_events_file = None
+_profile_numbers = itertools.count()
+
+
+def trace_dir() -> Optional[str]:
+    """Return the trace directory, or None if tracing is off."""
+    return os.environ.get(TRACE_ENV_VAR) or None
+
+
+def enable(directory: str, profile: bool = False) -> None:
+    """Turn tracing on for this process and the workers it starts from now on.
+
+    Args:
+        directory: Directory receiving the events, the trace and any profiles
+        profile: Also dump a cProfile file per job
+    """
+    os.makedirs(directory, exist_ok=True)
+    os.environ[TRACE_ENV_VAR] = directory
+    if profile:
+        os.environ[PROFILE_ENV_VAR] = '1'
+    else:
+        os.environ.pop(PROFILE_ENV_VAR, None)
+
+
+def disable() -> None:
+    """Turn tracing and profiling off."""
+    global _events_file
+    os.environ.pop(TRACE_ENV_VAR, None)
+    os.environ.pop(PROFILE_ENV_VAR, None)
+    if _events_file is not None:
+        _events_file.close()
+        _events_file = None
+
+
+def _emit(directory: str, event: Dict[str, Any]) -> None:
+    """Append an event to this process's events file."""
+    global _events_file
+    path = os.path.join(directory, f"events-{os.getpid()}.jsonl")
+    # A forked worker inherits its parent's file; it opens its own
+    if _events_file is None or _events_file.name != path:
+        os.makedirs(directory, exist_ok=True)
+        _events_file = open(path, 'a', buffering=1)
+    _events_file.write(json.dumps(event, default=str) + '\n')
+
+
+@contextmanager
+def span(name: str, category: str = 'batch', **args: Any) -> Iterator[Dict[str, Any]]:
+    """Record the time spent in a block as a trace event, if tracing is on.
+
+    Args:
+        name: Name of the span, e.g. 'search'
+        category: Category shown by trace viewers, e.g. 'job' or 'io'
+        **args: Details attached to the event
+
+    Yields:
+        The event's details, which the block may add to
+    """
+    directory = trace_dir()
+    if directory is None:
+        yield args
+        return
+    started, wall = time.perf_counter(), time.time()
+    try:
+        yield args
+    finally:
+        _emit(directory, {
+            'name': name, 'cat': category, 'ph': 'X',
+            'ts': round(wall * 1e6), 'dur': round((time.perf_counter() - started) * 1e6),
+            'pid': os.getpid(), 'tid': threading.get_native_id(), 'args': args,
+        })
+
+
+@contextmanager
+def job_span(name: str, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Record a job as a span, profiling it if profiling is on.
+
+    Args:
+        name: Name of the span, e.g. 'optimize'
+        params: Job parameters, attached to the event
+
+    Yields:
+        The event's details, which the block may add to
+    """
+    with span(name, 'job', params=params) as args:
+        directory = trace_dir()
+        if directory is None or not os.environ.get(PROFILE_ENV_VAR):
+            yield args
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield args
+        finally:
+            profiler.disable()
+            os.makedirs(os.path.join(directory, 'profiles'), exist_ok=True)
+            path = os.path.join(directory, 'profiles', f"{os.getpid()}-{next(_profile_numbers)}.prof")
+            profiler.dump_stats(path)
+            args['profile'] = path
+
+
+def write_trace(directory: Optional[str] = None) -> Optional[str]:
+    """Merge the events recorded in a trace directory into ``trace.json``.
+
+    Every events file in the directory is included, so a directory holds the
+    trace of every run recorded into it.
+
+    Args:
+        directory: Trace directory (default: $PATHFINDER_TRACE)
+
+    Returns:
+        Path of the trace, or None if tracing is off
+    """
+    directory = directory or trace_dir()
+    if directory is None:
+        return None
+    if _events_file is not None:
+        _events_file.flush()
+    events, pids = [], set()
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith('events-') and name.endswith('.jsonl')):
+            continue
+        with open(os.path.join(directory, name)) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Last line of a worker killed while writing
+                events.append(event)
+                pids.add(event['pid'])
+    # Name each process's track
+    events.extend({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                   'args': {'name': 'main' if pid == os.getpid() else f"worker {pid}"}}
+                  for pid in sorted(pids))
+    path = os.path.join(directory, TRACE_FILE)
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return path
+
+
+def add_trace_arguments(parser) -> None:
+    """Add the tracing options to a batch runner's parser."""
+    group = parser.add_argument_group('Tracing')
+    group.add_argument('--trace', type=str, default=None, metavar='DIR',
+                       help=f'Record a Chrome trace of the run in DIR/{TRACE_FILE} (default: ${TRACE_ENV_VAR})')
+    group.add_argument('--profile', action='store_true',
+                       help='While tracing, also dump a cProfile file per job into DIR/profiles')
+
+
+def trace_from_args(parser, args) -> None:
+    """Turn tracing on as requested by parsed command-line arguments."""
+    directory = args.trace or trace_dir()
+    if args.profile and directory is None:
+        parser.error('--profile requires --trace or $' + TRACE_ENV_VAR)
+    if directory is not None:
+        enable(directory, args.profile or bool(os.environ.get(PROFILE_ENV_VAR)))
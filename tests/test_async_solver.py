@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from src.parallel.async_solver import AsyncSolver
+from src.parallel.supervisor import WorkerLimits
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_identical_requests_are_coalesced():
+    """Test that concurrent identical requests share one computation."""
+    async def scenario():
+        async with AsyncSolver(workers=2) as solver:
+            results = await asyncio.gather(
+                *[solver.optimize("meth", depth=2) for _ in range(4)],
+                solver.optimize("meth", depth=2, prod_options={"quality": 3}),
+                solver.find_path(["Calming", "Toxic"]),
+            )
+            return results, solver.computations
+    results, computations = run(scenario())
+    assert computations == 2
+    assert all(r["status"] == "ok" for r in results)
+    assert results[0]["profit"] == pytest.approx(106.0)
+    assert results[4]["params"]["prod_options"] == {"quality": 3}
+
+def test_cancellation():
+    """Test that cancelling one caller leaves the shared computation running,
+    and cancelling the last caller stops it without breaking the pool."""
+    async def scenario():
+        async with AsyncSolver(workers=1) as solver:
+            first = asyncio.ensure_future(solver.optimize("cocaine", depth=4))
+            second = asyncio.ensure_future(solver.optimize("cocaine", depth=4))
+            await asyncio.sleep(0.02)
+            first.cancel()
+            shared = await second
+
+            slow = asyncio.ensure_future(solver.optimize("cocaine", depth=7))
+            await asyncio.sleep(0.1)
+            slow.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await slow
+            after = await asyncio.wait_for(solver.optimize("meth", depth=2), timeout=10)
+            return first.cancelled(), shared, after
+    first_cancelled, shared, after = run(scenario())
+    assert first_cancelled
+    assert shared["status"] == "ok"
+    assert after["profit"] == pytest.approx(106.0)
+
+def test_time_limit():
+    """Test that computations over the time limit are reported as timeouts."""
+    async def scenario():
+        async with AsyncSolver(workers=1, limits=WorkerLimits(timeout=0.2), poll_interval=0.02) as solver:
+            return await solver.optimize("cocaine", depth=7)
+    assert run(scenario())["status"] == "timeout"
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.parallel.batch_io import (BatchProgress, ResultWriter, count_batch_jobs, default_results_path,
+                                   iter_batch_jobs, submit_bounded)
+
+RESULTS = [
+    {"status": "ok", "params": {"desired_effects": ["Calming"]}, "path": ["Mega Bean", "Paracetamol"]},
+    {"status": "fail", "params": {"desired_effects": ["Toxic"]}, "reason": "No solution found."},
+]
+
+def test_iter_jsonl_jobs(tmp_path):
+    """Test that JSONL batches are read line by line, skipping blank lines."""
+    batch = tmp_path / "batch.jsonl"
+    batch.write_text('{"desired_effects": ["Calming"]}\n\n{"desired_effects": ["Toxic"]}\n')
+    jobs = iter_batch_jobs(str(batch))
+    assert next(jobs) == {"desired_effects": ["Calming"]}
+    assert list(jobs) == [{"desired_effects": ["Toxic"]}]
+
+def test_iter_json_jobs(tmp_path):
+    """Test that plain JSON batch files keep working."""
+    batch = tmp_path / "batch.json"
+    batch.write_text(json.dumps([{"desired_effects": ["Calming"]}]))
+    assert list(iter_batch_jobs(str(batch))) == [{"desired_effects": ["Calming"]}]
+
+def test_invalid_jsonl_line(tmp_path):
+    """Test that a broken JSONL line reports its line number."""
+    batch = tmp_path / "batch.jsonl"
+    batch.write_text('{"desired_effects": ["Calming"]}\n{oops\n')
+    with pytest.raises(ValueError, match="line 2"):
+        list(iter_batch_jobs(str(batch)))
+
+def test_default_results_path():
+    """Test that JSONL batches default to JSONL results."""
+    assert default_results_path("jobs/a.jsonl", "res").endswith("res.jsonl")
+    assert default_results_path("jobs/a.json", "res").endswith("res.json")
+
+def test_submit_bounded_limits_in_flight():
+    """Test that no more than `window` items are ever pulled ahead of completion."""
+    lock = threading.Lock()
+    state = {"pulled": 0, "done": 0, "max_ahead": 0}
+
+    def items():
+        for i in range(50):
+            with lock:
+                state["pulled"] += 1
+                state["max_ahead"] = max(state["max_ahead"], state["pulled"] - state["done"])
+            yield i
+
+    def work(x):
+        time.sleep(0.001)
+        with lock:
+            state["done"] += 1
+        return x * 2
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = sorted(f.result() for f in submit_bounded(executor, work, items(), 5))
+
+    assert results == [i * 2 for i in range(50)]
+    assert state["max_ahead"] <= 5
+
+def test_result_writer_json_matches_json_dump(tmp_path):
+    """Test that streamed JSON output is identical to json.dump with indent=2."""
+    path = tmp_path / "results.json"
+    with ResultWriter(str(path)) as writer:
+        for result in RESULTS:
+            writer.write(result)
+    assert path.read_text() == json.dumps(RESULTS, indent=2)
+
+    empty = tmp_path / "empty.json"
+    ResultWriter(str(empty)).close()
+    assert json.loads(empty.read_text()) == []
+
+def test_result_writer_jsonl(tmp_path):
+    """Test that JSONL output has one record per line."""
+    path = tmp_path / "results.jsonl"
+    with ResultWriter(str(path)) as writer:
+        for result in RESULTS:
+            writer.write(result)
+    assert [json.loads(line) for line in path.read_text().splitlines()] == RESULTS
+
+def test_count_batch_jobs(tmp_path):
+    """Test counting the jobs of a batch and of its shards."""
+    batch = tmp_path / "batch.jsonl"
+    batch.write_text("\n".join(json.dumps({"desired_effects": ["Calming"]}) for _ in range(7)) + "\n\n")
+    assert count_batch_jobs(str(batch)) == 7
+    assert [count_batch_jobs(str(batch), (i, 3)) for i in (1, 2, 3)] == [3, 2, 2]
+    batch = tmp_path / "batch.json"
+    batch.write_text(json.dumps([{"desired_effects": ["Calming"]}] * 2))
+    assert count_batch_jobs(str(batch)) == 2
+
+def test_batch_progress(capsys):
+    """Test that batch progress reports throughput and the time left."""
+    progress = BatchProgress(total=4, interval=0)
+    time.sleep(0.01)
+    progress.update()
+    assert progress.remaining() == pytest.approx(3 / progress.rate(), rel=0.1)
+    assert capsys.readouterr().out.startswith("Progress: 1/4 jobs")
+    assert BatchProgress().remaining() is None
@@ -0,0 +1,107 @@
+import zipfile
+import pytest
+from src.parallel import columnar
+from src.parallel.batch_io import count_batch_jobs, iter_batch_jobs, open_results
+from src.parallel.columnar import ColumnarWriter, ResultTable
+from src.parallel.work_queue import merge_results
+
+RESULTS = [
+    {"status": "ok", "params": {"drug_type": "meth", "depth": 3, "constraints": {}},
+     "path": ["Cuke", "Banana"], "ingredient_cost": 6.0, "profit": 120.5, "cached": True},
+    {"status": "timeout", "params": {"drug_type": "cocaine", "depth": 9}, "reason": "Job exceeded 10s"},
+    {"status": "ok", "params": {"drug_type": "meth", "depth": 4},
+     "path": ["Cuke", "Banana"], "ingredient_cost": 6.0, "profit": 130},
+    {"status": "ok", "params": {"drug_type": "marijuana", "depth": 4},
+     "path": ["Donut"], "ingredient_cost": 3.0, "profit": 45.25, "stats": {"frontier": [1, 16]}},
+]
+
+@pytest.fixture
+def table(tmp_path):
+    path = str(tmp_path / "results.npz")
+    with open_results(path) as writer:
+        for result in RESULTS:
+            writer.write(result)
+    assert isinstance(writer, ColumnarWriter) and writer.count == len(RESULTS)
+    with ResultTable(path) as table:
+        yield table
+
+def test_round_trip(table):
+    """Test that every value comes back, numbers of incomplete columns as floats."""
+    records = list(table.records())
+    assert records[1] == RESULTS[1]
+    assert records[3] == RESULTS[3]
+    assert records[0]["params"]["depth"] == 3.0 and records[0]["path"] == ["Cuke", "Banana"]
+    assert list(iter_batch_jobs(table.path))[1] == RESULTS[1] and count_batch_jobs(table.path) == len(RESULTS)
+
+def test_column_encodings(table):
+    """Test that numbers are fixed-width arrays and strings and recipes are dictionary encoded."""
+    assert table.column("params.depth").typecode == "q"
+    assert table.column("profit").typecode == "d"
+    assert table.dictionary("params.drug_type") == ["meth", "cocaine", "marijuana"]
+    assert list(table.column("path")) == [0, -1, 0, 1]
+    assert table.dictionary("path") == [["Cuke", "Banana"], ["Donut"]]
+    assert table.values("cached") == [True, None, None, None]
+
+def test_select_and_rank(table):
+    """Test filtering by value and predicate, and ranking with missing values last."""
+    assert table.select({"params.drug_type": "meth"}) == [0, 2]
+    assert table.select({"profit": lambda profit: profit > 100}, order_by="profit") == [2, 0]
+    assert table.select(order_by="profit", descending=False) == [3, 0, 2, 1]
+    assert table.select(order_by="ingredient_cost", limit=2) == [0, 2]
+    assert table.rows([3], ["path", "profit", "reason"]) == [{"path": ["Donut"], "profit": 45.25}]
+    with pytest.raises(KeyError):
+        table.select({"missing": 1})
+
+def test_numpy_reads_files(table):
+    """Test that numpy.load reads the columns and dictionaries."""
+    np = pytest.importorskip("numpy")
+    with np.load(table.path) as arrays:
+        assert arrays["params.depth"].dtype == np.int64
+        assert list(arrays["dictionary/params.drug_type"]) == ["meth", "cocaine", "marijuana"]
+        assert np.isnan(arrays["profit"]).tolist() == [False, True, False, False]
+
+def test_merge_to_columnar(tmp_path):
+    """Test that merged results can be written to and read from columnar files."""
+    first = str(tmp_path / "a.jsonl")
+    with open_results(first) as writer:
+        for result in RESULTS[:2]:
+            writer.write(result)
+    second = str(tmp_path / "b.npz")
+    with open_results(second) as writer:
+        for result in RESULTS[1:]:
+            writer.write(result)
+    output = str(tmp_path / "merged.npz")
+    assert merge_results([first, second], output, dedupe_params=True) == len(RESULTS)
+    with ResultTable(output) as merged:
+        assert merged.values("params.drug_type") == ["meth", "cocaine", "meth", "marijuana"]
+    with pytest.raises(ValueError):
+        open_results(output, append=True)
+
+def test_columns_spill_to_temporary_files(tmp_path, monkeypatch):
+    """Test that columns moved to temporary files, and widened afterwards, come back whole."""
+    monkeypatch.setattr(columnar, "SPILL_ROWS", 4)
+    results = [{"n": i, "name": f"job{i % 3}"} for i in range(10)]
+    results += [{"n": 2.5, "late": True}, {"n": "many", "name": "job0"}]
+    path = str(tmp_path / "spilled.npz")
+    with ColumnarWriter(path) as writer:
+        for result in results:
+            writer.write(result)
+    with ResultTable(path) as table:
+        assert table.values("n") == [i for i in range(10)] + [2.5, "many"]
+        assert table.values("name") == [f"job{i % 3}" for i in range(10)] + [None, "job0"]
+        assert table.values("late") == [None] * 10 + [1.0, None]
+
+def test_files_do_not_depend_on_numpy(tmp_path, monkeypatch):
+    """Test that the hand-written .npy headers match NumPy's and read back the same."""
+    pytest.importorskip("numpy")
+    paths = [str(tmp_path / "numpy.npz"), str(tmp_path / "plain.npz")]
+    for path in paths:
+        with open_results(path) as writer:
+            for result in RESULTS:
+                writer.write(result)
+        monkeypatch.setattr(columnar, "np", None)
+    with zipfile.ZipFile(paths[0]) as first, zipfile.ZipFile(paths[1]) as second:
+        assert first.namelist() == second.namelist()
+        assert all(first.read(name) == second.read(name) for name in first.namelist())
+    with ResultTable(paths[1]) as table:
+        assert list(table.records())[1] == RESULTS[1]
@@ -0,0 +1,70 @@
+from itertools import product
+import pytest
+from src.cache.result_cache import normalize_job
+from src.engine.constraints import SearchConstraints
+from src.engine.optimizer import get_effects_value
+from src.engine.solver import Solver
+
+CONSTRAINTS = [
+    {"banned_ingredients": ["Cuke", "Banana"]},
+    {"allowed_ingredients": ["Cuke", "Donut", "Gasoline", "Viagra"]},
+    {"max_cost": 8},
+    {"max_ingredients": 2},
+    {"required_effects": ["Energizing"]},
+    {"forbidden_effects": ["Calming", "Toxic"]},
+]
+
+def brute_force_best(solver, drug_type, depth, constraints):
+    """Highest profit over every recipe up to depth meeting the constraints."""
+    ingredients = constraints.ingredients(solver.engine)
+    best = None
+    for length in range(min(depth, constraints.max_ingredients or depth) + 1):
+        for path in product(ingredients, repeat=length):
+            cost = sum(solver.ingredient_prices.get(i, 0) for i in path)
+            if constraints.max_cost is not None and cost > constraints.max_cost:
+                continue
+            effects = []
+            for ingredient in path:
+                effects = solver.engine.combine(effects, ingredient)
+            if constraints.accepts(effects):
+                profit = get_effects_value(effects, solver.base_prices[drug_type], solver.effect_multipliers) - cost
+                best = profit if best is None else max(best, profit)
+    return best
+
+@pytest.mark.parametrize("constraints", CONSTRAINTS)
+def test_optimize_with_constraints(test_data, constraints):
+    """Test that constrained recipes meet the constraints and are the best that do."""
+    solver = Solver(test_data)
+    record = solver.optimize({"drug_type": "meth", "depth": 3, "constraints": constraints})
+    parsed = SearchConstraints.from_dict(constraints)
+    assert record["status"] == "ok"
+    assert set(record["path"]) <= set(parsed.ingredients(solver.engine))
+    assert parsed.accepts(record["effects"])
+    if parsed.max_cost is not None:
+        assert record["ingredient_cost"] <= parsed.max_cost
+    if parsed.max_ingredients is not None:
+        assert len(record["path"]) <= parsed.max_ingredients
+    profit = record["profit"] + record["production_cost"]
+    assert profit == pytest.approx(brute_force_best(solver, "meth", 3, parsed))
+
+def test_path_with_constraints(test_data):
+    """Test that the pathfinder honours constraints and fails fast when they cannot be met."""
+    solver = Solver(test_data)
+    record = solver.path(["Energizing"], constraints={"banned_ingredients": ["Mega Bean"]})
+    assert record["status"] == "ok" and "Mega Bean" not in record["path"]
+    record = solver.path(["Energizing"], constraints={"allowed_ingredients": ["Cuke"], "max_cost": 1})
+    assert record["status"] == "fail"
+    # Nothing but Cuke can never produce Zombifying
+    record = solver.path(["Zombifying"], constraints={"allowed_ingredients": ["Cuke"]})
+    assert record["status"] == "fail"
+
+def test_constraint_parameters():
+    """Test parsing and normalizing constraint parameters."""
+    with pytest.raises(ValueError):
+        SearchConstraints.from_dict({"max_price": 3})
+    assert not SearchConstraints.from_dict(None).active
+    assert SearchConstraints.from_dict({"banned_ingredients": ["Cuke", "Banana"]}).to_dict() == \
+        {"banned_ingredients": ["Banana", "Cuke"]}
+    job = {"drug_type": "meth", "depth": 3}
+    assert "constraints" not in normalize_job("optimize", job)
+    assert normalize_job("optimize", {**job, "constraints": {"max_cost": 8}}) != normalize_job("optimize", job)
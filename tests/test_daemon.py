@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from src.cli import pathfinder_cli
+from src.server.client import DaemonClient, forward_cli
+from src.server.daemon import QueryDaemon
+
+@pytest.fixture(scope="module")
+def daemon():
+    """Daemon answering requests in-process, without a socket."""
+    return QueryDaemon(socket_path="unused.sock")
+
+def test_path_and_optimize_requests(daemon):
+    """Test that requests return the same records as the batch runners, memoized."""
+    path = daemon.handle({"op": "path", "params": {"desired_effects": ["Calming", "Toxic"]}})
+    assert path["status"] == "ok"
+    assert {"Calming", "Toxic"} <= set(path["effects"])
+
+    params = {"drug_type": "meth", "depth": 2}
+    result = daemon.handle({"op": "optimize", "params": params})
+    assert result["profit"] == pytest.approx(106.0)
+    assert result["params"] == params
+    assert daemon.handle({"op": "ping"})["memo_entries"] == 2
+
+def test_cli_request_captures_output(daemon):
+    """Test that a forwarded command line returns the CLI output."""
+    response = daemon.handle({"op": "cli", "argv": ["2", "-t", "2", "-d", "2"]})
+    assert response["status"] == "ok"
+    assert "Profit: $106.00" in response["stdout"]
+    assert daemon.handle({"op": "cli", "argv": ["3"]})["status"] == "error"
+
+def test_cli_request_with_local_options(daemon, tmp_path):
+    """Test that command lines configuring the solver are sent back to run locally."""
+    argv = ["2", "-t", "2", "-d", "2", "--cache", str(tmp_path / "cache.sqlite")]
+    response = daemon.handle({"op": "cli", "argv": argv})
+    assert response["status"] == "local"
+    assert "--cache" in response["reason"]
+    assert daemon.handle({"op": "cli", "argv": ["2", "-t", "2", "--memory-limit", "64"]})["status"] == "local"
+    assert not (tmp_path / "cache.sqlite").exists()
+
+def test_cli_output_is_captured_per_thread(daemon, monkeypatch, capsys):
+    """Test that output of other threads does not end up in a response."""
+    def run_pathfinder(args, data, solver=None):
+        print("from the request")
+        printer = threading.Thread(target=print, args=("from another thread",))
+        printer.start()
+        printer.join()
+
+    monkeypatch.setattr(pathfinder_cli, "run_pathfinder", run_pathfinder)
+    response = daemon.handle({"op": "cli", "argv": ["1", "-d", "Toxic"]})
+    assert response["stdout"] == "from the request\n"
+    assert "from another thread" in capsys.readouterr().out
+
+def test_invalid_requests(daemon):
+    """Test that bad requests are answered with errors instead of crashing."""
+    assert daemon.handle({"op": "bogus"})["status"] == "error"
+    assert daemon.handle({"op": "path", "params": {}})["status"] == "error"
+
+def test_forward_without_daemon(tmp_path):
+    """Test that the thin client falls back when no daemon is running."""
+    assert forward_cli(["1", "-l"], str(tmp_path / "missing.sock")) is None
+
+def test_daemon_over_socket(tmp_path):
+    """Test a daemon process serving main.py and stopping cleanly."""
+    socket_path = str(tmp_path / "daemon.sock")
+    process = subprocess.Popen([sys.executable, "-m", "src.server.daemon", "--socket", socket_path],
+                               stdout=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.05)
+        env = dict(os.environ, PATHFINDER_SOCKET=socket_path)
+        output = subprocess.run([sys.executable, "main.py", "1", "-d", "Calming"], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        assert "Desired effects achieved: 1 / 1" in output
+        with DaemonClient(socket_path) as client:
+            assert client.request({"op": "ping"})["requests"] == 2
+            assert client.request({"op": "shutdown"})["status"] == "ok"
+        assert process.wait(timeout=10) == 0
+        assert not os.path.exists(socket_path)
+    finally:
+        process.kill()
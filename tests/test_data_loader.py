@@ -0,0 +1,58 @@
+import os
+import pickle
+import shutil
+import pytest
+from src.data import loader
+from src.data.loader import CACHE_FILE, load_all_data, parse_all_data
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Copy the data files to a scratch directory."""
+    target = tmp_path / "data"
+    shutil.copytree("data", target, ignore=shutil.ignore_patterns(".*"))
+    return str(target)
+
+def test_snapshot_matches_yaml(data_dir):
+    """Test that data served from the snapshot equals freshly parsed data."""
+    first = dict(load_all_data(data_dir))
+    assert os.path.exists(os.path.join(data_dir, CACHE_FILE))
+    assert load_all_data(data_dir) == first == parse_all_data(data_dir)
+
+def test_sections_load_on_first_access(data_dir):
+    """Test that only the section holding a requested key is loaded."""
+    data = load_all_data(data_dir)
+    assert data.loaded_sections == []
+    assert "Calming" in data["effects_sorted"]
+    assert data.loaded_sections == ["effects"]
+    assert pickle.loads(pickle.dumps(data)) == parse_all_data(data_dir)
+
+def test_edit_invalidates_snapshot(data_dir):
+    """Test that editing a data file rebuilds the snapshot."""
+    load_all_data(data_dir)["ingredient_prices"]
+    path = os.path.join(data_dir, "ingredient_prices.yaml")
+    with open(path) as f:
+        text = f.read()
+    with open(path, "w") as f:
+        f.write(text.replace("Cuke: 2", "Cuke: 99"))
+    assert load_all_data(data_dir)["ingredient_prices"]["Cuke"] == 99
+
+def test_touch_does_not_reparse(data_dir, monkeypatch):
+    """Test that a changed modification time alone is resolved by the file hashes."""
+    load_all_data(data_dir)["effects"]
+    os.utime(os.path.join(data_dir, "effects.yaml"), (0, 0))
+
+    def fail(data_dir):
+        raise AssertionError("data was re-parsed")
+    monkeypatch.setattr(loader, "load_effects_data", fail)
+    assert load_all_data(data_dir)["max_effects"] == 8
+
+@pytest.mark.parametrize("snapshot", [
+    b"\x80\x09",                                 # unsupported protocol: ValueError
+    b"cbuiltins\nint\n(S'x'\nS'y'\nS'z'\ntR.",   # failing constructor call: TypeError
+    pickle.dumps({"version": loader._CACHE_VERSION, "sections": None}),
+])
+def test_damaged_snapshot_is_rebuilt(data_dir, snapshot):
+    """Test that a snapshot that cannot be unpickled or used is rebuilt from the YAML files."""
+    with open(os.path.join(data_dir, CACHE_FILE), "wb") as f:
+        f.write(snapshot)
+    assert load_all_data(data_dir)["max_effects"] == 8
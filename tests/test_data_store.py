@@ -0,0 +1,74 @@
+import os
+import shutil
+import pytest
+from src.cache.result_cache import ResultCache
+from src.config.config_manager import ConfigManager
+from src.data.store import DataStore
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Copy the data files to a scratch directory."""
+    target = tmp_path / "data"
+    shutil.copytree("data", target, ignore=shutil.ignore_patterns(".*"))
+    return str(target)
+
+def edit(data_dir, name, old, new):
+    path = os.path.join(data_dir, name)
+    with open(path) as f:
+        text = f.read()
+    with open(path, "w") as f:
+        f.write(text.replace(old, new))
+
+def test_reload_swaps_snapshot(data_dir):
+    """Test that an edited data file yields a new snapshot while the old one stays intact."""
+    store = DataStore(data_dir, poll_interval=0)
+    reloaded = []
+    store.on_reload(reloaded.append)
+    old = store.snapshot
+    assert not store.check()
+
+    edit(data_dir, "ingredient_prices.yaml", "Cuke: 2", "Cuke: 99")
+    assert store.check()
+    assert store.snapshot.version == 2
+    assert store.snapshot.solver.ingredient_prices["Cuke"] == 99
+    assert old.data["ingredient_prices"]["Cuke"] == 2
+    assert old.solver.ingredient_prices["Cuke"] == 2
+    assert reloaded == [store.snapshot]
+
+def test_broken_file_keeps_snapshot(data_dir):
+    """Test that a data file with errors leaves the current snapshot in place."""
+    store = DataStore(data_dir, poll_interval=0)
+    edit(data_dir, "ingredient_prices.yaml", "Cuke: 2", "Cuke: [2")
+    assert not store.check()
+    assert store.snapshot.version == 1
+    assert store.last_error
+
+    edit(data_dir, "ingredient_prices.yaml", "Cuke: [2", "Cuke: 3")
+    assert store.check()
+    assert store.last_error is None
+    assert store.snapshot.data["ingredient_prices"]["Cuke"] == 3
+
+def test_snapshots_keep_their_cache_fingerprint(data_dir, tmp_path):
+    """Test that a reload does not change the data fingerprint seen by solvers of older snapshots."""
+    cache = ResultCache(str(tmp_path / "cache.db"), data_dir=data_dir)
+    store = DataStore(data_dir, poll_interval=0, cache=cache)
+    old = store.snapshot
+    assert not old.solver.path(["Calming"], stats=True)["stats"].get("cached")
+
+    edit(data_dir, "ingredient_prices.yaml", "Cuke: 2", "Cuke: 99")
+    assert store.check()
+    assert cache.fingerprint == old.solver.cache.fingerprint
+    assert store.snapshot.solver.cache.fingerprint != cache.fingerprint
+    assert old.solver.path(["Calming"], stats=True)["stats"] == {"cached": True}
+    assert not store.snapshot.solver.path(["Calming"], stats=True)["stats"].get("cached")
+    cache.close()
+
+def test_config_manager_rereads_edited_file(tmp_path):
+    """Test that ConfigManager picks up an edited configuration file."""
+    path = tmp_path / "settings.yaml"
+    path.write_text("depth: 3\n")
+    manager = ConfigManager(str(tmp_path))
+    assert manager.load_config("settings") == {"depth": 3}
+    path.write_text("depth: 5\n")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+    assert manager.load_config("settings") == {"depth": 5}
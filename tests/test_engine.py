@@ -1,5 +1,5 @@
 import pytest
-from src.engine.core import Engine
+from src.engine.core import Engine, MoveOrder
 
 # Test data
 EFFECTS = ["Calming", "Energizing", "Anti-gravity", "Toxic"]
@@ -57,4 +57,49 @@ def test_effect_sorting(engine):
     effects = engine.combine(effects, "Base1")  # Calming
     
     # Should be sorted by priority (based on EFFECTS order)
-    assert effects == ["Calming", "Energizing"] 
\ No newline at end of file
+    assert effects == ["Calming", "Energizing"]
+
+def test_move_analysis(engine):
+    """Test the no-op and commuting analysis on the sample rules."""
+    assert engine.noop_ingredients == frozenset()
+    # Base2 transforms Calming, Base1's base effect, so they never commute
+    assert "Base1" not in engine.commute_witnesses["Base2"]
+    noop = Engine(
+        COMBINATIONS + [("Empty", "", "", "", "")], MAX_EFFECTS, EFFECT_PRIORITIES
+    )
+    assert noop.noop_ingredients == {"Empty"}
+    moves = MoveOrder(noop, [("Base1", 1), ("Empty", 0), ("Base2", 2)])
+    assert [ingredient for ingredient, _ in moves.ingredients] == ["Base1", "Base2"]
+
+def test_commuting_moves_reach_same_state(test_data):
+    """Test that every skipped order reaches the same state as the one kept, up to depth 3."""
+    engine = Engine(
+        test_data["combinations"],
+        test_data["max_effects"],
+        test_data["effect_priorities"],
+    )
+    moves = MoveOrder(engine, [(ingredient, 0) for ingredient in engine.base_effects])
+    names = [ingredient for ingredient, _ in moves.ingredients]
+    states, frontier = {()}, {()}
+    for _ in range(3):
+        frontier = {
+            tuple(engine.combine(list(state), ingredient))
+            for state in frontier
+            for ingredient in names
+        }
+        frontier -= states
+        states |= frontier
+    skipped = 0
+    for state in states:
+        mask = moves.mask(state)
+        for a in names:
+            child = engine.combine(list(state), a)
+            skip = moves.skips(mask, a, child)
+            for index, b in enumerate(names):
+                if skip >> index & 1:
+                    assert index < names.index(a)
+                    assert engine.combine(child, b) == engine.combine(
+                        engine.combine(list(state), b), a
+                    )
+                    skipped += 1
+    assert skipped > 0
@@ -0,0 +1,37 @@
+import os
+import pytest
+from src.engine import external_search
+from src.engine.solver import Solver
+
+@pytest.mark.parametrize("drug_type", ["marijuana", "meth", "cocaine"])
+def test_external_matches_in_memory(test_data, tmp_path, drug_type):
+    """Test that the external-memory search finds the same recipe and leaves no files behind."""
+    job = {"drug_type": drug_type, "depth": 4}
+    expected = Solver(test_data).optimize(job)
+    record = Solver(test_data, external_dir=str(tmp_path)).optimize(job, stats=True)
+    assert record["search_mode"] == record["stats"]["mode"] == "external"
+    assert record["profit"] == pytest.approx(expected["profit"])
+    assert len(record["path"]) == len(expected["path"])
+    assert len(record["stats"]["layer_seconds"]) == 5
+    assert os.listdir(tmp_path) == []
+
+def test_external_merge_passes(test_data, tmp_path, monkeypatch):
+    """Test that many small runs merged in several passes give the same result."""
+    monkeypatch.setattr(external_search, "MERGE_FAN_IN", 3)
+    job = {"drug_type": "meth", "depth": 4}
+    expected = Solver(test_data, external_dir=str(tmp_path)).optimize(job, stats=True)
+    record = Solver(test_data, external_dir=str(tmp_path),
+                    memory_limit=50 * external_search.BUFFER_RECORD_BYTES).optimize(job, stats=True)
+    assert record["path"] == expected["path"]
+    assert record["stats"]["frontier"] == expected["stats"]["frontier"]
+    stats = record["stats"]
+    assert stats["generated"] == stats["pruned"] + stats["duplicates"] + stats["queued"]
+
+def test_external_with_constraints(test_data, tmp_path):
+    """Test that constraints and starting effects carry over to the external search."""
+    job = {"drug_type": "meth", "depth": 3, "initial_effects": ["Calming"],
+           "constraints": {"forbidden_effects": ["Toxic"], "max_cost": 10}}
+    expected = Solver(test_data).optimize(job)
+    record = Solver(test_data, external_dir=str(tmp_path)).optimize(job)
+    assert record["profit"] == pytest.approx(expected["profit"])
+    assert "Toxic" not in record["effects"] and record["ingredient_cost"] <= 10
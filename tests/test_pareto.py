@@ -0,0 +1,29 @@
+from itertools import product
+import pytest
+from src.engine.optimizer import get_effects_value
+from src.engine.solver import Solver
+
+def brute_force_front(solver, drug_type, depth):
+    """Pareto front of (profit, length, cost) over every recipe up to depth."""
+    base_price = solver.base_prices[drug_type]
+    points = set()
+    for length in range(depth + 1):
+        for path in product(solver.engine.base_effects, repeat=length):
+            effects = []
+            for ingredient in path:
+                effects = solver.engine.combine(effects, ingredient)
+            cost = sum(solver.ingredient_prices.get(i, 0) for i in path)
+            points.add((get_effects_value(effects, base_price, solver.effect_multipliers) - cost, length, cost))
+    return {p for p in points
+            if not any(q != p and q[0] >= p[0] and q[1] <= p[1] and q[2] <= p[2] for q in points)}
+
+@pytest.mark.parametrize("drug_type", ["meth", "cocaine"])
+def test_frontier_matches_brute_force(test_data, drug_type):
+    """Test that the frontier holds exactly the non-dominated recipes."""
+    solver = Solver(test_data)
+    record = solver.pareto({"drug_type": drug_type, "depth": 3})
+    prod_cost = record["production_cost"]
+    found = {(e["profit"] + prod_cost, len(e["path"]), e["ingredient_cost"]) for e in record["frontier"]}
+    assert found == brute_force_front(solver, drug_type, 3)
+    assert record["frontier"][0]["path"] == record["path"]
+    assert record["profit"] == pytest.approx(solver.optimize({"drug_type": drug_type, "depth": 3})["profit"])
@@ -1,5 +1,5 @@
 import pytest
-from src.utils.parser import parse_effects
+from src.utils.parser import parse_constraints, parse_effects, parse_names
 
 # Sample data for testing
 EFFECTS = ["Calming", "Energizing", "Anti-gravity", "Toxic"]
@@ -48,4 +48,25 @@ def test_invalid_inputs():
     # Invalid names
     assert parse_effects(["NonExistent"], EFFECTS, EFFECTS_SORTED) == set()
     # Mixed valid/invalid
-    assert parse_effects(["1", "NonExistent"], EFFECTS, EFFECTS_SORTED) == {"Anti-gravity"} 
\ No newline at end of file
+    assert parse_effects(["1", "NonExistent"], EFFECTS, EFFECTS_SORTED) == {"Anti-gravity"}
+
+def test_parse_names():
+    """Test that constraint names may span arguments and unknown names are rejected."""
+    ingredients = ["Cuke", "Horse Semen", "Mega Bean"]
+    assert parse_names(["Horse", "Semen"], ingredients, [], "ingredient") == {"Horse Semen"}
+    assert parse_names(["cuke,mega", "bean"], ingredients, [], "ingredient") == {"Cuke", "Mega Bean"}
+    assert parse_names(["1", "toxic"], EFFECTS, EFFECTS_SORTED, "effect") == {"Anti-gravity", "Toxic"}
+    with pytest.raises(ValueError, match="Unknown ingredient 'Horse'.*Cuke, Horse Semen, Mega Bean"):
+        parse_names(["Horse", "Cuke"], ingredients, [], "ingredient")
+    with pytest.raises(ValueError, match="Unknown effect '5'"):
+        parse_names(["5"], EFFECTS, EFFECTS_SORTED, "effect")
+
+def test_parse_constraints_rejects_unknown_ingredients(test_data):
+    """Test that a misspelled ingredient is reported instead of dropped."""
+    from argparse import Namespace
+    args = Namespace(require=None, forbid=None, only=None, ban=["Horse", "Semen"],
+                     max_cost=None, max_ingredients=None)
+    assert parse_constraints(args, test_data) == {"banned_ingredients": ["Horse Semen"]}
+    args.only = ["Cukee"]
+    with pytest.raises(ValueError, match="Cukee"):
+        parse_constraints(args, test_data)
@@ -0,0 +1,93 @@
+import shutil
+import pytest
+from src.cache.result_cache import ResultCache, normalize_job
+from src.cli.batch_pathfinder import process_pathfinder_job
+
+JOB = {"desired_effects": ["Energizing", "Calming"]}
+RESULT = {"status": "ok", "params": JOB, "effects": ["Calming", "Energizing"], "path": ["Addy"]}
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create an empty result cache in a temporary directory."""
+    return ResultCache(str(tmp_path / "cache.sqlite"))
+
+def test_equivalent_jobs_share_a_key(cache):
+    """Test that effect order and default options do not change the cache key."""
+    assert cache.key("path", JOB) == cache.key("path", {"desired_effects": ["Calming", "Energizing"],
+                                                        "initial_effects": []})
+    assert cache.key("optimize", {"drug_type": "meth", "prod_options": {}}) == \
+        cache.key("optimize", {"drug_type": "meth", "depth": 3, "prod_options": {"quality": 3}})
+    assert cache.key("optimize", {"drug_type": "meth", "depth": 4}) != \
+        cache.key("optimize", {"drug_type": "meth", "depth": 3})
+    assert cache.key("path", dict(JOB, strategy="auto")) == cache.key("path", JOB)
+    assert cache.key("path", dict(JOB, strategy="iddfs")) != cache.key("path", dict(JOB, strategy="bfs"))
+
+def test_unknown_kind():
+    """Test that unknown job kinds are rejected."""
+    with pytest.raises(ValueError):
+        normalize_job("sweep", JOB)
+
+def test_hit_and_miss_statistics(cache):
+    """Test that lookups are counted and hits return the stored record."""
+    assert cache.get("path", JOB) is None
+    cache.put("path", JOB, RESULT)
+    params = {"desired_effects": ["Calming", "Energizing"]}
+    hit = cache.get("path", params)
+
+    assert hit["path"] == ["Addy"]
+    assert hit["params"] == params
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+def test_size_based_eviction(tmp_path):
+    """Test that the least recently used entries are evicted over the size limit."""
+    cache = ResultCache(str(tmp_path / "cache.sqlite"), max_bytes=250)
+    jobs = [{"desired_effects": [effect]} for effect in ["Calming", "Toxic", "Foggy"]]
+    for job in jobs:
+        cache.put("path", job, {**RESULT, "params": job})
+
+    assert cache.get("path", jobs[0]) is None
+    assert cache.get("path", jobs[2]) is not None
+    assert cache.stats()["evictions"] >= 1
+    assert cache.stats()["bytes"] <= 250
+
+def test_hit_writes_one_transaction(cache):
+    """Test that a hit updates its counter and access time in a single transaction."""
+    cache.put("path", JOB, RESULT)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    cache.get("path", JOB)
+    writes = [s.split()[0] for s in statements if not s.startswith("SELECT")]
+    assert writes == ["BEGIN", "UPDATE", "UPDATE", "COMMIT"]
+
+def test_stores_do_not_sum_the_table(cache, monkeypatch):
+    """Test that the stored size is tracked instead of summed on every store."""
+    sums = []
+    stored_size = cache._stored_size
+    monkeypatch.setattr(cache, "_stored_size", lambda: sums.append(1) or stored_size())
+    for effect in ["Calming", "Toxic", "Foggy", "Sneaky", "Jennerising"]:
+        job = {"desired_effects": [effect]}
+        cache.put("path", job, {**RESULT, "params": job})
+    assert len(sums) == 1
+    assert cache._size == cache.stats()["bytes"]
+
+def test_data_change_invalidates(tmp_path):
+    """Test that editing a data file changes every cache key."""
+    data_dir = tmp_path / "data"
+    shutil.copytree("data", data_dir)
+    before = ResultCache(str(tmp_path / "cache.sqlite"), data_dir=str(data_dir))
+    before.put("path", JOB, RESULT)
+
+    prices = data_dir / "ingredient_prices.yaml"
+    prices.write_text(prices.read_text().replace("Addy: 9", "Addy: 10"))
+    after = ResultCache(str(tmp_path / "cache.sqlite"), data_dir=str(data_dir))
+    assert after.get("path", JOB) is None
+
+def test_batch_job_uses_cache(tmp_path, test_data):
+    """Test that a cached pathfinder job is served from the cache."""
+    path = str(tmp_path / "cache.sqlite")
+    first = process_pathfinder_job(JOB, test_data, path)
+    second = process_pathfinder_job(JOB, test_data, path)
+
+    assert first == second
+    assert ResultCache(path).stats()["hits"] == 1
@@ -0,0 +1,63 @@
+import pytest
+from src.parallel.scheduler import CostModel, schedule_jobs
+
+JOBS = [
+    {"drug_type": "meth", "depth": 2},
+    {"drug_type": "meth", "depth": 7},
+    {"drug_type": "cocaine", "depth": 1},
+    {"drug_type": "marijuana", "depth": 5, "initial_effects": ["Calming"]},
+    {"drug_type": "marijuana", "depth": 5},
+]
+
+def test_deeper_jobs_cost_more():
+    """Test that the default model grows with depth and initial effects."""
+    model = CostModel()
+    assert model.predict({"depth": 6}) > model.predict({"depth": 5}) > model.predict({"depth": 4})
+    assert model.predict({"depth": 5, "initial_effects": ["Calming"]}) > model.predict({"depth": 5})
+
+def test_longest_jobs_are_scheduled_first():
+    """Test that jobs are submitted in descending order of predicted cost."""
+    chunks = schedule_jobs(JOBS, CostModel(), chunk_seconds=0)
+    order = [job for chunk in chunks for _, job in chunk]
+
+    assert all(len(chunk) == 1 for chunk in chunks)
+    assert order[0]["depth"] == 7
+    assert order[1] == {"drug_type": "marijuana", "depth": 5, "initial_effects": ["Calming"]}
+    assert [job["depth"] for job in order[-2:]] == [2, 1]
+
+def test_tiny_jobs_are_chunked():
+    """Test that cheap jobs are packed into chunks below the chunk limit."""
+    jobs = [{"drug_type": "meth", "depth": 1}] * 10 + [{"drug_type": "meth", "depth": 6}]
+    chunks = schedule_jobs(jobs, CostModel(), chunk_seconds=0.2)
+
+    assert chunks[0][0][1]["depth"] == 6 and len(chunks[0]) == 1
+    assert sum(len(chunk) for chunk in chunks) == len(jobs)
+    for chunk in chunks[1:]:
+        assert sum(seconds for seconds, _ in chunk) <= 0.2
+
+def test_history_tunes_predictions(tmp_path):
+    """Test that recorded timings drive and calibrate predictions."""
+    path = str(tmp_path / "timings.json")
+    model = CostModel(path)
+    model.record({"depth": 4}, 2.0)
+    model.record({"depth": 4}, 4.0)
+    model.record({"depth": 4}, 3.0)
+    model.save()
+
+    reloaded = CostModel(path)
+    assert reloaded.predict({"depth": 4}) == pytest.approx(3.0)
+    # Unseen depths are scaled by how much slower this machine was than the default model
+    ratio = 3.0 / CostModel.default_estimate(4, 0)
+    assert reloaded.predict({"depth": 6}) == pytest.approx(CostModel.default_estimate(6, 0) * ratio)
+
+def test_calibration_is_computed_once_per_schedule(monkeypatch):
+    """Test that scheduling a batch does not recompute the calibration for every job."""
+    model = CostModel()
+    model.record({"depth": 4}, 1.0)
+    calls = []
+    calibration = model.calibration
+    monkeypatch.setattr(model, "calibration", lambda: calls.append(1) or calibration())
+    chunks = schedule_jobs(JOBS, model, chunk_seconds=0)
+    assert len(calls) == 1
+    assert [seconds for chunk in chunks for seconds, _ in chunk] == sorted(
+        (model.predict(job) for job in JOBS), reverse=True)
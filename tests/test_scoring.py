@@ -0,0 +1,51 @@
+import pytest
+from src.engine.core import Engine
+from src.engine.optimizer import get_effects_value
+from src.engine.scoring import EffectValues
+from src.engine.state_graph import StateGraph
+
+def _values(test_data, drug_type="meth"):
+    engine = Engine(test_data["combinations"], test_data["max_effects"], test_data["effect_priorities"])
+    base_price = test_data["drug_pricing"]["base_prices"][drug_type]
+    values = EffectValues.for_engine(engine, test_data["effect_multipliers"], base_price)
+    states = [tuple(state) for state in StateGraph.explore(engine, 2).states]
+    return engine, values, states
+
+@pytest.mark.parametrize("drug_type", ["marijuana", "meth", "cocaine"])
+def test_encodings_match_get_effects_value(test_data, drug_type):
+    """Test that names, ids and masks give exactly the value of get_effects_value."""
+    engine, values, states = _values(test_data, drug_type)
+    base_price = test_data["drug_pricing"]["base_prices"][drug_type]
+    for state in states:
+        expected = get_effects_value(list(state), base_price, test_data["effect_multipliers"])
+        ids = [values.effect_ids[effect] for effect in state]
+        assert values.value(state) == values.value(list(state)) == expected
+        assert values.value_of_ids(ids) == expected
+        assert values.value_of_mask(sum(engine.effect_bits[effect] for effect in state)) == expected
+
+def test_batch_values(test_data):
+    """Test that a batch of padded id-encoded states is priced like each state alone."""
+    _, values, states = _values(test_data)
+    width = test_data["max_effects"]
+    keys = [bytes(values.effect_ids[effect] for effect in state).ljust(width, b"\xff") for state in states]
+    assert values.values(keys) == [values.value(state) for state in states]
+    assert values.values([]) == []
+
+def test_batch_values_numpy(test_data):
+    """Test that a NumPy array of states is priced like each state alone."""
+    np = pytest.importorskip("numpy")
+    _, values, states = _values(test_data)
+    ids = np.full((len(states), test_data["max_effects"]), 255, dtype=np.uint8)
+    for row, state in enumerate(states):
+        ids[row, :len(state)] = [values.effect_ids[effect] for effect in state]
+    assert values.values(ids) == [values.value(state) for state in states]
+
+def test_memo_is_bounded(test_data):
+    """Test that no more than max_entries values are remembered."""
+    engine = Engine(test_data["combinations"], test_data["max_effects"], test_data["effect_priorities"])
+    values = EffectValues.for_engine(engine, test_data["effect_multipliers"], 70, max_entries=2)
+    for effect in list(engine.effect_bits)[:5]:
+        values.value((effect,))
+    assert len(values._values) == 2
+    with pytest.raises(ValueError):
+        EffectValues({"Calming": 256}, {}, 70)
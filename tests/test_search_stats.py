@@ -0,0 +1,64 @@
+from src.cache.result_cache import ResultCache
+from src.cli.batch_pathfinder import process_batch_job
+from src.engine.pathfinder import find_path
+from src.engine.search_stats import SearchStats
+from src.engine.solver import Solver
+from src.engine.state_graph import StateGraph
+
+def test_counters_add_up(test_data):
+    """Test that every generated child is counted as pruned, duplicate or queued."""
+    solver = Solver(test_data)
+    stats = solver.optimize({"drug_type": "meth", "depth": 4}, stats=True)["stats"]
+    assert stats["generated"] == stats["pruned"] + stats["duplicates"] + stats["queued"]
+    assert stats["generated"] == stats["expanded"] * len(solver.engine.base_effects) - stats["skipped"]
+    assert stats["skipped"] >= stats["expanded"] * len(solver.engine.noop_ingredients) > 0
+    assert stats["frontier"][0] == 1 and len(stats["frontier"]) == 5
+    assert len(stats["layer_seconds"]) == 5
+    assert stats["peak_queue"] >= max(stats["frontier"])
+
+def test_path_frontier_counts_new_states(test_data):
+    """Test that the pathfinder's frontier holds the states first reached at each depth."""
+    solver = Solver(test_data)
+    stats = SearchStats()
+    # The shortest path has four ingredients, so every state within three is queued
+    find_path(solver.transitions, {"Calming", "Energizing", "Toxic"}, stats=stats)
+    graph = StateGraph.explore(solver.engine, 3)
+    counts = [0] * 4
+    seen = set()
+    for effects, depth in zip(graph.states, graph.depths):
+        if tuple(sorted(effects)) not in seen:
+            seen.add(tuple(sorted(effects)))
+            counts[depth] += 1
+    assert stats.frontier[:4] == counts
+
+    # Without a cost limit, prices do not make the search revisit states
+    priced = SearchStats()
+    find_path(solver.transitions, {"Calming", "Energizing", "Toxic"}, ingredient_prices=solver.ingredient_prices,
+              stats=priced)
+    assert priced.frontier == stats.frontier and priced.expanded == stats.expanded
+
+def test_stats_in_records(test_data, tmp_path):
+    """Test that batch records carry stats and cache hits are marked."""
+    job = {"desired_effects": ["Calming", "Energizing"]}
+    record = process_batch_job(job, test_data)
+    assert record["stats"]["expanded"] > 0
+
+    solver = Solver(test_data, ResultCache(str(tmp_path / "cache.sqlite")))
+    assert "stats" not in solver.optimize({"drug_type": "meth", "depth": 2})
+    assert solver.optimize({"drug_type": "meth", "depth": 2}, stats=True)["stats"] == {"cached": True}
+
+def test_progress_callback(test_data):
+    """Test that progress is reported at every depth and every progress_every states."""
+    solver = Solver(test_data)
+    reports = []
+    stats = SearchStats(progress=reports.append, progress_every=500)
+    find_path(solver.transitions, {"Calming", "Energizing", "Toxic"}, stats=stats)
+    starts = [report for report in reports if report.done == 0]
+    assert [report.depth for report in starts] == list(range(len(stats.frontier)))
+    assert [report.frontier for report in starts] == stats.frontier
+    assert len(reports) - len(starts) >= sum(stats.frontier[:-1]) // 500
+    assert all(report.eta is None for report in reports)
+
+    reports = []
+    solver.optimize({"drug_type": "meth", "depth": 4}, progress=reports.append)
+    assert reports[-1].depth == 4 and reports[-1].eta is not None
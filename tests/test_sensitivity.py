@@ -0,0 +1,40 @@
+import pytest
+from src.engine.solver import Solver
+
+@pytest.fixture(scope="module")
+def solver(test_data):
+    return Solver(test_data)
+
+def best_recipe(test_data, depth, **prices):
+    data = dict(test_data, ingredient_prices=dict(test_data["ingredient_prices"], **prices))
+    return Solver(data).reoptimize({"drug_type": "meth", "depth": depth},
+                                   Solver(data).state_graph([], depth))["path"]
+
+def test_intervals_match_reruns(solver, test_data):
+    """Test that the recipe changes exactly at the ends of each ingredient interval."""
+    record = solver.sensitivity({"drug_type": "meth", "depth": 3})
+    intervals = {entry["parameter"]: entry for entry in record["sensitivity"]}
+    assert set(intervals) == {"base_price"} | set(solver.engine.base_effects)
+    checked = 0
+    for name, entry in intervals.items():
+        if name == "base_price":
+            continue
+        if entry["upper"] is not None:
+            assert best_recipe(test_data, 3, **{name: entry["upper"] - 0.01}) == record["path"]
+            assert best_recipe(test_data, 3, **{name: entry["upper"] + 0.01}) == entry["above"]
+            checked += 1
+        if entry["below"] is not None:
+            assert best_recipe(test_data, 3, **{name: entry["lower"] + 0.01}) == record["path"]
+            assert best_recipe(test_data, 3, **{name: entry["lower"] - 0.01}) == entry["below"]
+            checked += 1
+        else:
+            assert entry["lower"] == 0
+    assert checked > 0
+
+def test_selected_parameters(solver):
+    """Test analysing only some prices, including the base price."""
+    record = solver.sensitivity({"drug_type": "cocaine", "depth": 2}, ["base_price", "Cuke"])
+    base, cuke = record["sensitivity"]
+    assert base["parameter"] == "base_price" and base["value"] == solver.base_prices["cocaine"]
+    assert base["lower"] <= base["value"] <= (base["upper"] or float("inf"))
+    assert cuke["lower"] <= cuke["value"] <= (cuke["upper"] or float("inf"))
@@ -0,0 +1,36 @@
+import pytest
+from src.engine.core import Engine
+from src.engine.optimizer import find_best_path
+from src.engine.solver import Solver, calculate_production_cost, get_solver
+
+def test_optimize_matches_find_best_path(test_data):
+    """Test that the solver returns the same recipe as a direct search."""
+    solver = Solver(test_data)
+    record = solver.optimize({"drug_type": "meth", "depth": 3, "prod_options": {"quality": 3}})
+    prod_cost = calculate_production_cost("meth", {"quality": 3}, test_data)
+    engine = Engine(test_data["combinations"], test_data["max_effects"], test_data["effect_priorities"])
+    effects, path, cost = find_best_path(engine, 70, prod_cost, 3, test_data["effect_multipliers"],
+                                         test_data["ingredient_prices"], test_data["effect_priorities"])
+    assert record["path"] == path
+    assert record["effects"] == list(effects)
+    assert record["production_cost"] == pytest.approx(prod_cost)
+
+def test_state_is_reused_between_calls(test_data):
+    """Test that transitions and production costs are kept across queries."""
+    solver = Solver(test_data)
+    first = solver.optimize({"drug_type": "cocaine", "depth": 2})
+    transitions = len(solver.transitions)
+    assert transitions > 0
+    assert solver.optimize({"drug_type": "cocaine", "depth": 2}) == first
+    assert len(solver.transitions) == transitions
+
+def test_path(test_data):
+    """Test that path records report the path and the effects it reaches."""
+    solver = Solver(test_data)
+    record = solver.path(["Calming", "Toxic"])
+    assert record["status"] == "ok"
+    assert {"Calming", "Toxic"} <= set(record["effects"])
+
+def test_get_solver_is_per_process(test_data):
+    """Test that workers share one solver per process."""
+    assert get_solver(test_data) is get_solver()
@@ -0,0 +1,63 @@
+import os
+import pytest
+from src.engine.solver import Solver
+from src.engine.state_graph import StateGraph, load_or_explore, rules_fingerprint
+
+@pytest.fixture(scope="module")
+def solver(test_data):
+    return Solver(test_data)
+
+@pytest.fixture(scope="module")
+def graph(solver):
+    return StateGraph.explore(solver.engine, 4, fingerprint=rules_fingerprint(solver.data))
+
+@pytest.mark.parametrize("drug_type", ["marijuana", "meth", "cocaine"])
+def test_reoptimize_matches_search(solver, graph, drug_type):
+    """Test that relaxing the graph gives the same best recipe as the search."""
+    for depth in range(1, 5):
+        options = {"drug_type": drug_type, "depth": depth}
+        searched = solver.optimize(options)
+        relaxed = solver.reoptimize(options, graph)
+        assert relaxed["profit"] == pytest.approx(searched["profit"])
+        assert relaxed["ingredient_cost"] == searched["ingredient_cost"]
+        assert len(relaxed["path"]) <= depth
+
+def test_price_change_matches_new_search(test_data, graph):
+    """Test that a price update is reflected without exploring again."""
+    data = dict(test_data, ingredient_prices=dict(test_data["ingredient_prices"], Cuke=40))
+    solver = Solver(data)
+    options = {"drug_type": "meth", "depth": 3}
+    relaxed = solver.reoptimize(options, graph, top=3)
+    assert relaxed["profit"] == pytest.approx(solver.optimize(options)["profit"])
+    assert "Cuke" not in relaxed["path"]
+    profits = [relaxed["profit"]] + [alt["profit"] for alt in relaxed["alternatives"]]
+    assert profits == sorted(profits, reverse=True) and len(profits) == 3
+
+def test_graph_is_saved_and_reused(solver, tmp_path):
+    """Test that saved graphs are reused up to their depth and the depth is checked."""
+    directory = str(tmp_path)
+    first = load_or_explore(directory, solver.engine, solver.data, 3, ["Calming"])
+    assert len(os.listdir(directory)) == 1
+    second = load_or_explore(directory, solver.engine, solver.data, 2, ["Calming"])
+    assert second.max_depth == 3 and second.states == first.states
+    assert second.relax(solver.ingredient_prices, 3).costs == first.relax(solver.ingredient_prices).costs
+    with pytest.raises(ValueError):
+        second.relax(solver.ingredient_prices, 4)
+    with pytest.raises(ValueError):
+        solver.reoptimize({"drug_type": "meth", "depth": 2}, second)
+
+def test_reprice_reports_lost_results(tmp_path):
+    """Test that a re-priced job without a result is written and reported instead of failing the run."""
+    import json
+    from src.parallel.batch_optimizer import run_reprice_batch
+    job = {"drug_type": "meth", "depth": 1, "constraints": {"required_effects": ["Zombifying", "Cyclopean"]}}
+    batch, previous = tmp_path / "batch.json", tmp_path / "previous.json"
+    batch.write_text(json.dumps([job, {"drug_type": "meth", "depth": 1}]))
+    previous.write_text(json.dumps([{"status": "ok", "params": job, "path": ["Cuke"],
+                                     "profit": 10.0, "ingredient_cost": 2.0}]))
+    results = tmp_path / "results.jsonl"
+    changes = run_reprice_batch(str(batch), str(results), str(tmp_path / "graphs"), str(previous))
+    assert [record["status"] for record in map(json.loads, results.read_text().splitlines())] == \
+        ["no_result", "ok"]
+    assert changes[0]["params"] == job and changes[0]["path"] is None and changes[0]["old_path"] == ["Cuke"]
+    assert len(changes) == 2
@@ -0,0 +1,55 @@
+import os
+import time
+import pytest
+from src.parallel.batch_optimizer import iter_chunk_results
+from src.parallel.supervisor import SupervisedPool, WorkerLimits, process_rss
+
+pytestmark = pytest.mark.skipif(process_rss(os.getpid()) is None, reason="requires /proc")
+
+def task(kind):
+    """Module-level task so it can be sent to worker processes."""
+    if kind == "sleep":
+        time.sleep(30)
+    elif kind == "hog":
+        hog = bytearray(200 * 1024 * 1024)
+        for i in range(0, len(hog), 4096):
+            hog[i] = 1
+        time.sleep(30)
+    elif kind == "fail":
+        raise ValueError("bad job")
+    return os.getpid()
+
+def run(items, limits):
+    with SupervisedPool(2, limits, poll_interval=0.02) as pool:
+        return {outcome.item: outcome for outcome in pool.imap_unordered(task, items)}
+
+def test_runaway_task_times_out():
+    """Test that a task over the time limit is killed and the others still finish."""
+    outcomes = run(["sleep", "ok"], WorkerLimits(timeout=0.5))
+    assert outcomes["sleep"].status == "timeout"
+    assert outcomes["ok"].status == "ok"
+
+def test_memory_ceiling():
+    """Test that a task over the memory limit is killed and reported as oom."""
+    outcomes = run(["hog"], WorkerLimits(memory_limit=100 * 1024 * 1024, timeout=10))
+    assert outcomes["hog"].status == "oom"
+
+def test_task_errors_are_reported():
+    """Test that exceptions in a task are reported instead of killing the batch."""
+    outcome = run(["fail"], WorkerLimits(timeout=10))["fail"]
+    assert outcome.status == "error"
+    assert "bad job" in outcome.value
+
+def test_workers_are_recycled_after_n_tasks():
+    """Test that each worker is replaced after max_tasks tasks."""
+    with SupervisedPool(1, WorkerLimits(max_tasks=1), poll_interval=0.02) as pool:
+        pids = [outcome.value for outcome in pool.imap_unordered(task, ["a", "b", "c"])]
+        assert len(set(pids)) == 3
+        assert pool.recycled == 3
+
+def test_chunks_are_split_under_job_limits():
+    """Test that a job limit applies to each job of a chunk, not to the chunk."""
+    chunk = [(None, {"drug_type": "meth", "depth": 1}), (None, {"drug_type": "cocaine", "depth": 1})]
+    results = list(iter_chunk_results([chunk], 1, 4, None, 0, WorkerLimits(timeout=60)))
+    assert [len(timed) for timed in results] == [1, 1]
+    assert all(timed[0][0]["status"] == "ok" for timed in results)
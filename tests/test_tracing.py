@@ -0,0 +1,49 @@
+import json
+import os
+import pstats
+import pytest
+from src.cli.batch_pathfinder import process_batch_job
+from src.utils import tracing
+
+@pytest.fixture
+def trace_dir(tmp_path):
+    tracing.enable(str(tmp_path), profile=True)
+    yield str(tmp_path)
+    tracing.disable()
+
+def test_spans_off_by_default(tmp_path):
+    """Test that spans record nothing while tracing is off."""
+    assert tracing.trace_dir() is None
+    with tracing.span("idle", detail=1) as args:
+        args["more"] = 2
+    assert tracing.write_trace() is None
+    assert os.listdir(tmp_path) == []
+
+def test_trace_of_a_job(trace_dir, test_data):
+    """Test that a traced job records its job and search spans and a loadable profile."""
+    record = process_batch_job({"desired_effects": ["Calming", "Energizing"]}, test_data)
+    path = tracing.write_trace()
+    assert path == os.path.join(trace_dir, tracing.TRACE_FILE)
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    spans = {event["name"]: event for event in events if event["ph"] == "X"}
+    job, search = spans["path"], spans["find_path"]
+    assert job["args"]["status"] == record["status"] == "ok"
+    assert job["ts"] <= search["ts"] and search["dur"] <= job["dur"]
+    assert search["args"]["mode"] in ("bfs", "iddfs") and search["pid"] == os.getpid()
+    assert pstats.Stats(job["args"]["profile"]).total_calls > 0
+    assert any(event["ph"] == "M" and event["args"]["name"] == "main" for event in events)
+
+def test_cli_arguments(tmp_path):
+    """Test that --trace turns tracing on and --profile needs a trace directory."""
+    import argparse
+    parser = argparse.ArgumentParser()
+    tracing.add_trace_arguments(parser)
+    with pytest.raises(SystemExit):
+        tracing.trace_from_args(parser, parser.parse_args(["--profile"]))
+    try:
+        tracing.trace_from_args(parser, parser.parse_args(["--trace", str(tmp_path / "trace")]))
+        assert tracing.trace_dir() == str(tmp_path / "trace")
+        assert not os.environ.get(tracing.PROFILE_ENV_VAR)
+    finally:
+        tracing.disable()
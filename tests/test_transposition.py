@@ -0,0 +1,94 @@
+import pytest
+from src.cache.result_cache import ResultCache
+from src.engine.solver import Solver
+from src.engine.transposition import TranspositionTable
+
+def test_table_covers_dominated_visits():
+    """Test that a stored state covers visits with fewer ingredients left at no lower cost."""
+    table = TranspositionTable(8)
+    table.store(("Calming",), 3, 5.0)
+    assert table.covers(("Calming",), 3, 5.0)
+    assert table.covers(("Calming",), 2, 6.0)
+    assert not table.covers(("Calming",), 4, 5.0)
+    assert not table.covers(("Calming",), 2, 4.0)
+    assert not table.covers(("Toxic",), 0, 9.0)
+    assert table.hits == 2
+
+def test_table_replaces_colliding_states():
+    """Test that a single-slot table keeps only the last state stored."""
+    table = TranspositionTable(1)
+    table.store(("Calming",), 3)
+    table.store(("Toxic",), 1)
+    assert not table.covers(("Calming",), 0)
+    assert table.covers(("Toxic",), 1)
+
+@pytest.mark.parametrize("drug_type", ["marijuana", "meth", "cocaine"])
+@pytest.mark.parametrize("depth", [3, 4])
+def test_memory_limit_keeps_result(test_data, drug_type, depth):
+    """Test that the bounded-memory search finds the same recipe as the breadth-first one."""
+    job = {"drug_type": drug_type, "depth": depth}
+    expected = Solver(test_data).optimize(job)
+    record = Solver(test_data, memory_limit=64 * 1024).optimize(job, stats=True)
+    assert record["search_mode"] == record["stats"]["mode"] == "dfs"
+    assert record["profit"] == pytest.approx(expected["profit"])
+    assert len(record["path"]) == len(expected["path"])
+
+def test_memory_limit_not_reached(test_data):
+    """Test that a generous limit keeps the breadth-first search."""
+    record = Solver(test_data, memory_limit=1024 ** 3).optimize({"drug_type": "meth", "depth": 3})
+    assert record["search_mode"] == "bfs"
+    assert "search_mode" not in Solver(test_data).optimize({"drug_type": "meth", "depth": 3})
+
+def test_cached_records_keep_search_mode(test_data, tmp_path):
+    """Test that records served from the cache report a search mode like fresh ones."""
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    job = {"drug_type": "meth", "depth": 3}
+    fresh = Solver(test_data, cache, memory_limit=64 * 1024).optimize(job)
+    record = Solver(test_data, cache, memory_limit=64 * 1024).optimize(job, stats=True)
+    assert record["stats"] == {"cached": True} and record["search_mode"] == fresh["search_mode"] == "dfs"
+    assert "search_mode" not in Solver(test_data, cache).optimize(job)
+
+    other = {"drug_type": "cocaine", "depth": 3}
+    Solver(test_data, cache).optimize(other)
+    assert Solver(test_data, cache, memory_limit=1024 ** 3).optimize(other)["search_mode"] == "bfs"
+    cache.close()
+
+def test_dfs_stats(test_data):
+    """Test the depth-first counters after a switch."""
+    solver = Solver(test_data, memory_limit=64 * 1024)
+    stats = solver.optimize({"drug_type": "meth", "depth": 3}, stats=True)["stats"]
+    assert stats["frontier"][0] == 1 and len(stats["frontier"]) == 4
+    assert stats["peak_queue"] == 4 and stats["layer_seconds"] == []
+    assert stats["generated"] == stats["pruned"] + stats["duplicates"] + stats["queued"]
+
+@pytest.mark.parametrize("targets", [
+    ["Calming"],
+    ["Calming", "Energizing"],
+    ["Calming", "Energizing", "Toxic"],
+    ["Athletic", "Sneaky", "Toxic"],
+])
+def test_iddfs_finds_shortest_path(test_data, targets):
+    """Test that iterative deepening finds a path as short as the breadth-first one."""
+    solver = Solver(test_data)
+    expected = solver.path(targets, strategy="bfs")
+    record = solver.path(targets, strategy="iddfs", stats=True)
+    assert record["stats"]["mode"] == "iddfs"
+    assert set(targets) <= set(record["effects"])
+    assert len(record["path"]) == len(expected["path"])
+
+def test_iddfs_without_solution(test_data):
+    """Test that iterative deepening stops when limits leave no path."""
+    solver = Solver(test_data)
+    targets = ["Calming", "Energizing", "Toxic"]
+    for constraints in ({"max_ingredients": 3}, {"max_cost": 9}):
+        assert solver.path(targets, constraints=constraints, strategy="bfs")["status"] == "fail"
+        assert solver.path(targets, constraints=constraints, strategy="iddfs")["status"] == "fail"
+
+def test_auto_strategy(test_data):
+    """Test that 'auto' picks iterative deepening for many missing effects."""
+    solver = Solver(test_data)
+    assert solver.path(["Calming"], strategy="auto", stats=True)["stats"]["mode"] == "bfs"
+    record = solver.path(["Calming", "Energizing", "Toxic"], strategy="auto", stats=True)
+    assert record["stats"]["mode"] == "iddfs"
+    with pytest.raises(ValueError):
+        solver.path(["Calming"], strategy="astar")
@@ -0,0 +1,115 @@
+import json
+import multiprocessing
+import os
+import pytest
+from src.parallel.batch_io import ResultWriter
+from src.parallel.work_queue import WorkQueue, merge_results, parse_shard, shard_jobs
+
+JOBS = [{"desired_effects": [f"Effect {i}"]} for i in range(40)]
+
+def echo_jobs(batch_jobs, writer):
+    """Write a fake result for every job."""
+    for job in batch_jobs:
+        writer.write({"status": "ok", "params": job, "worker": os.getpid()})
+
+def drain_worker(work_dir, worker_id):
+    """Module-level worker so it can run in a separate process."""
+    WorkQueue(work_dir).drain(worker_id, echo_jobs)
+
+def test_parse_shard():
+    """Test shard specifications and their validation."""
+    assert parse_shard("2/4") == (2, 4)
+    for spec in ["0/4", "5/4", "2", "a/b"]:
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+def test_shards_partition_the_batch():
+    """Test that the shards of a batch are disjoint and cover every job."""
+    shards = [list(shard_jobs(iter(JOBS), i, 3)) for i in range(1, 4)]
+    assert shards[0][:2] == [JOBS[0], JOBS[3]]
+    assert sorted(job["desired_effects"][0] for shard in shards for job in shard) == \
+        sorted(job["desired_effects"][0] for job in JOBS)
+
+def test_workers_share_a_directory(tmp_path):
+    """Test that several processes drain one work directory without duplicating work."""
+    work_dir = str(tmp_path / "work")
+    queue = WorkQueue(work_dir)
+    assert queue.enqueue(JOBS, chunk_size=3) == len(JOBS)
+
+    workers = [multiprocessing.Process(target=drain_worker, args=(work_dir, f"w{i}")) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert queue.status() == {"pending": 0, "claimed": 0, "done": 14}
+    merged = str(tmp_path / "merged.json")
+    assert merge_results([os.path.join(work_dir, "results")], merged, dedupe=False) == len(JOBS)
+    with open(merged) as f:
+        assert sorted(r["params"]["desired_effects"][0] for r in json.load(f)) == \
+            sorted(job["desired_effects"][0] for job in JOBS)
+
+def test_stale_claims_are_requeued(tmp_path):
+    """Test that tasks of a dead worker return to the queue."""
+    queue = WorkQueue(str(tmp_path / "work"))
+    queue.enqueue(JOBS[:2], chunk_size=1)
+    task_id, jobs = queue.claim("dead-worker")
+    assert jobs == [JOBS[0]]
+
+    assert queue.requeue_stale(max_age=0) == 1
+    assert queue.status() == {"pending": 2, "claimed": 0, "done": 0}
+    queue.complete(task_id)  # Late completion of a requeued task is ignored
+    assert queue.status()["pending"] == 2
+
+def test_enqueue_never_reuses_task_names(tmp_path):
+    """Test that enqueuing after done tasks were pruned keeps every pending task."""
+    queue = WorkQueue(str(tmp_path / "work"))
+    queue.enqueue(JOBS[:2], chunk_size=1)
+    task_id, _ = queue.claim("w1")
+    queue.complete(task_id)
+    for name in os.listdir(os.path.join(queue.work_dir, "done")):
+        os.remove(os.path.join(queue.work_dir, "done", name))
+    queue.enqueue(JOBS[2:4], chunk_size=1)
+    assert queue.status()["pending"] == 3
+    assert [queue.claim("w1")[1] for _ in range(3)] == [[JOBS[1]], [JOBS[2]], [JOBS[3]]]
+
+def test_claims_are_fresh(tmp_path):
+    """Test that a claim of a task enqueued long ago is not stale."""
+    queue = WorkQueue(str(tmp_path / "work"))
+    queue.enqueue(JOBS[:1])
+    pending = os.path.join(queue.work_dir, "pending")
+    for name in os.listdir(pending):
+        os.utime(os.path.join(pending, name), (0, 0))
+    queue.claim("w1")
+    assert queue.requeue_stale(max_age=60) == 0
+
+def test_merge_drops_requeued_results(tmp_path):
+    """Test that merging removes the results of a rerun task but keeps jobs submitted twice."""
+    queue = WorkQueue(str(tmp_path / "work"))
+    queue.enqueue([JOBS[0], JOBS[0], JOBS[1]], chunk_size=3)
+    runs = []
+
+    def run_then_requeue(batch_jobs, writer):
+        echo_jobs(batch_jobs, writer)
+        runs.append(len(batch_jobs))
+        if len(runs) == 1:
+            queue.requeue_stale(max_age=0)  # The first run's claim goes stale before completing
+
+    assert queue.drain("w1", run_then_requeue) == 2
+    results = os.path.join(queue.work_dir, "results")
+    assert merge_results([results], str(tmp_path / "all.jsonl"), dedupe=False) == 6
+    assert merge_results([results], str(tmp_path / "merged.jsonl")) == 3
+    assert merge_results([results], str(tmp_path / "unique.jsonl"), dedupe_params=True) == 2
+    assert WorkQueue(queue.work_dir).queue_id == queue.queue_id
+
+def test_merge_drops_duplicate_params(tmp_path):
+    """Test that merging can keep only the first result for each set of parameters."""
+    paths = []
+    for name, jobs in [("a.jsonl", JOBS[:3]), ("b.json", JOBS[2:5])]:
+        path = str(tmp_path / name)
+        with ResultWriter(path) as writer:
+            echo_jobs(jobs, writer)
+        paths.append(path)
+
+    assert merge_results(paths, str(tmp_path / "merged.jsonl")) == 6
+    assert merge_results(paths, str(tmp_path / "unique.jsonl"), dedupe_params=True) == 5